@@ -0,0 +1,580 @@
+'''
+    EDIF2WW project file.
+    Post-route delay balancing.
+
+    Gates like LPM_AND and LPM_XOR only work when electrons of their inputs
+    arrive in phase. Paths through the cascades differ in length, so after
+    routing every gate input arriving earlier than the latest input of the gate
+    gets one of the wires carrying its signal made longer, in three ways:
+    - a detour: one tile of a straight run of the wire is replaced by three tiles
+      going around it, which is 2 * TILE_SIZE generations slower;
+    - a reroute: the wire is drawn anew through free tiles, an even number of tiles
+      longer, each two of them 2 * TILE_SIZE generations slower;
+    - a DELAY_LINE component: two straight tiles of the wire are replaced by
+      a serpentine, which is TILE_SIZE generations slower.
+    Any path through wires and components takes a multiple of TILE_SIZE
+    generations, so these are enough for any skew, given there is room.
+    Wires packed into a channel have no room around them, but the signal may be
+    delayed on any wire before it, back through single-input components such as
+    junctions, as long as no gate input it reaches gets later than the latest
+    input of that gate. If none of those wires has room either, empty columns
+    are inserted into the field where one of them crosses from a column to the next,
+    moving everything to the right of them: every wire crossing there is drawn
+    on through the new columns, so all the signals going to the right are delayed
+    alike and the new straight run has room for delay lines.
+'''
+
+import collections
+
+import routing
+import sta
+import wireworld as ww
+import wireworld_wires_library_tile6 as wiring
+
+# Extra delay of a detour and of a delay line
+DETOUR_STEP = 2 * ww.TILE_SIZE
+DELAY_LINE_STEP = wiring.DELAY_LINE('', 'E').get_delay() - 2 * ww.TILE_SIZE
+
+# A reroute may grow the field when its wire lies along the bottom or the right edge,
+# this many times per balancing at most
+MAX_FIELD_GROWTHS = routing.MAX_FIELD_GROWTHS
+
+
+def balance_delays(tile_field, instances, nets, routes):
+    '''
+        tile_field - wireworld.TileLevelWireWorldUniverse with the routed layout
+        instances - dict of placed instances
+        nets - netlist.Netlist of 2-terminal nets
+        routes - dict {net_name: list of tiles of the wire}, as returned by routing.do_cascade_routing
+
+        Changes all of them in place: wires are re-drawn with detours or rerouted, delay line
+        instances are added and the nets they are inserted into are split in two,
+        like for feedthroughs. The field may grow to the bottom and to the right,
+        and columns may be inserted into it, moving the instances and wires right of them.
+        Returns report dict:
+        'detours', 'reroutes', 'delay_lines' - number of inserted detours, rerouted wires and delay lines
+        'growths' - number of times the field was grown
+        'inserted_columns' - number of empty columns inserted into the field
+        'skew_before', 'skew_after' - the largest gate input skew before and after balancing
+        'unbalanced' - list of {'instance', 'port', 'missing'} for gate inputs which could not
+                       be delayed enough (no room along the wires carrying their signal)
+    '''
+    before = sta.analyze(instances, nets, routes)
+
+    # gates are balanced level by level: delaying the inputs of a gate
+    # changes arrivals only at the instances further down
+    level = {}
+    gates_by_level = {}
+    for inst_name in nets.get_topological_order():
+        level[inst_name] = 0
+        for net_name in nets.get_incoming_nets(inst_name):
+            driver = nets.get_driver(net_name)
+            if (driver != None):
+                level[inst_name] = max(level[inst_name], level[driver[0]] + 1)
+        if (sta.combines_inputs(instances[inst_name])):
+            gates_by_level.setdefault(level[inst_name], []).append(inst_name)
+
+    state = {
+        'field': tile_field,
+        'instances': instances,
+        'nets': nets,
+        'routes': routes,
+        'reserved': {},     # tiles which delay line serpentines bulge into
+        'growths': 0,
+        'inserted_columns': 0,
+        'level': level,
+        'arrivals': before['arrivals'],
+    }
+    counts = {'detour': 0, 'reroute': 0, 'delay_line': 0}
+    unbalanced = []
+    for gate_level in sorted(gates_by_level):
+        state['current_level'] = gate_level
+        changed = False
+        for inst_name in gates_by_level[gate_level]:
+            for port_name in instances[inst_name].get_input_port_names():
+                missing = _get_missing(state, (inst_name, port_name))
+                if (missing == None):
+                    continue
+                while (missing > 0):
+                    done = _delay_port(state, (inst_name, port_name), missing)
+                    if (done == None):
+                        break
+                    kind, step = done
+                    counts[kind] += 1
+                    missing -= step
+                    changed = True
+                if (missing > 0):
+                    unbalanced.append({'instance': inst_name, 'port': port_name, 'missing': missing})
+        if (changed):
+            state['arrivals'] = sta.analyze(instances, nets, routes)['arrivals']
+
+    after = sta.analyze(instances, nets, routes)
+    return {
+        'detours': counts['detour'],
+        'reroutes': counts['reroute'],
+        'delay_lines': counts['delay_line'],
+        'growths': state['growths'],
+        'inserted_columns': state['inserted_columns'],
+        'skew_before': before['max_skew'],
+        'skew_after': after['max_skew'],
+        'unbalanced': unbalanced,
+    }
+
+
+def print_report(report):
+    print 'Inserted %d detour(s), %d reroute(s) and %d delay line(s), max input skew %d -> %d generations' % (
+        report['detours'], report['reroutes'], report['delay_lines'], report['skew_before'], report['skew_after'])
+    if (report['growths'] > 0):
+        print '  the field was grown %d time(s) to make room' % report['growths']
+    if (report['inserted_columns'] > 0):
+        print '  %d column(s) were inserted into the field to make room' % report['inserted_columns']
+    if (len(report['unbalanced']) > 0):
+        print '  %d gate input(s) left unbalanced, no room along their wires' % len(report['unbalanced'])
+
+
+def _get_missing(state, port):
+    '''
+        Returns how many generations the signal at the gate input port (inst_name, port_name)
+        arrives before the latest input of the gate, or None if some of them are not connected.
+    '''
+    arrivals = state['arrivals']
+    inst_name = port[0]
+    port_arrivals = [arrivals.get(inst_name + '.' + port_name)
+                     for port_name in state['instances'][inst_name].get_input_port_names()]
+    if (None in port_arrivals):
+        return None
+    return max(port_arrivals) - arrivals[inst_name + '.' + port[1]]
+
+
+def _delay_port(state, port, missing):
+    '''
+        Makes one of the wires carrying the signal to port (inst_name, port_name) longer by at most
+        as many generations as every gate input reached through it is missing (see _downstream_ports()):
+        by a detour or a reroute if at least DETOUR_STEP generations may be added, otherwise by a delay line.
+        The farthest wire is tried first, so that a delay needed by several gate inputs is made once
+        on a wire they share. If no wire has room, columns are inserted across one of them
+        (see _widen_channel()) and a delay line is put there.
+        Returns tuple (kind, generations added), kind being 'detour', 'reroute' or 'delay_line',
+        or None if there was no room.
+    '''
+    fld = state['field']
+    routes = state['routes']
+    reserved = state['reserved']
+    candidates = []
+    for net_name in reversed(_upstream_nets(state['instances'], state['nets'], port)):
+        if (net_name not in routes):
+            continue
+        reached = _downstream_ports(state['instances'], state['nets'], net_name)
+        allowed = missing
+        for other in reached:
+            if (state['level'][other[0]] <= state['current_level']):
+                other_missing = _get_missing(state, other)
+                if (other_missing != None):
+                    allowed = min(allowed, other_missing)
+        if (allowed < DELAY_LINE_STEP):
+            continue
+        candidates.append((net_name, reached, allowed))
+
+        done = None
+        if (allowed >= DETOUR_STEP):
+            detour = _find_detour(fld, routes[net_name], reserved)
+            if (detour != None):
+                _make_detour(fld, routes, net_name, detour)
+                done = ('detour', DETOUR_STEP)
+            else:
+                route = _find_longer_route(state, routes[net_name], 2 * (allowed // DETOUR_STEP))
+                if (route != None):
+                    done = ('reroute', (len(route) - len(routes[net_name])) // 2 * DETOUR_STEP)
+                    _reroute(fld, routes, net_name, route)
+        if (done == None):
+            slot = _find_slot(fld, routes[net_name], reserved, state['nets'][net_name])
+            if (slot != None):
+                _insert_delay_line(fld, state['instances'], state['nets'], routes, reserved, net_name, slot)
+                done = ('delay_line', DELAY_LINE_STEP)
+        if (done != None):
+            for (inst_name, port_name) in reached:
+                key = inst_name + '.' + port_name
+                if (key in state['arrivals']):
+                    state['arrivals'][key] += done[1]
+            return done
+
+    for (net_name, reached, allowed) in candidates:
+        # room for all the delay lines the net may take, each with the two tiles in front of it
+        if (not _widen_channel(state, net_name, 4 * (allowed // DELAY_LINE_STEP))):
+            continue
+        slot = _find_slot(fld, routes[net_name], reserved, state['nets'][net_name])
+        if (slot != None):
+            _insert_delay_line(fld, state['instances'], state['nets'], routes, reserved, net_name, slot)
+            for (inst_name, port_name) in reached:
+                key = inst_name + '.' + port_name
+                if (key in state['arrivals']):
+                    state['arrivals'][key] += DELAY_LINE_STEP
+            return ('delay_line', DELAY_LINE_STEP)
+    return None
+
+
+def _upstream_nets(instances, nets, port):
+    '''
+        Returns names of the nets carrying the signal to port, starting with the one
+        connected to it and going back through crossing channels and components with a single input,
+        such as feedthroughs, delay lines and junctions.
+    '''
+    result = []
+    net_name = nets.find_net(port)
+    while True:
+        result.append(net_name)
+        driver = nets.get_driver(net_name)
+        if (driver == None):
+            break
+        inst = instances[driver[0]]
+        channels = sta.get_channels(inst)
+        if (driver[1] in channels):
+            net_name = nets.find_net((driver[0], channels[driver[1]]))
+        elif (len(inst.get_input_port_names()) == 1 and len(nets.get_incoming_nets(driver[0])) == 1):
+            net_name = nets.get_incoming_nets(driver[0])[0]
+        else:
+            break
+    return result
+
+
+def _downstream_ports(instances, nets, net_name):
+    '''
+        Returns the gate input ports (inst_name, port_name) whose arrival changes with the delay of the net:
+        the ones reached from it through crossing channels and components with a single input.
+    '''
+    result = []
+    stack = [net_name]
+    while (len(stack) > 0):
+        for (inst_name, port_name) in nets.get_sinks(stack.pop()):
+            inst = instances[inst_name]
+            channels = sta.get_channels(inst)
+            if (sta.combines_inputs(inst)):
+                result.append((inst_name, port_name))
+            elif (len(channels) > 0):
+                for out_net in nets.get_outgoing_nets(inst_name):
+                    if (channels[nets.get_driver(out_net)[1]] == port_name):
+                        stack.append(out_net)
+            elif (len(inst.get_input_port_names()) == 1):
+                stack += nets.get_outgoing_nets(inst_name)
+    return result
+
+
+def _find_detour(fld, path, reserved):
+    '''
+        Returns tuple (i, offset) such that tile path[i] may be replaced by three tiles
+        shifted by offset from path[i-1], path[i] and path[i+1], which are in a straight line.
+        The new tiles must be empty and must not touch other tiles of the wire.
+        Returns None if there is no room.
+    '''
+    height = fld.get_height()
+    width = fld.get_width()
+    tiles = set(path)
+    for i in range(2, len(path) - 2):
+        run = path[i - 1 : i + 2]
+        if (run[0][0] == run[2][0]):
+            offsets = [(-1, 0), (1, 0)]
+        elif (run[0][1] == run[2][1]):
+            offsets = [(0, -1), (0, 1)]
+        else:
+            continue
+        for offset in offsets:
+            new_tiles = [(t[0] + offset[0], t[1] + offset[1]) for t in run]
+            room = True
+            for (row, col) in new_tiles:
+                if (row < 0 or row >= height or col < 0 or col >= width or
+                        fld.get_kind(row, col) != ww.TILE_EMPTY or (row, col) in reserved):
+                    room = False
+            # the only tiles of the wire next to a new one may be the one it is shifted from and path[i]
+            for k in range(3):
+                for n in _neighs(new_tiles[k]):
+                    if (n in tiles and n != run[k] and n != run[1]):
+                        room = False
+            if (room):
+                return (i, offset)
+    return None
+
+
+def _make_detour(fld, routes, net_name, detour):
+    i, offset = detour
+    path = routes[net_name]
+    new_tiles = [(t[0] + offset[0], t[1] + offset[1]) for t in path[i - 1 : i + 2]]
+    fld.remove_conductor(path[i][0], path[i][1])
+    for (row, col) in new_tiles:
+        fld.place_conductor(row, col, net_name)
+    routes[net_name] = path[:i] + new_tiles + path[i + 1:]
+
+
+def _find_longer_route(state, path, max_extra):
+    '''
+        Returns a route of the wire longer than path by an even number of tiles up to max_extra,
+        the most it can, going through empty tiles and the tiles of the wire itself, or None.
+        The tiles at both ends and next to them are kept, so the wire meets its ports as before.
+        The route is made of two shortest paths from the inner ends to a tile which is as far
+        from both as needed, and must not touch itself. If there is no such tile and the wire
+        may spread to the bottom or the right edge of the field, the field is grown
+        (at most MAX_FIELD_GROWTHS times per balancing).
+    '''
+    if (len(path) < 4):
+        return None
+    fld = state['field']
+    own = set(path[1:-1])
+    shortest = len(path) - 3    # steps between path[1] and path[-2]
+    while True:
+        from_start, order = _distances(fld, path[1], own, state['reserved'], shortest + max_extra)
+        from_end = _distances(fld, path[-2], own, state['reserved'], shortest + max_extra)[0]
+        for extra in range(max_extra, 0, -2):
+            length = shortest + extra
+            for tile in order:
+                if (from_end.get(tile, length + 1) + from_start[tile] != length):
+                    continue
+                route = [path[0]] + list(reversed(_backtrace(from_start, tile))) + _backtrace(from_end, tile)[1:] + [path[-1]]
+                if (_is_simple_wire(route)):
+                    return route
+        at_edge = [tile for tile in from_start if tile[0] == fld.get_height() - 1 or tile[1] == fld.get_width() - 1]
+        if (len(at_edge) == 0 or state['growths'] == MAX_FIELD_GROWTHS):
+            return None
+        fld.grow(routing.FIELD_GROWTH_STEP, routing.FIELD_GROWTH_STEP)
+        state['growths'] += 1
+
+
+def _distances(fld, source, own, reserved, limit):
+    '''
+        Breadth-first search from source through empty tiles and the tiles in own, up to limit steps.
+        Returns tuple (distances, order): {tile: steps} and the tiles in the order they were reached.
+    '''
+    height = fld.get_height()
+    width = fld.get_width()
+    distances = {source: 0}
+    order = [source]
+    queue = collections.deque([source])
+    while (len(queue) > 0):
+        tile = queue.popleft()
+        steps = distances[tile] + 1
+        if (steps > limit):
+            continue
+        for n in _neighs(tile):
+            if (n in distances or n[0] < 0 or n[0] >= height or n[1] < 0 or n[1] >= width):
+                continue
+            if (n not in own and (fld.get_kind(n[0], n[1]) != ww.TILE_EMPTY or n in reserved)):
+                continue
+            distances[n] = steps
+            order.append(n)
+            queue.append(n)
+    return (distances, order)
+
+
+def _backtrace(distances, tile):
+    '''
+        Returns a shortest path from the source of distances to tile, starting at tile.
+    '''
+    path = [tile]
+    while (distances[tile] > 0):
+        for n in _neighs(tile):
+            if (distances.get(n) == distances[tile] - 1):
+                tile = n
+                break
+        path.append(tile)
+    return path
+
+
+def _is_simple_wire(route):
+    '''
+        Tells whether no tile of the route is repeated or touches a tile of it other than
+        the ones before and after it, which would join the wire to itself.
+    '''
+    index = {}
+    for (i, tile) in enumerate(route):
+        if (tile in index):
+            return False
+        index[tile] = i
+    for (i, tile) in enumerate(route):
+        for n in _neighs(tile):
+            if (n in index and abs(index[n] - i) > 1):
+                return False
+    return True
+
+
+def _reroute(fld, routes, net_name, route):
+    for (row, col) in routes[net_name]:
+        fld.remove_conductor(row, col)
+    for (row, col) in route:
+        fld.place_conductor(row, col, net_name)
+    routes[net_name] = route
+
+
+def _find_slot(fld, path, reserved, net):
+    '''
+        Returns index i such that tiles path[i] and path[i+1] of the wire of net may be replaced
+        by a delay line, or None. The tiles must be in the middle of a straight run of four tiles,
+        and the tiles in front of and behind them must not touch the components of the net,
+        or they would be drawn connected to them.
+        The tile the serpentine bulges into must be empty or hold a wire of another net:
+        that wire cannot go on into the delay line's tile, so it keeps clear of the bulge.
+    '''
+    tiles = set(path)
+    inst_ids = [fld.get_symbol_id(inst_name) for (inst_name, port_name) in net]
+    for i in range(len(path) - 4, 1, -1):
+        run = path[i - 1 : i + 3]
+        if (not all(t[0] == run[0][0] for t in run) and not all(t[1] == run[0][1] for t in run)):
+            continue
+        bulge = _bulge_tile(run[1], run[2])
+        if (bulge[0] >= fld.get_height() or bulge[1] < 0 or bulge in reserved or bulge in tiles):
+            continue
+        if (fld.get_kind(bulge[0], bulge[1]) not in (ww.TILE_EMPTY, ww.TILE_CONDUCTOR)):
+            continue
+        if (_touches_component(fld, run[0], inst_ids) or _touches_component(fld, run[3], inst_ids)):
+            continue
+        return i
+    return None
+
+
+def _bulge_tile(a, b):
+    '''
+        Returns the tile next to a delay line on tiles a and b which its serpentine bulges into:
+        below the right tile of a horizontal line, left of the lower tile of a vertical one.
+    '''
+    if (a[0] == b[0]):
+        return (a[0] + 1, max(a[1], b[1]))
+    return (max(a[0], b[0]), a[1] - 1)
+
+
+def _insert_delay_line(fld, instances, nets, routes, reserved, net_name, slot):
+    path = routes[net_name]
+    net = nets[net_name]
+    forward = (nets.get_driver(net_name) == net[0])   # path goes from net[0] to net[1]
+    a = path[slot]
+    b = path[slot + 1]
+    if (a[0] == b[0]):
+        direction = 'E' if (b[1] > a[1]) == forward else 'W'
+    else:
+        direction = 'S' if (b[0] > a[0]) == forward else 'N'
+    reserved[_bulge_tile(a, b)] = True
+
+    k = 0
+    while ('DELAY_' + str(k) in instances):
+        k += 1
+    dl_name = 'DELAY_' + str(k)
+    delay_line = wiring.DELAY_LINE(dl_name, direction)
+    delay_line.set_pos_in_tiles(min(a[0], b[0]), min(a[1], b[1]))
+    instances[dl_name] = delay_line
+    fld.place_inline_component(min(a[0], b[0]), min(a[1], b[1]), delay_line)
+
+    if (forward):
+        port_a, port_b = 'Input', 'Output'
+    else:
+        port_a, port_b = 'Output', 'Input'
+    del nets[net_name]
+    del routes[net_name]
+    for (suffix, half, tiles) in [('_DL0', [net[0], (dl_name, port_a)], path[:slot]),
+                                  ('_DL1', [(dl_name, port_b), net[1]], path[slot + 2:])]:
+        nets[net_name + suffix] = half
+        routes[net_name + suffix] = tiles
+        for (row, col) in tiles:
+            fld.place_conductor(row, col, net_name + suffix)
+
+
+def _widen_channel(state, net_name, count):
+    '''
+        Inserts count empty columns into the field where the wire of the net goes straight
+        from a column to the next one, moving the instances and wires right of them.
+        Every wire crossing there is drawn on through the new columns. The columns must not
+        cut through a component, every wire crossing them must cross them once and be driven
+        from the left, no unrouted net may cross them and nothing right of them may start a signal, so every signal path reaching
+        an instance right of them gets count * TILE_SIZE generations slower and the skews stay the same.
+        Returns True if there was such a place.
+    '''
+    fld = state['field']
+    path = state['routes'][net_name]
+    for j in range(len(path) - 1):
+        if (path[j][0] != path[j + 1][0]):
+            continue
+        col = max(path[j][1], path[j + 1][1])
+        crossings = _get_crossings(state, col)
+        if (crossings == None):
+            continue
+
+        fld.insert_columns(col, count)
+        for inst in state['instances'].values():
+            row, inst_col = inst.get_pos_in_tiles()
+            if (inst_col >= col):
+                inst.set_pos_in_tiles(row, inst_col + count)
+        routes = state['routes']
+        for name in routes:
+            routes[name] = [(row, c + count if c >= col else c) for (row, c) in routes[name]]
+        reserved = dict(((row, c + count if c >= col else c), True) for (row, c) in state['reserved'])
+        state['reserved'].clear()
+        state['reserved'].update(reserved)
+        for (name, j) in crossings:
+            route = routes[name]
+            row = route[max(j, 0)][0]
+            new_tiles = [(row, c) for c in range(col, col + count)]
+            # j is the index of the tile in front of the crossing, -1 if the crossing is in front of the wire
+            if ((j >= 0 and route[j][1] > col) or (j < 0 and route[0][1] < col)):
+                new_tiles.reverse()
+            for (row, c) in new_tiles:
+                fld.place_conductor(row, c, name)
+            routes[name] = route[:j + 1] + new_tiles + route[j + 1:]
+        state['inserted_columns'] += count
+        state['arrivals'] = sta.analyze(state['instances'], state['nets'], routes)['arrivals']
+        return True
+    return False
+
+
+def _get_crossings(state, col):
+    '''
+        Returns list of (net_name, j) for the wires going from column col - 1 to column col,
+        j being the index of the tile of the wire in front of the crossing, -1 if the wire crosses
+        between its first tile and its component. Returns None if columns cannot be inserted there
+        (see _widen_channel()).
+    '''
+    fld = state['field']
+    instances = state['instances']
+    nets = state['nets']
+    for row in range(fld.get_height()):
+        left = fld.get_kind(row, col - 1)
+        right = fld.get_kind(row, col)
+        if (left == ww.TILE_PORT or right == ww.TILE_PORT):
+            return None
+        if (left == ww.TILE_COMPONENT and right == ww.TILE_COMPONENT and
+                fld.get_id(row, col - 1) == fld.get_id(row, col)):
+            return None
+    for inst in instances.values():
+        if (inst.get_pos_in_tiles()[1] >= col and len(inst.get_input_port_names()) == 0):
+            return None
+    # an unrouted net counts as no wire, so it would not get slower with the others
+    for net_name in nets:
+        if (net_name not in state['routes'] and
+                len(set(instances[inst_name].get_pos_in_tiles()[1] >= col for (inst_name, port_name) in nets[net_name])) > 1):
+            return None
+
+    crossings = []
+    for (net_name, path) in state['routes'].items():
+        found = [j for j in range(len(path) - 1)
+                 if path[j][0] == path[j + 1][0] and max(path[j][1], path[j + 1][1]) == col and
+                    min(path[j][1], path[j + 1][1]) == col - 1]
+        # a wire may also cross between an end and the component of the port it comes to
+        for (j, tile, port) in [(-1, path[0], nets[net_name][0]), (len(path) - 1, path[-1], nets[net_name][1])]:
+            if (tile[1] == col or tile[1] == col - 1):
+                other = (tile[0], 2 * col - 1 - tile[1])
+                if (fld.get_kind(other[0], other[1]) == ww.TILE_COMPONENT and
+                        fld.get_id(other[0], other[1]) == fld.get_symbol_id(port[0])):
+                    found.append(j)
+        if (len(found) == 0):
+            continue
+        driver = nets.get_driver(net_name)
+        if (len(found) > 1 or driver == None or instances[driver[0]].get_pos_in_tiles()[1] >= col):
+            return None
+        crossings.append((net_name, found[0]))
+    return crossings
+
+
+def _touches_component(fld, tile, inst_ids):
+    for (row, col) in _neighs(tile):
+        if (row >= 0 and row < fld.get_height() and col >= 0 and col < fld.get_width() and
+                fld.get_kind(row, col) == ww.TILE_COMPONENT and fld.get_id(row, col) in inst_ids):
+            return True
+    return False
+
+
+def _neighs(tile):
+    return [(tile[0] - 1, tile[1]), (tile[0], tile[1] + 1), (tile[0] + 1, tile[1]), (tile[0], tile[1] - 1)]
@@ -0,0 +1,424 @@
+'''
+    EDIF2WW project file.
+    Performance benchmarks of the Place-&-Route pipeline stages.
+
+    Usage:
+    python benchmark.py <benchmark_name> [size]
+
+    Every benchmark works on synthetic designs (N-bit adders made of
+    LPM_XOR, LPM_AND and LPM_OR gates, see designs.py), so no external netlists are needed.
+'''
+
+import copy
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import designs
+import edif_parser
+import edif2ww
+import net_splitter
+import placement
+import routing
+
+
+def _timed(func, *args):
+    '''
+        Calls func(*args) and returns tuple (result, elapsed seconds).
+    '''
+    t0 = time.time()
+    result = func(*args)
+    return (result, time.time() - t0)
+
+
+def bench_edif(n_bits=20000):
+    '''
+        Compares EDIF parsing throughput of the streaming parser
+        against the original shlex-based one.
+    '''
+    fd, path = tempfile.mkstemp(suffix='.edf')
+    os.write(fd, designs.make_adder_edif(n_bits))
+    os.close(fd)
+    try:
+        size_mb = os.path.getsize(path) / float(1024 * 1024)
+        f = open(path, 'rb')
+        token_count = sum(1 for t in edif_parser.iter_tokens(f.read()))
+        f.close()
+        print 'EDIF: %d-bit adder, %.2f MB, %d tokens' % (n_bits, size_mb, token_count)
+
+        for (label, parse) in [('streaming', edif_parser.parse_edif), ('shlex', edif_parser.parse_edif_shlex)]:
+            edif, elapsed = _timed(parse, path)
+            print '  %-10s %8.3f s %12.0f tokens/s %8.2f MB/s' % (label, elapsed, token_count / elapsed, size_mb / elapsed)
+    finally:
+        os.remove(path)
+
+
+def bench_netlist(max_gates=100000):
+    '''
+        Connectivity-heavy placement and routing stages (levelization, feedthroughs
+        and division of nets into cascades) on wide designs of growing size.
+        Time per instance should stay flat.
+    '''
+    print 'Netlist connectivity stages on wide adder arrays:'
+    gates = 10000
+    while gates <= max_gates:
+        instances, nets, input_names, output_names = designs.make_adder_design(gates / 5, ripple=False)
+        instance_count = len(instances)
+        t0 = time.time()
+        cascades = placement._divide_into_cascades(instances, nets, input_names)
+        placement._add_feedthroughs(instances, nets, cascades)
+        for cascade in cascades:
+            for inst_name in cascade:
+                nets.get_incoming_nets(inst_name)
+        elapsed = time.time() - t0
+        print '  %7d instances %8d nets %8.3f s %8.2f us/instance' % (instance_count, len(nets), elapsed, elapsed / instance_count * 1e6)
+        gates *= 2
+
+
+def bench_levelize(max_gates=100000):
+    '''
+        Levelization of the netlist into placement cascades on deep (ripple-carry, one cascade
+        per gate level of the carry chain) and wide (independent adders) designs of growing size.
+        Time per instance should stay flat.
+    '''
+    print 'Levelization into cascades:'
+    for (label, ripple) in [('deep', True), ('wide', False)]:
+        gates = 10000
+        while gates <= max_gates:
+            instances, nets, input_names, output_names = designs.make_adder_design(gates / 5, ripple)
+            cascades, elapsed = _timed(placement._divide_into_cascades, instances, nets, input_names)
+            print '  %-5s %7d instances %6d cascades %8.3f s %8.2f us/instance' % (
+                label, len(instances), len(cascades), elapsed, elapsed / len(instances) * 1e6)
+            gates *= 2
+
+
+def bench_fanout(max_fanout=100000):
+    '''
+        Splitting of a high-fan-out net into a junction tree: time per terminal
+        (which should stay flat), junction count and depth of the tree.
+    '''
+    print 'Splitting of the enable net of a gated register:'
+    fanout = 1000
+    while fanout <= max_fanout:
+        edif = edif_parser.parse_edif_buffer(designs.make_fanout_edif(fanout))
+        instances, nets, input_names, output_names = edif2ww.map_design(edif, verbose=False)
+        terminal_count = sum([len(net) for net in nets.values()])
+        split_nets, elapsed = _timed(net_splitter.split_multiterminal_nets, nets, instances)
+        junction_count = len([name for name in instances if instances[name].__class__.__name__ == 'DIRECTED_JUNCTION'])
+        # junctions between the enable input and every gate
+        depth = {'MODULE_INPUT_en': 0}
+        for inst_name in split_nets.get_topological_order():
+            for net_name in split_nets.get_outgoing_nets(inst_name):
+                for (sink_name, port_name) in split_nets.get_sinks(net_name):
+                    if (inst_name in depth):
+                        depth[sink_name] = depth[inst_name] + (instances[sink_name].__class__.__name__ == 'DIRECTED_JUNCTION')
+        gate_depths = [depth[name] for name in instances if name.startswith('A_')]
+        print '  fan-out %7d: %8d terminals %8.3f s %6.2f us/terminal, %7d junctions, %2d-%2d deep' % (
+            fanout, terminal_count, elapsed, elapsed / terminal_count * 1e6, junction_count, min(gate_depths), max(gate_depths))
+        fanout *= 10
+
+
+def bench_simulate(n_bits=4, generations=1000):
+    '''
+        WireWorld simulation speed in cell updates per second on an adder layout,
+        for the dense, the event-driven and the bit-sliced multi-vector engine.
+    '''
+    import simulate
+    instances, nets, tile_field, cell_field, input_names, output_names, routes = designs.make_adder_layout(n_bits)
+    pattern = cell_field.get_field()
+    height, width = simulate.DenseSimulator(pattern).get_size()
+    print 'Simulating %d-bit adder layout, %d x %d cells:' % (n_bits, height, width)
+    for (label, engine) in [('dense', simulate.DenseSimulator), ('event', simulate.EventSimulator)]:
+        sim = engine(pattern)
+        none, elapsed = _timed(sim.step, generations)
+        print '  %-10s %8.3f s %14.0f cell updates/s' % (label, elapsed, height * width * generations / elapsed)
+    sim = simulate.MultiVectorSimulator(pattern)
+    none, elapsed = _timed(sim.step, generations)
+    print '  %-10s %8.3f s %14.0f cell updates/s (%d vectors at once)' % ('bit-sliced', elapsed, height * width * generations * simulate.LANES / elapsed, simulate.LANES)
+
+
+def _random_pattern(rng, height, width, copper_density):
+    '''
+        Returns a random soup of copper with some electrons on it.
+    '''
+    pattern = []
+    for r in range(height):
+        row = ''
+        for c in range(width):
+            if (rng.random() < copper_density):
+                row += rng.choice('HTCCCCCC')
+            else:
+                row += ' '
+        pattern.append(row)
+    return pattern
+
+
+def bench_engines(n_bits=2, generations=300):
+    '''
+        Cross-checks the event-driven and the bit-sliced simulation engines against
+        the dense one: all are run on random copper soups and on an adder layout,
+        and their patterns are compared after every generation.
+        Raises RuntimeError on the first mismatch.
+    '''
+    import random
+    import simulate
+    rng = random.Random(0)
+    cases = []
+    for i in range(20):
+        size = rng.randint(1, 40)
+        cases.append(('random soup %d' % i, _random_pattern(rng, size, rng.randint(1, 40), rng.random())))
+    # a 1-cell-wide pattern, an empty one and an adder layout
+    cases.append(('single row', ['THCCCCCCCCC']))
+    cases.append(('empty', ['   ', '   ']))
+    instances, nets, tile_field, cell_field, input_names, output_names, routes = designs.make_adder_layout(n_bits)
+    cases.append(('%d-bit adder' % n_bits, cell_field.get_field()))
+
+    for (label, pattern) in cases:
+        dense = simulate.DenseSimulator(pattern)
+        event = simulate.EventSimulator(pattern)
+        multi = simulate.MultiVectorSimulator(pattern)
+        dense_time = 0.0
+        event_time = 0.0
+        multi_time = 0.0
+        for g in range(generations + 1):
+            expected = dense.get_pattern()
+            if (event.get_pattern() != expected):
+                raise RuntimeError('Event-driven engine disagrees on ' + label + ' at generation ' + str(g))
+            if (multi.get_pattern(0) != expected or multi.get_pattern(simulate.LANES - 1) != expected):
+                raise RuntimeError('Bit-sliced engine disagrees on ' + label + ' at generation ' + str(g))
+            none, elapsed = _timed(dense.step)
+            dense_time += elapsed
+            none, elapsed = _timed(event.step)
+            event_time += elapsed
+            none, elapsed = _timed(multi.step)
+            multi_time += elapsed
+        print '  %-16s identical for %d generations (dense %.3f s, event %.3f s, bit-sliced %.3f s)' % (label, generations, dense_time, event_time, multi_time)
+
+
+def bench_verify(n_bits=1):
+    '''
+        Functional equivalence check of an adder layout against its netlist.
+        Reports mismatches and the number of vectors checked per second.
+    '''
+    import verify
+    instances, nets, tile_field, cell_field, input_names, output_names, routes = designs.make_adder_layout(n_bits)
+    print 'Verifying %d-bit adder layout:' % n_bits
+    report = verify.check_layout(cell_field.get_field(), instances, nets, routes, input_names, output_names)
+    verify.print_report(report)
+
+
+def bench_rle(n_bits=4):
+    '''
+        RLE writing speed on an adder layout, in MB per second of the written file and of the pattern,
+        and compression ratio against one char per cell. The file is read back and compared.
+    '''
+    import rle_writer
+    instances, nets, tile_field, cell_field, input_names, output_names, routes = designs.make_adder_layout(n_bits)
+    pattern = cell_field.get_field()
+    height = len(pattern)
+    width = len(pattern[0])
+    fd, path = tempfile.mkstemp(suffix='.rle')
+    os.close(fd)
+    try:
+        none, elapsed = _timed(rle_writer.write_rle, path, pattern)
+        size_mb = os.path.getsize(path) / float(1024 * 1024)
+        # one char per cell plus '$\n' per row, as written before runs were used
+        plain_mb = height * (width + 2) / float(1024 * 1024)
+        print 'RLE: %d-bit adder layout, %d x %d cells' % (n_bits, height, width)
+        print '  %8.3f s %8.2f MB written, %8.2f MB/s of file, %8.2f MB/s of pattern at one char per cell, compression %.1fx' % (
+            elapsed, size_mb, size_mb / elapsed, plain_mb / elapsed, plain_mb / size_mb)
+        if (rle_writer.read_rle(path) != [''.join(row) for row in pattern]):
+            raise RuntimeError('RLE read back differs from the written pattern')
+    finally:
+        os.remove(path)
+
+
+def bench_mc(n_bits=4):
+    '''
+        Golly macrocell writing on an adder layout against RLE: time, file size and
+        number of quadtree nodes. The macrocell file is read back and compared.
+    '''
+    import mc_writer
+    import rle_writer
+    instances, nets, tile_field, cell_field, input_names, output_names, routes = designs.make_adder_layout(n_bits)
+    pattern = [''.join(row) for row in cell_field.get_field()]
+    fd, mc_path = tempfile.mkstemp(suffix='.mc')
+    os.close(fd)
+    fd, rle_path = tempfile.mkstemp(suffix='.rle')
+    os.close(fd)
+    try:
+        node_count, mc_time = _timed(mc_writer.write_macrocell, mc_path, tile_field, instances, nets)
+        none, rle_time = _timed(rle_writer.write_rle, rle_path, pattern)
+        mc_kb = os.path.getsize(mc_path) / 1024.0
+        rle_kb = os.path.getsize(rle_path) / 1024.0
+        print 'Macrocell: %d-bit adder layout, %d x %d cells' % (n_bits, len(pattern), len(pattern[0]))
+        print '  %-10s %8.3f s %10.1f KB %8d nodes (from the tile-level field)' % ('macrocell', mc_time, mc_kb, node_count)
+        print '  %-10s %8.3f s %10.1f KB (from the cell-level field, %.1fx the macrocell size)' % ('rle', rle_time, rle_kb, rle_kb / mc_kb)
+        # the layout is offset within the macrocell's root, so both are compared without the empty margins
+        if (designs.trim_pattern(mc_writer.read_macrocell(mc_path)) != designs.trim_pattern(pattern)):
+            raise RuntimeError('Macrocell read back differs from the cell-level field')
+    finally:
+        os.remove(mc_path)
+        os.remove(rle_path)
+
+
+def bench_convert(size=300, n_bits=2):
+    '''
+        Tile-to-cell conversion, batched with NumPy against tile by tile,
+        on a size x size tile field of wire rings and on an adder layout.
+        Raises RuntimeError if the two conversions differ.
+    '''
+    tile_field, nets = designs.make_ring_field(size)
+    cases = [('%dx%d rings' % (size, size), tile_field, {}, nets)]
+    instances, nets, tile_field, cell_field, input_names, output_names, routes = designs.make_adder_layout(n_bits)
+    cases.append(('%d-bit adder' % n_bits, tile_field, instances, nets))
+    print 'Tile to cell conversion:'
+    for (label, tile_field, instances, nets) in cases:
+        batched, batched_time = _timed(tile_field.write_cell_level_universe_batched, instances, nets)
+        by_tile, by_tile_time = _timed(tile_field.write_cell_level_universe_by_tile, instances, nets)
+        tile_count = tile_field.get_width() * tile_field.get_height()
+        print '  %-14s %9d tiles: batched %8.3f s %12.0f tiles/s, by tile %8.3f s %12.0f tiles/s' % (
+            label, tile_count, batched_time, tile_count / batched_time, by_tile_time, tile_count / by_tile_time)
+        if (list(batched.get_field()) != list(by_tile.get_field())):
+            raise RuntimeError('Batched tile to cell conversion differs on ' + label)
+
+
+def bench_ordering(n_bits=4):
+    '''
+        Intra-cascade ordering which minimizes net crossings against random shuffling:
+        inserted crossing components, layout width, unrouted nets and time of placement and routing.
+    '''
+    import random
+    print 'Intra-cascade ordering on %d-bit adder:' % n_bits
+    for ordering in ['random', 'crossings']:
+        random.seed(0)
+        instances, nets, input_names, output_names = designs.make_adder_design(n_bits)
+        t0 = time.time()
+        tile_field, cascades = placement.do_cascade_placement(instances, nets, input_names, ordering)
+        place_time = time.time() - t0
+        routes = routing.do_cascade_routing(tile_field, nets, instances, cascades)
+        total_time = time.time() - t0
+        crossing_count = len([inst for inst in instances.values() if inst.__class__.__name__ == 'DIRECTED_BICHANNEL_CROSSING'])
+        print '  %-10s %5d crossings %4d cascades %6d tiles wide %4d unrouted nets, placement %7.3f s, placement and routing %8.3f s' % (
+            ordering, crossing_count, len(cascades), tile_field.get_width(), len(nets) - len(routes), place_time, total_time)
+
+
+def bench_trials(n_bits=16, trials=8):
+    '''
+        Placement trials with different seeds in one process and in a pool of processes (one per CPU):
+        time and score of the best placement against a single placement.
+    '''
+    import multiprocessing
+    instances, nets, input_names, output_names = designs.make_adder_design(n_bits)
+    print 'Placement trials on %d-bit adder, %d instances:' % (n_bits, len(instances))
+    single = _timed(placement.do_placement_trials, instances, nets, input_names, 1)
+    for jobs in sorted(set([1, multiprocessing.cpu_count()])):
+        result, elapsed = _timed(placement.do_placement_trials, instances, nets, input_names, trials, jobs)
+        score = placement.score_placement(result[0], result[1], result[2])
+        print '  %2d trials %2d jobs %8.3f s, best seed %d: %5d crossings, area %8d tiles, wirelength %8d tiles' % (
+            trials, jobs, elapsed, result[4], score['crossings'], score['area'], score['wirelength'])
+    score = placement.score_placement(single[0][0], single[0][1], single[0][2])
+    print '   1 trial          %8.3f s,      seed 0: %5d crossings, area %8d tiles, wirelength %8d tiles' % (
+        single[1], score['crossings'], score['area'], score['wirelength'])
+
+
+def bench_routing(n_bits=3, fanout=8):
+    '''
+        Greedy, negotiated congestion and track routers on an adder and a high-fan-out design:
+        unrouted nets, size of the tile field after routing, iterations and routing time.
+        The negotiated router runs on cascades at the fixed pitch, where some channels are too narrow
+        for their nets (edif2ww.py places them so by default), and on channels placed as wide as they need,
+        as do the track router and edif2ww.py --channel-pitch.
+    '''
+    cases = [('%d-bit adder' % n_bits, lambda: designs.make_adder_design(n_bits)),
+             ('fan-out %d' % fanout, lambda: designs.make_fanout_design(fanout))]
+    for (label, make_design) in cases:
+        print 'Routing of %s:' % label
+        for (router, channel_pitch) in [('greedy', False), ('negotiated', False), ('negotiated', True), ('tracks', True)]:
+            instances, nets, input_names, output_names = make_design()
+            tile_field, cascades = placement.do_cascade_placement(instances, nets, input_names, verbose=False,
+                                                                  channel_pitch=channel_pitch)
+            if (router == 'greedy'):
+                order = routing.get_net_order(nets, cascades)
+                routing.reset_route_cache()
+                t0 = time.time()
+                routes = {}
+                for net_name in order:
+                    path = routing.wave_route_wire(tile_field, instances, net_name, nets[net_name])
+                    if (path != None):
+                        routes[net_name] = path
+                elapsed = time.time() - t0
+                stats = routing.get_route_cache_stats()
+                iterations = 'route cache hits %d of %d (%.1f%%), %.3f s saved' % (
+                    stats['hits'], stats['lookups'], 100.0 * stats['hit_rate'], stats['saved_seconds'])
+            elif (router == 'tracks'):
+                (routes, report), elapsed = _timed(routing.route_tracks, tile_field, nets, instances,
+                                                   routing.get_net_order(nets, cascades), cascades)
+                iterations = 'widest channel %d tracks, %d nets left to the negotiated router' % (
+                    max([0] + [width for (width, columns) in report['channels']]), report['maze_nets'])
+            else:
+                (routes, report), elapsed = _timed(routing.route_negotiated, tile_field, nets, instances,
+                                                   routing.get_net_order(nets, cascades))
+                iterations = '%d iterations, shared tiles %s, %d set aside' % (
+                    report['iterations'], ' '.join([str(count) for count in report['shared_tiles']]), report['set_aside'])
+            print '  %-10s %-13s %4d unrouted nets, field %4d x %4d tiles, %8.3f s %s' % (
+                router, ['fixed pitch', 'channel pitch'][channel_pitch], len(nets) - len(routes), tile_field.get_width(), tile_field.get_height(), elapsed, iterations)
+
+
+def bench_channels(n_bits=8, max_jobs=None):
+    '''
+        Channel routing of an adder in 1, 2, 4, ... processes up to the number of cores (at least 2):
+        time, speedup against one process and unrouted nets, along with routing of the whole field at once.
+    '''
+    if (max_jobs == None):
+        max_jobs = max(multiprocessing.cpu_count(), 2)
+    design = designs.make_adder_design(n_bits)
+    print 'Channel routing of a %d-bit adder, %d CPU core(s):' % (n_bits, multiprocessing.cpu_count())
+    runs = [0]
+    jobs = 1
+    while (jobs <= max_jobs):
+        runs.append(jobs)
+        jobs *= 2
+    baseline = None
+    for jobs in runs:
+        instances, nets = copy.deepcopy(design[:2])
+        tile_field, cascades = placement.do_cascade_placement(instances, nets, design[2], verbose=False,
+                                                              channel_pitch=True)
+        order = routing.get_net_order(nets, cascades)
+        if (jobs == 0):
+            (routes, report), elapsed = _timed(routing.route_negotiated, tile_field, nets, instances, order)
+            print '  %-16s %8.3f s,               %4d unrouted nets' % ('whole field', elapsed, len(nets) - len(routes))
+            continue
+        (routes, report), elapsed = _timed(routing.route_channels, tile_field, nets, instances, order, cascades,
+                                           'negotiated', jobs)
+        if (baseline == None):
+            baseline = elapsed
+        print '  %-16s %8.3f s, speedup %5.2f, %4d unrouted nets' % (
+            '%d process(es)' % jobs, elapsed, baseline / elapsed, len(nets) - len(routes))
+
+
+_BENCHMARKS = {
+    'edif': bench_edif,
+    'netlist': bench_netlist,
+    'levelize': bench_levelize,
+    'fanout': bench_fanout,
+    'simulate': bench_simulate,
+    'engines': bench_engines,
+    'verify': bench_verify,
+    'rle': bench_rle,
+    'mc': bench_mc,
+    'convert': bench_convert,
+    'ordering': bench_ordering,
+    'trials': bench_trials,
+    'routing': bench_routing,
+    'channels': bench_channels,
+}
+
+if __name__ == '__main__':
+    if (len(sys.argv) < 2 or sys.argv[1] not in _BENCHMARKS):
+        print 'Usage: python benchmark.py <' + '|'.join(sorted(_BENCHMARKS)) + '> [size]'
+        sys.exit(1)
+    args = [int(a) for a in sys.argv[2:]]
+    _BENCHMARKS[sys.argv[1]](*args)
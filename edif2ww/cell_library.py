@@ -0,0 +1,169 @@
+'''
+    EDIF2WW project file.
+    Registry of the component cell types of the Tile Algorithm.
+
+    A cell type holds everything components of a kind have in common: the pattern,
+    compiled once into a packed string of cells, the size, the delay and the port
+    tables (dicts of precomputed cell and tile offsets). Cell types are declared
+    with register() by the library modules (wireworld_lpm_tile6, wireworld_wires_library_tile6).
+
+    Placed components are Component objects with __slots__: they keep only their
+    name, their position and a reference to the shared cell type, so a placed
+    instance takes a few dozen bytes, and every query is a lookup in the cell type.
+'''
+
+# The library is made for the Tile Algorithm of size 6, same as wireworld.TILE_SIZE
+TILE_SIZE = 6
+
+_REGISTRY = {}  # cell type name -> CellType
+
+
+class CellType(object):
+    '''
+        Shared description of a kind of component.
+        name - registry name, e.g. 'LPM_AND' or 'DELAY_LINE_E'
+        pattern - list of strings, one char per cell (SPACE, H, T or C)
+        delay - in WW generations
+        inputs, outputs - lists of tuples (port name, cell pos, tile pos), from top to bottom
+                          for the inputs; cell pos is (row, col) of the port cell inside the pattern,
+                          tile pos is the tile outside of the pattern the router brings the wire to
+        outputs_sorted - output port names from top to bottom, if different from the order of outputs
+    '''
+    __slots__ = ('name', 'pattern', 'packed', 'delay', 'size_in_cells', 'size_in_tiles',
+                 'input_ports', 'output_ports', 'output_ports_sorted', 'port_pos', 'port_tile_pos')
+
+    def __init__(self, name, pattern, delay, inputs, outputs, outputs_sorted=None):
+        self.name = name
+        self.pattern = tuple(pattern)
+        self.packed = ''.join(self.pattern)
+        self.delay = delay
+        self.size_in_cells = (len(pattern), len(pattern[0]))
+        if (self.size_in_cells[0] % TILE_SIZE != 0 or self.size_in_cells[1] % TILE_SIZE != 0 or
+                len(self.packed) != self.size_in_cells[0] * self.size_in_cells[1]):
+            raise RuntimeError('Cell library: pattern of ' + name + ' is not made of whole tiles')
+        self.size_in_tiles = (self.size_in_cells[0] // TILE_SIZE, self.size_in_cells[1] // TILE_SIZE)
+        # tuples, as every component of the type hands out the same ones
+        self.input_ports = tuple([p[0] for p in inputs])
+        self.output_ports = tuple([p[0] for p in outputs])
+        self.output_ports_sorted = tuple(outputs_sorted or self.output_ports)
+        self.port_pos = dict((p[0], p[1]) for p in inputs + outputs)
+        self.port_tile_pos = dict((p[0], p[2]) for p in inputs + outputs)
+
+
+def register(cell_type):
+    '''
+        Adds the cell type to the registry and returns it.
+    '''
+    if (cell_type.name in _REGISTRY):
+        raise RuntimeError('Cell library: cell type ' + cell_type.name + ' is already registered')
+    _REGISTRY[cell_type.name] = cell_type
+    return cell_type
+
+
+def get_cell_type(name):
+    return _REGISTRY[name]
+
+
+def get_cell_type_names():
+    return sorted(_REGISTRY)
+
+
+class Component(object):
+    '''
+        Placed instance of a cell type. Library classes (LPM_AND, FEEDTHROUGH, ...)
+        derive from it and only choose the cell type in their constructors.
+    '''
+    __slots__ = ('_name', '_cell_type', '_tile_pos_row', '_tile_pos_col')
+
+    def __init__(self, instance_name, cell_type):
+        self._name = instance_name
+        self._cell_type = cell_type
+        self._tile_pos_row = 0  # position of the current instance in tile-space
+        self._tile_pos_col = 0
+
+    def get_cell_type(self):
+        return self._cell_type
+
+    def set_pos_in_tiles(self, row, col):
+        '''
+            Set position of the instance in tile space.
+            The position may be changed any number of times,
+            in case of multiple re-placement operations, for example.
+        '''
+        self._tile_pos_row = row
+        self._tile_pos_col = col
+
+    def get_pos_in_tiles(self):
+        '''
+            Return position of the instance in tile space.
+            Returns tuple (row, col)
+        '''
+        return (self._tile_pos_row, self._tile_pos_col)
+
+    def get_pattern(self):
+        return self._cell_type.pattern
+
+    def get_packed_pattern(self):
+        '''
+            Returns the pattern as one string of cells, row by row (see get_size_in_cells()).
+        '''
+        return self._cell_type.packed
+
+    def get_delay(self):
+        ''' ... in WW generations '''
+        return self._cell_type.delay
+
+    def get_size_in_tiles(self):
+        ''' Tiles of size 6. Returns tuple (height, width) '''
+        return self._cell_type.size_in_tiles
+
+    def get_size_in_cells(self):
+        ''' Returns tuple (height, width) '''
+        return self._cell_type.size_in_cells
+
+    def get_port_local_pos(self, port):
+        '''
+            Ports' locations are given in WW cell coordinate space inside gate pattern.
+            Returns tuple (row, col), 0-based.
+        '''
+        return self._cell_type.port_pos.get(port)
+
+    def get_port_local_tile_pos(self, port):
+        '''
+            Ports' locations are given in 6-tiles coordinate space
+            outside of the pattern.
+            This method returns not the position of the port inside the pattern,
+            but rather a location outside of it to which router
+            should bring a wire. This allows gates to designate
+            specific directions from which wires may connect to their ports.
+        '''
+        return self._cell_type.port_tile_pos.get(port)
+
+    def get_name(self):
+        return self._name
+
+    def get_fan_in_count(self):
+        return len(self._cell_type.input_ports)
+
+    def get_input_port_names(self):
+        ''' Returns a tuple, shared by all components of the cell type '''
+        return self._cell_type.input_ports
+
+    def get_input_port_names_sorted(self):
+        '''
+            Returns port names sorted by position from top to bottom.
+        '''
+        return self._cell_type.input_ports
+
+    def get_fan_out_count(self):
+        return len(self._cell_type.output_ports)
+
+    def get_output_port_names(self):
+        ''' Returns a tuple, shared by all components of the cell type '''
+        return self._cell_type.output_ports
+
+    def get_output_port_names_sorted(self):
+        '''
+            Returns port names sorted by position from top to bottom.
+        '''
+        return self._cell_type.output_ports_sorted
@@ -0,0 +1,172 @@
+'''
+    EDIF2WW project file.
+    Synthetic designs for the benchmarks and the tests: N-bit adders
+    made of LPM_XOR, LPM_AND and LPM_OR gates, fan-out designs and
+    tile fields of wire rings, as EDIF text, mapped netlists or routed layouts.
+'''
+
+import random
+
+import balancing
+import edif_parser
+import edif2ww
+import net_splitter
+import placement
+import routing
+import wireworld as ww
+
+
+def make_adder_edif(n_bits, ripple=True):
+    '''
+        Returns text of an EDIF netlist of an n_bits-wide adder
+        in the same form as produced by Icarus Verilog with LPM output.
+        Each bit is a full adder made of two LPM_XOR, two LPM_AND and one LPM_OR.
+        If 'ripple' is set, carries are chained (a deep design), otherwise every
+        full adder has its own carry input and output (a wide and shallow design).
+    '''
+    out = []
+    w = out.append
+    w('(edif adder%d (edifVersion 2 0 0) (edifLevel 0) (keywordMap (keywordLevel 0))' % n_bits)
+    w(' (status (written (timeStamp 2015 1 1 0 0 0) (program "benchmark.py")))')
+    w(' (external LPM_LIBRARY (edifLevel 0) (technology (numberDefinition))')
+    for lpm_type in ['LPM_AND', 'LPM_OR', 'LPM_XOR']:
+        w('  (cell %s (cellType GENERIC) (view net (viewType NETLIST) (interface' % lpm_type)
+        w('   (port Data0x0 (direction INPUT)) (port Data1x0 (direction INPUT)) (port Result0 (direction OUTPUT))')
+        w('   (property LPM_TYPE (string "%s")) (property LPM_SIZE (integer 2)) (property LPM_WIDTH (integer 1)))))' % lpm_type)
+    w(' )')
+    w(' (library DESIGN (edifLevel 0) (technology (numberDefinition))')
+    w('  (cell adder (cellType GENERIC) (view net (viewType NETLIST) (interface')
+    for i in range(n_bits):
+        w('   (port a%d (direction INPUT)) (port b%d (direction INPUT)) (port s%d (direction OUTPUT))' % (i, i, i))
+        if (not ripple):
+            w('   (port cin%d (direction INPUT)) (port cout%d (direction OUTPUT))' % (i, i))
+    if (ripple):
+        w('   (port cin (direction INPUT)) (port cout (direction OUTPUT))')
+    w('   )')
+    w('   (contents')
+    carry = '(portRef cin)'
+    nets = []
+    for i in range(n_bits):
+        if (not ripple):
+            carry = '(portRef cin%d)' % i
+        for (gate, lpm_type) in [('X1_', 'LPM_XOR'), ('X2_', 'LPM_XOR'), ('A1_', 'LPM_AND'), ('A2_', 'LPM_AND'), ('O_', 'LPM_OR')]:
+            w('    (instance %s%d (viewRef net (cellRef %s (libraryRef LPM_LIBRARY))))' % (gate, i, lpm_type))
+        nets.append(('a%d' % i, ['(portRef a%d)' % i, '(portRef Data0x0 (instanceRef X1_%d))' % i, '(portRef Data0x0 (instanceRef A1_%d))' % i]))
+        nets.append(('b%d' % i, ['(portRef b%d)' % i, '(portRef Data1x0 (instanceRef X1_%d))' % i, '(portRef Data1x0 (instanceRef A1_%d))' % i]))
+        nets.append(('c%d' % i, [carry, '(portRef Data1x0 (instanceRef X2_%d))' % i, '(portRef Data1x0 (instanceRef A2_%d))' % i]))
+        nets.append(('x%d' % i, ['(portRef Result0 (instanceRef X1_%d))' % i, '(portRef Data0x0 (instanceRef X2_%d))' % i, '(portRef Data0x0 (instanceRef A2_%d))' % i]))
+        nets.append(('s%d_net' % i, ['(portRef Result0 (instanceRef X2_%d))' % i, '(portRef s%d)' % i]))
+        nets.append(('g%d' % i, ['(portRef Result0 (instanceRef A1_%d))' % i, '(portRef Data0x0 (instanceRef O_%d))' % i]))
+        nets.append(('p%d' % i, ['(portRef Result0 (instanceRef A2_%d))' % i, '(portRef Data1x0 (instanceRef O_%d))' % i]))
+        carry = '(portRef Result0 (instanceRef O_%d))' % i
+        if (not ripple):
+            nets.append(('cout%d_net' % i, [carry, '(portRef cout%d)' % i]))
+    if (ripple):
+        nets.append(('cout_net', [carry, '(portRef cout)']))
+    for (net_name, port_refs) in nets:
+        w('    (net %s (joined %s))' % (net_name, ' '.join(port_refs)))
+    w('   ))))')
+    w(' (design adder (cellRef adder (libraryRef DESIGN))))')
+    return '\n'.join(out) + '\n'
+
+
+def make_fanout_edif(fanout):
+    '''
+        Returns text of an EDIF netlist of a gated register input: an 'en' input drives
+        Data0x0 of fanout LPM_AND gates, gate i passes input d<i> to output q<i>.
+        The 'en' net has fanout + 1 terminals.
+    '''
+    out = []
+    w = out.append
+    w('(edif fanout%d (edifVersion 2 0 0) (edifLevel 0) (keywordMap (keywordLevel 0))' % fanout)
+    w(' (status (written (timeStamp 2015 1 1 0 0 0) (program "benchmark.py")))')
+    w(' (external LPM_LIBRARY (edifLevel 0) (technology (numberDefinition))')
+    w('  (cell LPM_AND (cellType GENERIC) (view net (viewType NETLIST) (interface')
+    w('   (port Data0x0 (direction INPUT)) (port Data1x0 (direction INPUT)) (port Result0 (direction OUTPUT))')
+    w('   (property LPM_TYPE (string "LPM_AND")) (property LPM_SIZE (integer 2)) (property LPM_WIDTH (integer 1)))))')
+    w(' )')
+    w(' (library DESIGN (edifLevel 0) (technology (numberDefinition))')
+    w('  (cell fanout (cellType GENERIC) (view net (viewType NETLIST) (interface')
+    w('   (port en (direction INPUT))')
+    for i in range(fanout):
+        w('   (port d%d (direction INPUT)) (port q%d (direction OUTPUT))' % (i, i))
+    w('   )')
+    w('   (contents')
+    for i in range(fanout):
+        w('    (instance A_%d (viewRef net (cellRef LPM_AND (libraryRef LPM_LIBRARY))))' % i)
+    w('    (net en (joined (portRef en) %s))' % ' '.join(['(portRef Data0x0 (instanceRef A_%d))' % i for i in range(fanout)]))
+    for i in range(fanout):
+        w('    (net d%d (joined (portRef d%d) (portRef Data1x0 (instanceRef A_%d))))' % (i, i, i))
+        w('    (net q%d_net (joined (portRef Result0 (instanceRef A_%d)) (portRef q%d)))' % (i, i, i))
+    w('   ))))')
+    w(' (design fanout (cellRef fanout (libraryRef DESIGN))))')
+    return '\n'.join(out) + '\n'
+
+
+def make_adder_design(n_bits, ripple=True):
+    '''
+        Returns a mapped adder design ready for placement:
+        tuple (instances, nets, input_port_instance_names, output_port_instance_names),
+        where nets is a netlist.Netlist of 2-terminal nets.
+    '''
+    edif = edif_parser.parse_edif_buffer(make_adder_edif(n_bits, ripple))
+    instances, nets, input_names, output_names = edif2ww.map_design(edif, verbose=False)
+    nets = net_splitter.split_multiterminal_nets(nets, instances)
+    return (instances, nets, input_names, output_names)
+
+
+def make_fanout_design(fanout):
+    '''
+        Returns the fan-out design (see make_fanout_edif()) mapped and ready for placement,
+        in the same form as make_adder_design().
+    '''
+    edif = edif_parser.parse_edif_buffer(make_fanout_edif(fanout))
+    instances, nets, input_names, output_names = edif2ww.map_design(edif, verbose=False)
+    nets = net_splitter.split_multiterminal_nets(nets, instances)
+    return (instances, nets, input_names, output_names)
+
+
+def make_adder_layout(n_bits, seed=0):
+    '''
+        Places and routes an n_bits-wide ripple-carry adder, with the channels between cascades
+        as wide as their nets need (as edif2ww.py --channel-pitch does), so that every net is routed.
+        Returns tuple (instances, nets, tile_field, cell_field, input_names, output_names, routes).
+    '''
+    random.seed(seed)
+    instances, nets, input_names, output_names = make_adder_design(n_bits)
+    tile_field, cascades = placement.do_cascade_placement(instances, nets, input_names, channel_pitch=True)
+    routes = routing.do_cascade_routing(tile_field, nets, instances, cascades)
+    balancing.balance_delays(tile_field, instances, nets, routes)
+    cell_field = tile_field.write_cell_level_universe(instances_dict = instances, nets_dict = nets)
+    return (instances, nets, tile_field, cell_field, input_names, output_names, routes)
+
+
+def make_ring_field(size, pitch=5):
+    '''
+        Returns tuple (tile_field, nets): a size x size tile field covered with
+        square wire rings of (pitch - 1) x (pitch - 1) tiles, each a net of its own.
+    '''
+    tile_field = ww.TileLevelWireWorldUniverse(width = size, height = size)
+    nets = {}
+    for row in range(0, size - pitch + 2, pitch):
+        for col in range(0, size - pitch + 2, pitch):
+            net_name = 'ring_%d_%d' % (row, col)
+            nets[net_name] = []
+            for i in range(pitch - 1):
+                for (r, c) in [(row, col + i), (row + i, col + pitch - 2), (row + pitch - 2, col + pitch - 2 - i), (row + pitch - 2 - i, col)]:
+                    tile_field.place_conductor(r, c, net_name)
+    return (tile_field, nets)
+
+
+def trim_pattern(pattern):
+    '''
+        Returns the pattern without its empty rows and columns around the non-empty cells,
+        so that patterns written at different offsets (e.g. a macrocell file read back
+        and the cell-level field) can be compared.
+    '''
+    rows = [row for row in pattern if (row.strip(' ') != '')]
+    if (len(rows) == 0):
+        return []
+    left = min([len(row) - len(row.lstrip(' ')) for row in rows])
+    width = max([len(row.rstrip(' ')) for row in rows]) - left
+    return [row[left:].ljust(width)[:width] for row in rows]
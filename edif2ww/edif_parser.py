@@ -0,0 +1,303 @@
+'''
+    EDIF2WW project file.
+    EDIF netlist reader.
+
+    The file is memory-mapped and scanned by a single regular expression
+    in one pass, so even multi-hundred-megabyte netlists are never held
+    in memory as text or as a token list. Only the statements that the
+    rest of the pipeline uses (libraries, cells, views, interfaces,
+    instances and nets) are built into dicts; everything else is skipped
+    as soon as its opening keyword is seen.
+'''
+
+import mmap
+import re
+
+# A token is a parenthesis, a quoted string or a run of anything else
+# that is not whitespace.
+_TOKEN_RE = re.compile(r'[()]|"[^"]*"|[^\s()"]+')
+
+# Statements which dispatch() knows how to build. The rest are skipped
+# together with their whole subtree.
+_KNOWN_STATEMENTS = frozenset([
+    'edif', 'library', 'external', 'cell', 'view', 'viewtype',
+    'interface', 'port', 'direction', 'property', 'string', 'integer',
+    'contents', 'libraryref', 'cellref', 'viewref', 'instance',
+    'net', 'joined', 'portref', 'instanceref', 'design'
+])
+
+
+def dispatch(stmt, params=[]):
+    '''
+        EDIF parsing routine.
+        Builds a dict for statement 'stmt' from its already built parameters.
+    '''
+    stmt = stmt.lower()
+
+    if (stmt == 'edif'):
+        t = {'stmt':'edif', 'libraries':{}, 'design':None}
+        if (type(params[0]) is str):
+            t['name'] = params[0]
+        else:
+            print 'EDIF syntax error: Statement "edif" - name should follow the statement'
+
+        for p in params:
+            if (type(p) is dict and p['stmt'] == 'library'):
+                t['libraries'][p['name']] = p
+            if (type(p) is dict and p['stmt'] == 'design'):
+                if (t['design'] != None): print 'EDIF parsing problem: expected only one "design" inside "edif" but got more than one'
+                t['design'] = p
+        return t
+
+    elif (stmt == 'library' or stmt == 'external'):
+        t = {'stmt':'library', 'name':params[0], 'cells':{}}
+        for p in params:
+            if (type(p) is dict and p['stmt'] == 'cell'):
+                t['cells'][p['name']] = p
+        return t
+
+    elif (stmt == 'cell'):
+        t = {'stmt':'cell', 'name':params[0], 'views':{}}
+        for p in params:
+            if (type(p) is dict and p['stmt'] == 'view'):
+                t['views'][p['name']] = p
+        return t
+
+    elif (stmt == 'view'):
+        t = {'stmt':'view', 'name':params[0]}
+        for p in params:
+            if (type(p) is dict and p['stmt'] == 'viewtype' and p['value'].upper() != 'NETLIST'): # removing all the views except NETLISTs
+                return None
+            if (type(p) is dict and p['stmt'] == 'viewtype' and p['value'].upper() == 'NETLIST'):
+                t['viewtype'] = p['value'].upper()
+            if (type(p) is dict and p['stmt'] == 'interface'):
+                t['interface'] = p
+            if (type(p) is dict and p['stmt'] == 'contents'):
+                t['contents'] = p
+
+        return t
+
+    elif (stmt == 'viewtype'):
+        t = {'stmt':'viewtype', 'value':params[0]}
+        return t
+
+    elif (stmt == 'interface'):
+        t = {'stmt':'interface', 'ports':{}, 'properties':{}}
+        for p in params:
+            if (type(p) is dict and p['stmt'] == 'port'):
+                t['ports'][p['name']] = p
+            if (type(p) is dict and p['stmt'] == 'property'):
+                t['properties'][p['name']] = p
+        return t
+
+    elif (stmt == 'port'):
+        t = {'stmt':'port', 'name':params[0]}
+        for p in params:
+            if (type(p) is dict and p['stmt'] == 'direction'):
+                t['direction'] = p['value']
+        return t
+    elif (stmt == 'direction'):
+        t = {'stmt':'direction', 'value':params[0].upper()}
+        return t
+
+    elif (stmt == 'property'):
+        t = {'stmt':'property', 'name':params[0].upper(), 'value':None}
+        for p in params:
+            if (type(p) is dict and (p['stmt'] == 'string' or p['stmt'] == 'integer')):
+                t['value'] = p['value']
+        return t
+    elif (stmt == 'string'):
+        t = {'stmt':'string', 'value':params[0].lstrip('"').rstrip('"')}
+        return t
+    elif (stmt == 'integer'):
+        t = {'stmt':'integer', 'value':int(params[0])}
+        return t
+
+    elif (stmt == 'contents'):
+        t = {'stmt':'contents', 'instances':{}, 'nets':{}}
+        for p in params:
+            if (type(p) is dict and p['stmt'] == 'instance'):
+                t['instances'][p['name']] = p
+            if (type(p) is dict and p['stmt'] == 'net'):
+                t['nets'][p['name']] = p
+        return t
+
+    elif (stmt == 'libraryref'):
+        t = {'stmt':'libraryref', 'name':params[0]}
+        return t
+    elif (stmt == 'cellref'):
+        t = {'stmt':'cellref', 'name':params[0]}
+        for p in params:
+            if (type(p) is dict and p['stmt'] == 'libraryref'):
+                t['library'] = p['name']
+        return t
+    elif (stmt == 'viewref'):
+        t = {'stmt':'viewref', 'name':params[0]}
+        for p in params:
+            if (type(p) is dict and p['stmt'] == 'cellref'):
+                t['cell'] = p['name']
+                t['library'] = p['library']
+        return t
+    elif (stmt == 'instance'):
+        t = {'stmt':'instance', 'name':params[0]}
+        for p in params:
+            if (type(p) is dict and p['stmt'] == 'viewref'):
+                t['view'] = p['name']
+                t['cell'] = p['cell']
+                t['library'] = p['library']
+        return t
+
+    elif (stmt == 'net'):
+        t = {'stmt':'net', 'name':params[0], 'joined_ports':[]}
+        for p in params:
+            if (type(p) is dict and p['stmt'] == 'joined'):
+                if (t['joined_ports'] != []) : print 'EDIF syntax error: "net" statement should not have more than one "joined" statement inside'
+                t['joined_ports'] = p['ports']
+        return t
+    elif (stmt == 'joined'):
+        t = {'stmt':'joined', 'ports':[]}
+        for p in params:
+            if (type(p) is dict and p['stmt'] == 'portref'):
+                t['ports'].append(p)
+        return t
+    elif (stmt == 'portref'):
+        t = {'stmt':'portref', 'portname':params[0], 'instance':None}
+        for p in params:
+            if (type(p) is dict and p['stmt'] == 'instanceref'):
+                t['instance'] = p['value']
+        return t
+    elif (stmt == 'instanceref'):
+        t = {'stmt':'instanceref', 'value':params[0]}
+        return t
+
+    elif (stmt == 'design'):
+        t = {'stmt':'design', 'name':params[0], 'cell':None, 'library':None}
+        for p in params:
+            if (type(p) is dict and p['stmt'] == 'cellref'):
+                if (t['cell'] != None): print 'EDIF parsing problem: expected only one "cellRef" inside "design" but got more than one'
+                t['cell'] = p['name']
+                t['library'] = p['library']
+        return t
+
+    return None
+
+
+def _open_buffer(f):
+    '''
+        Returns a read-only mmap of an opened file.
+        Empty files cannot be mapped, an empty string is returned instead.
+    '''
+    try:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        return ''
+
+
+def iter_tokens(buf):
+    '''
+        Yields EDIF tokens of the given buffer (a string or an mmap) one by one.
+    '''
+    for m in _TOKEN_RE.finditer(buf):
+        yield m.group()
+
+
+def parse_edif_buffer(buf):
+    '''
+        Parses EDIF text held in 'buf' (a string or an mmap).
+        Returns the dict built for the top-level "edif" statement.
+    '''
+    tokens = _TOKEN_RE.finditer(buf)
+    # each frame is [statement, params]; the bottom frame collects top-level values
+    stack = [[None, []]]
+    for m in tokens:
+        token = m.group()
+        if (token == '('):
+            m = next(tokens, None)
+            if (m == None):
+                break
+            stmt = m.group().lower()
+            if (stmt in _KNOWN_STATEMENTS):
+                stack.append([stmt, []])
+                continue
+            # skipping unknown statement with all its contents
+            depth = 1
+            for m in tokens:
+                token = m.group()
+                if (token == '('):
+                    depth += 1
+                elif (token == ')'):
+                    depth -= 1
+                    if (depth == 0):
+                        break
+        elif (token == ')'):
+            stmt, params = stack.pop()
+            value = dispatch(stmt, params)
+            if (value != None):
+                stack[-1][1].append(value)
+        else:
+            stack[-1][1].append(token)
+
+    if (len(stack) != 1):
+        raise RuntimeError('EDIF syntax error: unexpected end of file, ' + str(len(stack)-1) + ' statement(s) left open')
+    top_values = stack[0][1]
+    if (len(top_values) == 0):
+        raise RuntimeError('EDIF syntax error: no "edif" statement found')
+    return top_values[0]
+
+
+def parse_edif(edif_file_path):
+    '''
+        Parses EDIF file at the given path.
+        Returns the dict built for the top-level "edif" statement.
+    '''
+    f = open(edif_file_path, 'rb')
+    try:
+        buf = _open_buffer(f)
+        try:
+            return parse_edif_buffer(buf)
+        finally:
+            if (isinstance(buf, mmap.mmap)):
+                buf.close()
+    finally:
+        f.close()
+
+
+def parse_edif_shlex(edif_file_path):
+    '''
+        The original shlex-based parser.
+        Kept as a reference implementation for benchmarks.
+    '''
+    import shlex
+    s = shlex.shlex( file(edif_file_path) )
+
+    state = 'NORMAL'
+    statementStack = []
+    valuesStack = []
+    token = s.get_token()
+    while (token != s.eof):
+        if (state == 'WAITING_STATEMENT'):
+            statementStack.append(token)
+            state = 'NORMAL'
+        elif (state == 'NORMAL' and token == '('):
+            valuesStack.append(token)
+            state = 'WAITING_STATEMENT'
+        elif (state == 'NORMAL' and token == ')'):
+            statement = statementStack.pop()
+            params = []
+
+            val = valuesStack.pop()
+            while (val != '('):
+                params.append(val)
+                val = valuesStack.pop()
+
+            params.reverse()
+            returnVal = dispatch(statement, params)
+            if (returnVal != None):
+                valuesStack.append(returnVal)
+
+        elif (state == 'NORMAL' and token not in ['(', ')']):
+            valuesStack.append(token)
+
+        token = s.get_token()
+
+    return valuesStack[0]
@@ -0,0 +1,320 @@
+'''
+    EDIF2WW project file.
+    Golly macrocell (.mc) file writer.
+
+    A macrocell file stores the pattern as a quadtree: a node of level k is a
+    square of 2^k x 2^k cells made of four nodes of level k-1 (NW, NE, SW, SE),
+    level 1 nodes are 2x2 cells. Every distinct node is written once and
+    referred to by its number (nodes are numbered from 1 in the order they are
+    written, 0 stands for an empty node), so repetitive layouts take very little
+    space and Golly loads them without parsing every cell.
+    (http://golly.sourceforge.net/Help/formats.html)
+
+    For WireWorld the lines look like:
+    [M2] (edif2ww)
+    #R WireWorld
+    1 nw ne sw se       - level 1 node, cell states
+    k nw ne sw se       - level k node, numbers of its level k-1 nodes
+    The last node is the root. The layout is written a few cells below and to the right of
+    its top-left corner, wherever that takes the fewest nodes.
+'''
+
+import wireworld as ww
+
+# Cell states of the patterns -> WireWorld states in Golly
+_MC_STATES = {' ': 0, 'H': 1, 'T': 2, 'C': 3}
+
+# Nodes of this level are looked up by the tiles they cover, and built from their cells at once (see _QuadtreeBuilder)
+_REGION_LEVEL = 4
+
+# Output buffer size
+_BUFFER_SIZE = 1 << 20
+
+
+class _NodeCounter:
+    '''
+        Stands in for the output file when only the number of nodes is wanted.
+    '''
+    def write(self, line):
+        pass
+
+
+class _QuadtreeBuilder:
+    '''
+        Builds the hash-consed quadtree of a tile-level field and writes its nodes
+        to a file as soon as they are created, children first.
+        Cells are taken from the tiles' patterns (TileLevelWireWorldUniverse.get_tile_patterns),
+        the cell-level field is never built.
+        The top-left corner of the field goes to (row_offset, col_offset) cells within the root.
+    '''
+    def __init__(self, f, tile_patterns, plane, tile_width, tile_height, row_offset=0, col_offset=0):
+        self._f = f
+        self._plane = plane
+        self._tile_width = tile_width
+        self._tile_height = tile_height
+        self._row_offset = row_offset
+        self._col_offset = col_offset
+        self._height = tile_height * ww.TILE_SIZE
+        self._width = tile_width * ww.TILE_SIZE
+        self._tile_states = [None]
+        # patterns which look the same shifted along their rows (every row is one state)
+        # or along their columns (every column is one state), the empty one is both
+        self._row_uniform = [True]
+        self._col_uniform = [True]
+        for pattern in tile_patterns[1:]:
+            self._tile_states.append([[_MC_STATES[c] for c in line] for line in pattern])
+            self._row_uniform.append(all([len(set(line)) == 1 for line in pattern]))
+            self._col_uniform.append(all([len(set(column)) == 1 for column in zip(*pattern)]))
+        self._nodes = {}    # (level, nw, ne, sw, se) -> node number
+        # region key (see _region_key) -> node number, for the squares of level _REGION_LEVEL
+        self._regions = {}
+
+    def get_node_count(self):
+        return len(self._nodes)
+
+    def get_size(self):
+        '''
+            Returns the side of the square taken by the field and its offset, in cells.
+        '''
+        return max(self._height + self._row_offset, self._width + self._col_offset)
+
+    def _cell(self, row, col):
+        row -= self._row_offset
+        col -= self._col_offset
+        if (row < 0 or col < 0 or row >= self._height or col >= self._width):
+            return 0
+        pattern_id = self._plane[(row // ww.TILE_SIZE) * self._tile_width + col // ww.TILE_SIZE]
+        if (pattern_id == 0):
+            return 0
+        return self._tile_states[pattern_id][row % ww.TILE_SIZE][col % ww.TILE_SIZE]
+
+    def _node(self, key):
+        '''
+            Returns number of the node, writing it out if it is new.
+            key - (level, nw, ne, sw, se)
+        '''
+        number = self._nodes.get(key)
+        if (number == None):
+            number = len(self._nodes) + 1
+            self._nodes[key] = number
+            self._f.write('%d %d %d %d %d\n' % key)
+        return number
+
+    def _region_key(self, level, row, col):
+        '''
+            Returns the key of the square of cells, which determines its contents:
+            its offset within the tile and pattern indices of the tiles it covers,
+            tiles outside the field counted as empty ones.
+            Where every covered row of tiles is a run of the same pattern uniform along its rows
+            (horizontal wires), the offset along the rows does not matter and the run is keyed
+            by its pattern alone; likewise for columns of tiles (vertical wires).
+            Returns None if all the covered tiles are empty.
+        '''
+        size = 1 << level
+        row -= self._row_offset
+        col -= self._col_offset
+        first_row = row // ww.TILE_SIZE
+        first_col = col // ww.TILE_SIZE
+        last_row = (row + size - 1) // ww.TILE_SIZE
+        last_col = (col + size - 1) // ww.TILE_SIZE
+        # tiles sticking out of the field on the left or the right
+        left_pad = (0,) * max(-first_col, 0)
+        right_pad = (0,) * max(last_col + 1 - self._tile_width, 0)
+        first_col = max(first_col, 0)
+        last_col = min(last_col, self._tile_width - 1)
+        covered = []
+        for r in range(first_row, last_row + 1):
+            if (r < 0 or r >= self._tile_height):
+                covered.append(left_pad + (0,) * (last_col - first_col + 1) + right_pad)
+                continue
+            start = r * self._tile_width
+            covered.append(left_pad + tuple(self._plane[start + first_col : start + last_col + 1]) + right_pad)
+        if (not any(map(any, covered))):
+            return None
+        row_offset = row % ww.TILE_SIZE
+        col_offset = col % ww.TILE_SIZE
+        if (all([len(set(line)) == 1 and self._row_uniform[line[0]] for line in covered])):
+            return (row_offset, None, tuple([line[0] for line in covered]))
+        columns = zip(*covered)
+        if (all([len(set(column)) == 1 and self._col_uniform[column[0]] for column in columns])):
+            return (None, col_offset, tuple([column[0] for column in columns]))
+        return (row_offset, col_offset, tuple(covered))
+
+    def _region_cells(self, size, row, col):
+        '''
+            Returns the states of the square of size x size cells with the top-left corner at (row, col),
+            a list of rows.
+        '''
+        row -= self._row_offset
+        col -= self._col_offset
+        empty = [0] * size
+        rows = []
+        for cell_row in range(row, row + size):
+            if (cell_row < 0 or cell_row >= self._height):
+                rows.append(empty)
+                continue
+            tile_row, row_in_tile = divmod(cell_row, ww.TILE_SIZE)
+            start = tile_row * self._tile_width
+            line = []
+            cell_col = col
+            while (cell_col < col + size):
+                if (cell_col < 0 or cell_col >= self._width):
+                    line.append(0)
+                    cell_col += 1
+                    continue
+                tile_col, col_in_tile = divmod(cell_col, ww.TILE_SIZE)
+                n = min(ww.TILE_SIZE - col_in_tile, col + size - cell_col)
+                pattern_id = self._plane[start + tile_col]
+                if (pattern_id == 0):
+                    line.extend([0] * n)
+                else:
+                    line.extend(self._tile_states[pattern_id][row_in_tile][col_in_tile : col_in_tile + n])
+                cell_col += n
+            rows.append(line)
+        return rows
+
+    def _build_cells(self, cells, level, row, col):
+        '''
+            Same as build(), for a square within cells (list of rows of states).
+        '''
+        if (level == 1):
+            states = (cells[row][col], cells[row][col + 1], cells[row + 1][col], cells[row + 1][col + 1])
+            if (states == (0, 0, 0, 0)):
+                return 0
+            return self._node((1,) + states)
+        half = 1 << (level - 1)
+        children = (self._build_cells(cells, level - 1, row, col), self._build_cells(cells, level - 1, row, col + half),
+                    self._build_cells(cells, level - 1, row + half, col), self._build_cells(cells, level - 1, row + half, col + half))
+        if (children == (0, 0, 0, 0)):
+            return 0
+        return self._node((level,) + children)
+
+    def build(self, level, row, col):
+        '''
+            Returns number of the node of the square of 2^level cells with the top-left corner at (row, col),
+            0 if it is empty.
+        '''
+        if (row >= self._height + self._row_offset or col >= self._width + self._col_offset):
+            return 0
+        if (level == 1):
+            states = (self._cell(row, col), self._cell(row, col + 1), self._cell(row + 1, col), self._cell(row + 1, col + 1))
+            if (states == (0, 0, 0, 0)):
+                return 0
+            return self._node((1,) + states)
+
+        if (level == _REGION_LEVEL):
+            region = self._region_key(level, row, col)
+            if (region == None):
+                return 0
+            number = self._regions.get(region)
+            if (number == None):
+                number = self._build_cells(self._region_cells(1 << level, row, col), level, 0, 0)
+                self._regions[region] = number
+            return number
+
+        half = 1 << (level - 1)
+        children = (self.build(level - 1, row, col), self.build(level - 1, row, col + half),
+                    self.build(level - 1, row + half, col), self.build(level - 1, row + half, col + half))
+        if (children == (0, 0, 0, 0)):
+            return 0
+        return self._node((level,) + children)
+
+
+def _build(f, tile_patterns, plane, tile_field, row_offset, col_offset):
+    '''
+        Builds the quadtree of the field with the given offset within the root, writing the nodes to f.
+        Returns tuple (root node number, root level, builder).
+    '''
+    builder = _QuadtreeBuilder(f, tile_patterns, plane, tile_field.get_width(), tile_field.get_height(),
+                               row_offset, col_offset)
+    level = 1
+    while ((1 << level) < builder.get_size()):
+        level += 1
+    return (builder.build(level, 0, 0), level, builder)
+
+
+def _choose_offsets(tile_patterns, plane, tile_field):
+    '''
+        Returns tuple (row_offset, col_offset) of the field within the root giving the fewest nodes.
+        Tiles are TILE_SIZE cells and quadtree nodes are powers of two, so where a tile falls
+        within the nodes, and how many distinct nodes the layout makes, depends on the offset.
+        Offsets of 0, 4, 8 and 12 cells are tried, rows first, then columns.
+    '''
+    def count(row_offset, col_offset):
+        return _build(_NodeCounter(), tile_patterns, plane, tile_field, row_offset, col_offset)[2].get_node_count()
+    offsets = range(0, 1 << _REGION_LEVEL, 4)
+    row_offset = min(offsets, key=lambda offset: (count(offset, 0), offset))
+    col_offset = min(offsets, key=lambda offset: (count(row_offset, offset), offset))
+    return (row_offset, col_offset)
+
+
+def write_macrocell(filename, tile_field, instances_dict, nets_dict):
+    '''
+        Writes the layout on the tile-level field (wireworld.TileLevelWireWorldUniverse)
+        to a Golly macrocell file.
+        Identical squares of cells are stored once, and the cell-level field is
+        never built, so the time and the file size grow with the number of
+        distinct pieces of the layout rather than with its area.
+        The layout is offset within the root so that it makes the fewest nodes (see _choose_offsets()),
+        the top-left corner of the root is above and to the left of it.
+        Returns the number of quadtree nodes written.
+    '''
+    tile_patterns, plane = tile_field.get_tile_patterns(instances_dict, nets_dict)
+    row_offset, col_offset = _choose_offsets(tile_patterns, plane, tile_field)
+
+    f = open(filename, 'w', _BUFFER_SIZE)
+    try:
+        f.write('[M2] (edif2ww)\n')
+        f.write('#R WireWorld\n')
+        root, level, builder = _build(f, tile_patterns, plane, tile_field, row_offset, col_offset)
+        if (root == 0):
+            # Golly needs at least one node
+            f.write('%d 0 0 0 0\n' % level)
+            return 1
+    finally:
+        f.close()
+    return builder.get_node_count()
+
+
+def read_macrocell(filename):
+    '''
+        Reads a WireWorld macrocell file.
+        Returns the pattern in the same format as rle_writer.read_rle():
+        a list of strings, one char per cell (SPACE, H, T or C), starting
+        at the top-left corner of the root node and ending at the last
+        row and column with a non-empty cell.
+    '''
+    chars = dict((state, c) for (c, state) in _MC_STATES.items())
+    nodes = [None]
+    f = open(filename, 'r')
+    for line in f:
+        line = line.strip()
+        if (line == '' or line.startswith('#') or line.startswith('[')):
+            continue
+        nodes.append([int(x) for x in line.split()])
+    f.close()
+
+    cells = {}  # {(row, col): char}
+    def fill(number, row, col):
+        if (number == 0):
+            return
+        node = nodes[number]
+        if (node[0] == 1):
+            for (i, state) in enumerate(node[1:]):
+                if (state != 0):
+                    cells[(row + i // 2, col + i % 2)] = chars[state]
+            return
+        half = 1 << (node[0] - 1)
+        fill(node[1], row, col)
+        fill(node[2], row, col + half)
+        fill(node[3], row + half, col)
+        fill(node[4], row + half, col + half)
+    if (len(nodes) > 1):
+        fill(len(nodes) - 1, 0, 0)
+
+    height = max([r + 1 for (r, c) in cells] + [0])
+    width = max([c + 1 for (r, c) in cells] + [0])
+    rows = [[' '] * width for r in range(height)]
+    for ((r, c), char) in cells.items():
+        rows[r][c] = char
+    return [''.join(row) for row in rows]
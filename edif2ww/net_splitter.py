@@ -4,60 +4,85 @@
 '''
 
 import wireworld_wires_library_tile6 as wires
+from netlist import Netlist
 
 def split_multiterminal_nets(nets, components):
     '''
-        Accepts a netlist and returns new netlist with multiterminal nets divided into several constituent 2-terminal nets.
-        Uses DIRECTED_JUNCTION instances to do its job.
+        Accepts a netlist and returns new netlist.Netlist with multiterminal nets divided into several constituent 2-terminal nets.
+        Uses DIRECTED_JUNCTION instances to do its job: a net with N sinks becomes a balanced tree
+        of N-1 junctions, ceil(log2(N)) junctions deep (see _split_multiterminal_net()).
         Components collection is needed so that this function can add freshly created DIRECTED_JUNCITON instances.
+        Nets are split before placement, so which sinks share branches of a tree is left as it is in the net,
+        and placement orders the junctions within their cascades like any other components.
         
+        The pass takes time linear in the total number of terminals.
         Original 2-terminals nets are copied by reference!
     '''
-    new_nets = {}
+    new_nets = Netlist(components)
     for net_name in nets:
         net = nets[net_name]
         term_count = len(net)
         if (term_count == 2):
             new_nets[net_name] = net # a pointer to the original list
-        elif (term_count == 3):
-            branches = _split_3_terminal_net(net, net_name, components)
+        elif (term_count > 2):
+            branches = _split_multiterminal_net(net, net_name, components)
             branch_counter = 0
             for branch in branches:
                 new_nets[net_name + '_BRANCH' + str(branch_counter)] = branch
                 branch_counter += 1
         else:
-            print 'Net splitter ERROR: Currently only 2- and 3-terminal nets are supported'
+            print 'Net splitter ERROR: net', net_name, 'has less than 2 terminals'
             
     return new_nets
     
-def _split_3_terminal_net(net, net_name, components):
+def _split_multiterminal_net(net, net_name, components):
     '''
         Returns a list of lists representing nets.
         Adds necessary instances to 'components' dict.
+        
+        Sinks are divided in two halves at every junction down from the source, so every sink
+        is the same number of junctions (give or take one) away from the source.
+        Output1 of a junction is faster than Output0 (see sta._OUTPUT_DELAYS), so it takes the larger half.
+        Sinks are taken in the order of the net, the first half goes to the upper output, Output0.
+        Nets of the terminals go first, in the order of the net, then the nets between junctions.
     '''
-    # creating a 3-junction instance
-    junction_name = net_name + '_JUNC'
-    jun = wires.DIRECTED_JUNCTION(junction_name)
-    components[junction_name] = jun
-    
-    # connecting junction to net endpoints
-    found_source = False
-    nets_to_add = []
-    output_index = 0
-    for endpoint in net:
+    source = None
+    sinks = [] # indices of the sink terminals in the net
+    for (index, endpoint) in enumerate(net):
         inst_name = endpoint[0]
-        inst = components[inst_name]
         port_name = endpoint[1]
-        
-        if (port_name in inst.get_output_port_names()):
-            if (found_source == True):
+        if (port_name in components[inst_name].get_output_port_names()):
+            if (source != None):
                 raise RuntimeError('Found net with more than one signal source: ' + net_name)
-            nets_to_add.append([(inst_name, port_name), (junction_name, 'Input')])
-            found_source = True
+            source = index
         else:
-            nets_to_add.append([(inst_name, port_name), (junction_name, 'Output' + str(output_index))])
-            output_index += 1
+            sinks.append(index)
+    if (source == None):
+        raise RuntimeError('Found net without a signal source: ' + net_name)
+    
+    terminal_nets = [None] * len(net)
+    junction_nets = []
+    junction_names = []
+    
+    def build_tree(first, last):
+        '''
+            Connects sinks[first:last] to a new junction (recursively through its subtrees).
+            Returns the input port of the junction.
+        '''
+        junction_name = net_name + '_JUNC'
+        if (len(junction_names) > 0):
+            junction_name += str(len(junction_names))
+        junction_names.append(junction_name)
+        components[junction_name] = wires.DIRECTED_JUNCTION(junction_name)
+        middle = first + (last - first) // 2
+        for (output_name, begin, end) in [('Output0', first, middle), ('Output1', middle, last)]:
+            output = (junction_name, output_name)
+            if (end - begin == 1):
+                terminal_nets[sinks[begin]] = [net[sinks[begin]], output]
+            else:
+                junction_nets.append([output, build_tree(begin, end)])
+        return (junction_name, 'Input')
     
-    return nets_to_add
+    terminal_nets[source] = [net[source], build_tree(0, len(sinks))]
+    return terminal_nets + junction_nets
     
-    
\ No newline at end of file
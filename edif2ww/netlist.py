@@ -0,0 +1,187 @@
+'''
+    EDIF2WW project file.
+    Indexed netlist used by the placement and routing stages.
+'''
+
+class Netlist:
+    '''
+        Collection of nets in the format {net_name: [(inst_name, port_name), ...]}.
+        It may be used as a dict of nets, but besides the nets it keeps
+        several indexes which are updated incrementally whenever a net is
+        added or removed, so all connectivity queries are O(1) instead of
+        scanning every net:
+        port -> net
+        instance -> incoming nets (ones connected to instance's input ports)
+        instance -> outgoing nets (ones connected to instance's output ports)
+        net -> driver port and net -> sink ports
+
+        Instances dict is needed to tell input ports from output ones.
+        It is held by reference, so instances created later
+        (feedthroughs, crossings, junctions) are visible as well.
+    '''
+
+    def __init__(self, instances, nets=None):
+        self._instances = instances
+        self._nets = {}
+        self._port_to_net = {}  # {(inst_name, port_name): net_name}
+        self._incoming = {}     # {inst_name: {net_name: True}}
+        self._outgoing = {}     # {inst_name: {net_name: True}}
+        self._drivers = {}      # {net_name: (inst_name, port_name) or None}
+        self._sinks = {}        # {net_name: [(inst_name, port_name), ...]}
+        if (nets != None):
+            for net_name in nets:
+                self[net_name] = nets[net_name]
+
+    def _is_output_port(self, port):
+        return port[1] in self._instances[port[0]].get_output_port_names()
+
+    ### dict-like access to nets
+    def __getitem__(self, net_name):
+        return self._nets[net_name]
+
+    def __setitem__(self, net_name, net):
+        if (net_name in self._nets):
+            del self[net_name]
+        self._nets[net_name] = net
+
+        driver = None
+        sinks = []
+        for port in net:
+            self._port_to_net[port] = net_name
+            if (self._is_output_port(port)):
+                driver = port
+                self._outgoing.setdefault(port[0], {})[net_name] = True
+            else:
+                sinks.append(port)
+                self._incoming.setdefault(port[0], {})[net_name] = True
+        self._drivers[net_name] = driver
+        self._sinks[net_name] = sinks
+
+    def __delitem__(self, net_name):
+        net = self._nets.pop(net_name)
+        for port in net:
+            if (self._port_to_net.get(port) == net_name):
+                del self._port_to_net[port]
+            self._outgoing.get(port[0], {}).pop(net_name, None)
+            self._incoming.get(port[0], {}).pop(net_name, None)
+        del self._drivers[net_name]
+        del self._sinks[net_name]
+
+    def __contains__(self, net_name):
+        return net_name in self._nets
+
+    def __iter__(self):
+        return iter(self._nets)
+
+    def __len__(self):
+        return len(self._nets)
+
+    def __repr__(self):
+        return repr(self._nets)
+
+    def keys(self):
+        return self._nets.keys()
+
+    def items(self):
+        return self._nets.items()
+
+    ### connectivity queries
+    def find_net(self, port):
+        '''
+            Returns name of the net connected to port (inst_name, port_name).
+        '''
+        if (port not in self._port_to_net):
+            raise RuntimeError('Cannot find net with port ' + str(port))
+        return self._port_to_net[port]
+
+    def find_other_port(self, port):
+        '''
+            Returns a port to which given port is connected by a 2-terminal net.
+        '''
+        net_name = self.find_net(port)
+        net = self._nets[net_name]
+        if (len(net) != 2):
+            raise RuntimeError('Expected a net to be 2-terminal: ' + net_name)
+        if (net[0] == port):
+            return net[1]
+        return net[0]
+
+    def get_driver(self, net_name):
+        '''
+            Returns the port (inst_name, port_name) which drives the net, or None.
+        '''
+        return self._drivers[net_name]
+
+    def get_sinks(self, net_name):
+        '''
+            Returns list of ports (inst_name, port_name) driven by the net.
+        '''
+        return self._sinks[net_name]
+
+    def get_incoming_nets(self, inst_name):
+        '''
+            Returns names of the nets connected to instance's input ports,
+            in the order of the instance's input ports.
+        '''
+        nets = self._incoming.get(inst_name, {})
+        result = []
+        for port_name in self._instances[inst_name].get_input_port_names():
+            net_name = self._port_to_net.get((inst_name, port_name))
+            if (net_name in nets):
+                result.append(net_name)
+        return result
+
+    def get_outgoing_nets(self, inst_name):
+        '''
+            Returns names of the nets connected to instance's output ports,
+            in the order of the instance's output ports.
+        '''
+        nets = self._outgoing.get(inst_name, {})
+        result = []
+        for port_name in self._instances[inst_name].get_output_port_names():
+            net_name = self._port_to_net.get((inst_name, port_name))
+            if (net_name in nets):
+                result.append(net_name)
+        return result
+
+    def get_adjacent(self, inst_name):
+        '''
+            Returns list of names of instances connected to the inst_name
+            by any net, regardless of its direction.
+        '''
+        adjacents = []
+        for index in (self._incoming, self._outgoing):
+            for net_name in index.get(inst_name, {}):
+                for (name, port) in self._nets[net_name]:
+                    if (name != inst_name):
+                        adjacents.append(name)
+        return adjacents
+
+    def get_topological_order(self):
+        '''
+            Returns names of all instances sorted so that every instance goes after
+            the drivers of its inputs (instances without driven inputs come first,
+            in the order of their names).
+            Raises RuntimeError if the netlist has a combinational loop.
+        '''
+        pending = {}
+        for inst_name in self._instances:
+            pending[inst_name] = 0
+        for net_name in self._nets:
+            if (self._drivers[net_name] != None):
+                for (inst_name, port_name) in self._sinks[net_name]:
+                    pending[inst_name] += 1
+
+        order = [inst_name for inst_name in sorted(pending) if pending[inst_name] == 0]
+        i = 0
+        while (i < len(order)):
+            for net_name in self._outgoing.get(order[i], {}):
+                for (inst_name, port_name) in self._sinks[net_name]:
+                    pending[inst_name] -= 1
+                    if (pending[inst_name] == 0):
+                        order.append(inst_name)
+            i += 1
+
+        if (len(order) != len(pending)):
+            raise RuntimeError('Netlist has a combinational loop through ' + str(len(pending) - len(order)) + ' instance(s)')
+        return order
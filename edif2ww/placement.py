@@ -3,76 +3,186 @@
     Placement part of Place-and-Route stage of Verilog-to-Wireworld transformation.
 '''
 
+import copy
+import multiprocessing
+import random
+
+import routing
 import wireworld as ww
 import wireworld_lpm_tile6 as lpm
 import wireworld_wires_library_tile6 as wires
 
-def do_cascade_placement(instances, nets, input_port_instance_names):
+def do_cascade_placement(instances, nets, input_port_instance_names, ordering='crossings', seed=None, verbose=True,
+                         channel_pitch=False):
+    '''
+        instances - dict of LPM and other instances with their names as keys
+        nets - netlist.Netlist of 2-terminal nets, modified in place
+        input_port_instance_names - names of MODULE_PORT instances of the module's inputs
+        ordering - how components are ordered within cascades:
+                   'crossings' - to minimize net crossings, 'random' - shuffled
+        seed - if given, components of every cascade are shuffled with random.Random(seed)
+               before they are ordered, so the ordering heuristics start from a different
+               order for every seed (see do_placement_trials()); the same seed gives the same placement
+        channel_pitch - if True, every channel between two cascades is made as wide as routing.assign_tracks()
+                        needs it, rather than spacing the cascades by CASCADE_PITCH
+        
+        Returns tuple (tile_field, cascades).
+    '''
     ### divide instances into cascades
-    fan_in_enable_counts = {} # holds the count of "enabled" in-edges for each vertex
-    visited_vertices = {}
-    current = list(input_port_instance_names) # a copy
-    newCurrent = []
-    cascades = []
-    while True:
-        cascades.append(list(current))
-        for x in current:
-            visited_vertices[x] = True
-            adjs = _get_adjacent(nets, x)
-            for adj in adjs: # find neighbors which have all inputs 'enabled'
-                if (adj in visited_vertices):
-                    continue
-                    
-                if (adj not in fan_in_enable_counts):
-                    fan_in_enable_counts[adj] = 0
-                
-                fan_in_enable_counts[adj] += 1
-                
-                goal = instances[adj].get_fan_in_count()
-                if (fan_in_enable_counts[adj] == goal):
-                    newCurrent.append(adj)
-    
-        if (len(newCurrent) == 0):
-            break
-        current = newCurrent
-        newCurrent = []
+    cascades = _divide_into_cascades(instances, nets, input_port_instance_names)
     
     ### add feedthroughs for later-used ports
     _add_feedthroughs(instances, nets, cascades)
     
-    ### 
-    _find_optimal_intracascade_ordering(instances, nets, cascades)
+    ### order components within cascades
+    rng = random
+    if (seed != None):
+        rng = random.Random(seed)
+    if (ordering == 'random'):
+        _shuffle_intracascade_ordering(instances, nets, cascades, rng)
+    elif (ordering == 'crossings'):
+        if (seed != None):
+            for cascade in cascades:
+                rng.shuffle(cascade)
+        _find_optimal_intracascade_ordering(instances, nets, cascades, verbose)
+    else:
+        raise RuntimeError('Placement: unknown ordering ' + str(ordering))
     
     ### add crossings
     _add_crossings(instances, nets, cascades)
     
     ### implement placement
-    tile_field = _place_cascades(instances, nets, cascades)
+    tile_field = _place_cascades(instances, nets, cascades, channel_pitch)
     
     return (tile_field, cascades)
     
-def _get_adjacent(nets, instance_name):
+def score_placement(instances, nets, tile_field):
     '''
-        Returns list of names of instances connected to the instance_name.
+        Scores a placement made by do_cascade_placement(), before routing.
+        Returns dict:
+        'crossings' - number of inserted crossing components
+        'area' - area of the tile field, in tiles
+        'wirelength' - estimated wirelength: sum of Manhattan distances
+                       between the tiles the router has to connect, in tiles
     '''
-    adjacents = []
-    for net_name in nets:
-        net = nets[net_name]
-        candidates = []
-        flag = False
+    crossings = 0
+    for inst in instances.values():
+        if (isinstance(inst, wires.DIRECTED_BICHANNEL_CROSSING)):
+            crossings += 1
+    wirelength = 0
+    for (net_name, net) in nets.items():
+        ends = []
+        for (inst_name, port_name) in net:
+            inst = instances[inst_name]
+            pos = inst.get_pos_in_tiles()
+            local_pos = inst.get_port_local_tile_pos(port_name)
+            ends.append((pos[0] + local_pos[0], pos[1] + local_pos[1]))
+        wirelength += abs(ends[0][0] - ends[1][0]) + abs(ends[0][1] - ends[1][1])
+    return {
+        'crossings': crossings,
+        'area': tile_field.get_width() * tile_field.get_height(),
+        'wirelength': wirelength,
+    }
+
+def _score_key(score):
+    # crossing components take whole cascades and a lot of routing, so they are the most important
+    return (score['crossings'], score['area'], score['wirelength'])
+
+# The design placed by the trials of the current worker process (see _init_trial_worker)
+_trial_design = None
+
+def _init_trial_worker(instances, nets, input_port_instance_names, ordering, channel_pitch):
+    global _trial_design
+    _trial_design = (instances, nets, input_port_instance_names, ordering, channel_pitch)
+
+def _run_trial(seed):
+    '''
+        Places a copy of the design of the worker with the seed.
+        Returns tuple (seed, score).
+    '''
+    instances, nets = copy.deepcopy(_trial_design[:2])
+    input_port_instance_names, ordering, channel_pitch = _trial_design[2:]
+    tile_field, cascades = do_cascade_placement(instances, nets, input_port_instance_names, ordering, seed, verbose=False,
+                                                channel_pitch=channel_pitch)
+    return (seed, score_placement(instances, nets, tile_field))
+
+def do_placement_trials(instances, nets, input_port_instance_names, trials, jobs=1, seed=0, ordering='crossings',
+                        channel_pitch=False):
+    '''
+        Runs do_cascade_placement() with seeds seed, seed+1, ..., seed+trials-1 on copies of the design,
+        in a pool of jobs processes, and scores every placement with score_placement():
+        fewest crossing components first, then the smallest area, then the shortest wirelength.
+        Only the best placement goes on to routing: it is repeated in this process
+        on a copy of the design made the same way as for the trials.
+        The passed instances and nets are left as they are.
         
-        for (name, port) in net: # TODO is this legal?
-            if (name != instance_name):
-                candidates.append(name)
-            if (name == instance_name):
-                flag = True
+        Returns tuple (instances, nets, tile_field, cascades, best_seed, results):
+        instances, nets - the placed copy of the design
+        results - list of tuples (seed, score) of all the trials in the order of seeds.
+        do_placement_trials(..., trials=1, seed=best_seed) reproduces the chosen placement.
+    '''
+    if (trials < 1):
+        raise RuntimeError('Placement: number of trials must be positive')
+    seeds = range(seed, seed + trials)
+    design = (instances, nets, input_port_instance_names, ordering, channel_pitch)
+    if (jobs > 1 and trials > 1):
+        pool = multiprocessing.Pool(processes=min(jobs, trials), initializer=_init_trial_worker, initargs=design)
+        try:
+            results = pool.map(_run_trial, seeds)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        _init_trial_worker(*design)
+        results = [_run_trial(trial_seed) for trial_seed in seeds]
+    
+    best_seed = min(results, key=lambda result: (_score_key(result[1]), result[0]))[0]
+    # a copy rather than the design itself, dict ordering of the copies may differ from the original
+    instances, nets = copy.deepcopy((instances, nets))
+    tile_field, cascades = do_cascade_placement(instances, nets, input_port_instance_names, ordering, best_seed, verbose=False,
+                                                channel_pitch=channel_pitch)
+    return (instances, nets, tile_field, cascades, best_seed, results)
+    
+def _divide_into_cascades(instances, nets, input_port_instance_names):
+    '''
+        Levelizes the netlist starting from module's inputs.
+        Each cascade holds instances whose inputs are all driven by previous cascades.
         
-        if (flag == True):
-            for name in candidates:
-                adjacents.append(name)
-                
-    return adjacents
+        Kahn's topological sort by levels over the driver -> sink adjacency, which is built
+        once from the nets, so the whole levelization takes O(V + E).
+        Instances not reachable from the inputs are left out, as well as ones on combinational loops.
+    '''
+    sinks = _get_sink_instances(instances, nets)
+    pending = {} # number of inputs of each instance not driven by visited instances yet
+    for inst_name in sinks:
+        for sink_name in sinks[inst_name]:
+            pending[sink_name] = pending.get(sink_name, 0) + 1
+    
+    current = list(input_port_instance_names) # a copy
+    cascades = []
+    while (len(current) > 0):
+        cascades.append(current)
+        next_cascade = []
+        for inst_name in current:
+            for sink_name in sinks[inst_name]:
+                pending[sink_name] -= 1
+                if (pending[sink_name] == 0):
+                    next_cascade.append(sink_name)
+        current = next_cascade
+    
+    return cascades
 
+def _get_sink_instances(instances, nets):
+    '''
+        Returns {inst_name: names of the instances driven by its outputs},
+        one entry per driven input port, in the order of the output ports.
+    '''
+    sinks = {}
+    for inst_name in instances:
+        sinks[inst_name] = []
+        for net_name in nets.get_outgoing_nets(inst_name):
+            sinks[inst_name] += [sink[0] for sink in nets.get_sinks(net_name)]
+    return sinks
     
 def _add_feedthroughs(instances, nets, cascades):
     '''
@@ -91,21 +201,22 @@ def _add_feedthroughs(instances, nets, cascades):
         prev_cascade = cascades[ind]
         next_cascade = cascades[ind+1]
         output_ports = []
-        input_ports = []
+        input_ports = {}
         for left_inst_name in prev_cascade:
             ports = instances[left_inst_name].get_output_port_names()
             output_ports += [(left_inst_name, port) for port in ports]
         for right_inst_name in next_cascade:
             ports = instances[right_inst_name].get_input_port_names()
-            input_ports += [right_inst_name+'.'+port for port in ports]
+            for port in ports:
+                input_ports[(right_inst_name, port)] = True
         
         # exclude ports which are endpoints of nets that connect these two cascades
         # leave only ports (should be outputs) which are not connected to the next cascade, but rather are postponed
         postponed_ports = []
         for left_port in output_ports:
-            net_name, other_port = _netlist_operations_find_net_and_other_port(nets, left_port)
-            port_str = other_port[0] + '.' + other_port[1]
-            if (port_str not in input_ports): # TODO is 'tuple in list' allowed?
+            net_name = nets.find_net(left_port)
+            other_port = nets.find_other_port(left_port)
+            if (other_port not in input_ports):
                 postponed_ports.append((left_port, other_port, net_name))
         #print 'POSTPONED PORTS FOR CASCADES', ind, 'AND', ind+1, ':'
         #print postponed_ports
@@ -136,52 +247,199 @@ def _add_feedthroughs(instances, nets, cascades):
             nets[seg1_name] = [(thru_name, 'Output'), other_port]
             
     
-def _netlist_operations_find_net_and_other_port(nets, port):
-    for net_name in nets:
-        net = nets[net_name]
-        if (len(net) != 2):
-            raise RuntimeError('Expected a net to be 2-terminal: ' + net_name)
-        if (net[0][0] == port[0] and net[0][1] == port[1]):
-            return (net_name, net[1])
-        elif (net[1][0] == port[0] and net[1][1] == port[1]):
-            return (net_name, net[0])
-    # if got here, then no net was found
-    raise RuntimeError('Cannot find net with port ' + str(port))
-    
-def _netlist_operations_find_net(nets, port):
-    for net_name in nets:
-        net = nets[net_name]
-        if (len(net) != 2):
-            raise RuntimeError('Expected a net to be 2-terminal: ' + net_name)
-        if (net[0][0] == port[0] and net[0][1] == port[1]):
-            return (net_name, net)
-        elif (net[1][0] == port[0] and net[1][1] == port[1]):
-            return (net_name, net)
-    # if got here, then no net was found
-    raise RuntimeError('Cannot find net with port ' + str(port))
-    
-    
-def _netlist_operations_find_the_other_port(nets, port):
-    '''
-        Returns a port to which given port is connected.
-    '''
-    for net_name in nets:
-        net = nets[net_name]
-        if (len(net) != 2):
-            raise RuntimeError('Expected a net to be 2-terminal: ' + net_name)
-        if (net[0][0] == port[0] and net[0][1] == port[1]):
-            return net[1]
-        elif (net[1][0] == port[0] and net[1][1] == port[1]):
-            return net[0]
-    # if got here, then no net was found
-    raise RuntimeError('Cannot find net with port ' + str(port))
+# Sweeps of the layer-by-layer ordering heuristics, and passes of the transpose refinement after each sweep.
+# Sweeping stops early after ORDERING_PATIENCE sweeps without improvement.
+ORDERING_SWEEPS = 8
+ORDERING_PATIENCE = 2
+TRANSPOSE_PASSES = 4
 
+def _find_optimal_intracascade_ordering(instances, nets, cascades, verbose=True):
+    '''
+        Orders components inside each cascade so that as few nets between neighboring cascades
+        cross as possible, since _add_crossings() pays for the crossings with whole cascades
+        of crossing components.
+        Cascades are ordered like layers of a layered graph drawing: sweeps go down and up
+        the cascades sorting each one by the barycenters (then, separately, the medians) of
+        the positions of the ports its components are connected to in the previous cascade,
+        and every sweep is followed by transposition of neighboring components while that
+        removes crossings. The best ordering found is kept.
+        Returns tuple (crossings before, crossings after).
+    '''
+    links = _get_links(instances, nets, cascades)
+    before = _count_all_crossings(links, cascades)
+    best = before
+    best_cascades = [list(cascade) for cascade in cascades]
+    for use_median in [False, True]:
+        idle_sweeps = 0
+        for sweep in range(ORDERING_SWEEPS):
+            for idx in range(1, len(cascades)):
+                _sort_by_neighbors(links, cascades[idx], cascades[idx-1], True, use_median)
+            for idx in range(len(cascades)-2, -1, -1):
+                _sort_by_neighbors(links, cascades[idx], cascades[idx+1], False, use_median)
+            for transpose_pass in range(TRANSPOSE_PASSES):
+                if (not _transpose(links, cascades)):
+                    break
+            crossings = _count_all_crossings(links, cascades)
+            if (crossings < best):
+                best = crossings
+                best_cascades = [list(cascade) for cascade in cascades]
+                idle_sweeps = 0
+            else:
+                idle_sweeps += 1
+            if (best == 0 or idle_sweeps >= ORDERING_PATIENCE):
+                break
+    for idx in range(len(cascades)):
+        cascades[idx][:] = best_cascades[idx]
+    if (verbose): print 'Intra-cascade ordering: %d net crossings -> %d' % (before, best)
+    return (before, best)
 
-import random
-def _find_optimal_intracascade_ordering(instances, nets, cascades):
-    print 'WARNING: Randomly shuffling components within cascades'
+def _shuffle_intracascade_ordering(instances, nets, cascades, rng=random):
+    '''
+        Random ordering of components within cascades, for comparison with the optimized one.
+        Returns tuple (crossings before, crossings after).
+    '''
+    links = _get_links(instances, nets, cascades)
+    before = _count_all_crossings(links, cascades)
     for cascade in cascades:
-        random.shuffle(cascade)
+        rng.shuffle(cascade)
+    return (before, _count_all_crossings(links, cascades))
+
+def _get_links(instances, nets, cascades):
+    '''
+        Returns {inst_name: (input ports, ports the inputs are connected to,
+                             output ports, ports the outputs are connected to)},
+        ports of the component listed from top to bottom.
+        Ports are (inst_name, port_name); unconnected ones are connected to None.
+    '''
+    other_port = {}
+    for (net_name, net) in nets.items():
+        if (len(net) == 2):
+            other_port[net[0]] = net[1]
+            other_port[net[1]] = net[0]
+    links = {}
+    for cascade in cascades:
+        for inst_name in cascade:
+            inst = instances[inst_name]
+            ends = []
+            for port_names in [inst.get_input_port_names_sorted(), inst.get_output_port_names_sorted()]:
+                ports = [(inst_name, port_name) for port_name in port_names]
+                ends += [ports, [other_port.get(port) for port in ports]]
+            links[inst_name] = tuple(ends)
+    return links
+
+def _port_positions(links, cascade, outputs):
+    '''
+        Returns {(inst_name, port_name): order number from top} for output or input ports of the cascade.
+    '''
+    positions = {}
+    side = 0
+    if (outputs):
+        side = 2
+    for inst_name in cascade:
+        for port in links[inst_name][side]:
+            positions[port] = len(positions)
+    return positions
+
+def _neighbor_positions(links, inst_name, neighbor_positions, left):
+    '''
+        Returns positions of the ports in the neighboring cascade connected to the component's ports,
+        in the order of its ports from top to bottom. Left neighbor cascade is connected to inputs.
+    '''
+    if (left):
+        others = links[inst_name][1]
+    else:
+        others = links[inst_name][3]
+    return [neighbor_positions[port] for port in others if port in neighbor_positions]
+
+def _sort_by_neighbors(links, cascade, neighbor, left, use_median):
+    '''
+        Sorts the cascade by the barycenter or the median of the positions of the ports
+        connected to its components in the neighboring cascade. Components without connections keep their place.
+    '''
+    neighbor_positions = _port_positions(links, neighbor, left)
+    keys = {}
+    for (idx, inst_name) in enumerate(cascade):
+        positions = _neighbor_positions(links, inst_name, neighbor_positions, left)
+        if (len(positions) == 0):
+            keys[inst_name] = (idx * len(neighbor_positions) / float(max(len(cascade), 1)), idx)
+        elif (use_median):
+            positions.sort()
+            keys[inst_name] = ((positions[(len(positions)-1) // 2] + positions[len(positions) // 2]) / 2.0, idx)
+        else:
+            keys[inst_name] = (sum(positions) / float(len(positions)), idx)
+    cascade.sort(key=lambda inst_name: keys[inst_name])
+
+def _count_pair_crossings(positions_a, positions_b):
+    '''
+        Number of crossings between the nets of two components, the first above the second:
+        pairs of nets whose other ends are in the opposite order.
+    '''
+    count = 0
+    for a in positions_a:
+        for b in positions_b:
+            if (a > b):
+                count += 1
+    return count
+
+def _transpose(links, cascades):
+    '''
+        Swaps neighboring components of every cascade when it removes crossings with both neighboring cascades.
+        Returns True if anything was swapped.
+    '''
+    swapped = False
+    for idx in range(len(cascades)):
+        cascade = cascades[idx]
+        left_positions = {}
+        right_positions = {}
+        if (idx > 0):
+            left_positions = _port_positions(links, cascades[idx-1], True)
+        if (idx < len(cascades) - 1):
+            right_positions = _port_positions(links, cascades[idx+1], False)
+        ends = {}
+        for inst_name in cascade:
+            ends[inst_name] = (_neighbor_positions(links, inst_name, left_positions, True),
+                               _neighbor_positions(links, inst_name, right_positions, False))
+        for i in range(len(cascade) - 1):
+            u = ends[cascade[i]]
+            v = ends[cascade[i+1]]
+            kept = _count_pair_crossings(u[0], v[0]) + _count_pair_crossings(u[1], v[1])
+            exchanged = _count_pair_crossings(v[0], u[0]) + _count_pair_crossings(v[1], u[1])
+            if (exchanged < kept):
+                cascade[i], cascade[i+1] = cascade[i+1], cascade[i]
+                swapped = True
+    return swapped
+
+def _count_crossings(links, left_cascade, right_cascade):
+    '''
+        Returns the number of pairs of crossing nets between two neighboring cascades.
+    '''
+    right_positions = _port_positions(links, right_cascade, False)
+    sequence = []
+    for inst_name in left_cascade:
+        sequence += _neighbor_positions(links, inst_name, right_positions, False)
+    return _count_inversions(sequence)
+
+def _count_inversions(sequence):
+    '''
+        Counts pairs i < j with sequence[i] > sequence[j] by merge sort.
+    '''
+    if (len(sequence) < 2):
+        return 0
+    middle = len(sequence) // 2
+    left = sequence[:middle]
+    right = sequence[middle:]
+    count = _count_inversions(left) + _count_inversions(right)
+    left.sort()
+    right.sort()
+    j = 0
+    for a in left:
+        while (j < len(right) and right[j] < a):
+            j += 1
+        count += j
+    return count
+
+def _count_all_crossings(links, cascades):
+    return sum([_count_crossings(links, cascades[idx], cascades[idx+1]) for idx in range(len(cascades) - 1)])
 
             
 def _add_crossings(instances, nets, cascades):
@@ -219,8 +477,8 @@ def _add_crossings(instances, nets, cascades):
             # it is sufficient to check whether any two currently neighboring nets cross.
             left_port_1 = left_ports[i]     
             left_port_2 = left_ports[i+1]   
-            right_port_1 = _netlist_operations_find_the_other_port(nets, left_port_1)
-            right_port_2 = _netlist_operations_find_the_other_port(nets, left_port_2)
+            right_port_1 = nets.find_other_port(left_port_1)
+            right_port_2 = nets.find_other_port(left_port_2)
             right_port_1_pos = right_ports_pos[right_port_1]
             right_port_2_pos = right_ports_pos[right_port_2]
             if (right_port_1_pos > right_port_2_pos): # if port_1 is below port_2
@@ -235,13 +493,15 @@ def _add_crossings(instances, nets, cascades):
             new_cascade = []
             while i < len(left_ports):
                 left_port_1 = left_ports[i]     
-                net_name_1, right_port_1 = _netlist_operations_find_net_and_other_port(nets, left_port_1)
+                net_name_1 = nets.find_net(left_port_1)
+                right_port_1 = nets.find_other_port(left_port_1)
                 right_port_1_pos = right_ports_pos[right_port_1]
                 
                 there_is_bottom_port = False
                 if ((i+1) < len(left_ports)):
                     left_port_2 = left_ports[i+1]   
-                    net_name_2, right_port_2 = _netlist_operations_find_net_and_other_port(nets, left_port_2)
+                    net_name_2 = nets.find_net(left_port_2)
+                    right_port_2 = nets.find_other_port(left_port_2)
                     right_port_2_pos = right_ports_pos[right_port_2]
                     there_is_bottom_port = True
                 
@@ -284,34 +544,60 @@ def _add_crossings(instances, nets, cascades):
         idx += 1
             
 
-def _place_cascades(instances, nets, cascades):
+# Cascades are placed in columns of this width (in tiles)
+CASCADE_PITCH = 9
+# Free space around the placed cascades which is left for routing (in tiles)
+MARGIN_ROWS = 9
+MARGIN_COLS = 3
+
+def _place_cascades(instances, nets, cascades, channel_pitch=False):
     '''
         Places components divided into cascades.
         Determines the optimal ordering of components inside each cascade.
         Ordering of cascades is fixed and as is passed in the list.
+        
+        Cascades are CASCADE_PITCH columns apart, or, with channel_pitch, each channel
+        between two cascades gets as many free columns as routing.assign_tracks() needs for its nets,
+        plus one for every net it leaves out.
+        The tile field is sized to the bounding box of the placed cascades
+        plus the routing margin around it. The router grows it if it needs more room.
     '''
-    width = len(instances) * 9 + 9 # will make it wiser, I promise
-    height = width
-    tile_field = ww.TileLevelWireWorldUniverse(width = width, height = height)
-
-    offset_row = 9
-    offset_col = 3
+    tallest_cascade = 0
     for cascade in cascades:
+        cascade_height = sum([instances[inst_name].get_size_in_tiles()[0] for inst_name in cascade])
+        tallest_cascade = max(tallest_cascade, cascade_height)
+    
+    # rows do not depend on the columns, so components are stacked first
+    # and the channels are measured on these positions
+    cascade_cols = []
+    offset_col = MARGIN_COLS
+    for cascade in cascades:
+        offset_row = MARGIN_ROWS
+        for inst_name in cascade:
+            instances[inst_name].set_pos_in_tiles(row = offset_row, col = offset_col)
+            offset_row += instances[inst_name].get_size_in_tiles()[0]
+        cascade_cols.append(offset_col)
+        offset_col += CASCADE_PITCH
+    if (channel_pitch):
+        offset_col = MARGIN_COLS
+        for k in range(len(cascades) - 1):
+            channel_nets, first_track_col = routing.get_channel_nets(nets, instances, cascades, k)
+            tracks, width, rejected = routing.assign_tracks(channel_nets)
+            # the free columns and the column of the input port locations of cascade k+1
+            pitch = first_track_col - cascade_cols[k] + width + len(rejected) + 1
+            cascade_cols[k] = offset_col
+            offset_col += pitch
+        cascade_cols[-1] = offset_col
+        offset_col += CASCADE_PITCH
+    
+    width = offset_col + MARGIN_COLS
+    height = MARGIN_ROWS + tallest_cascade + MARGIN_ROWS
+    tile_field = ww.TileLevelWireWorldUniverse(width = width, height = height)
+    for (cascade, col) in zip(cascades, cascade_cols):
         for inst_name in cascade:
             inst = instances[inst_name]
-
-            row = offset_row
-            col = offset_col
-            
+            row = inst.get_pos_in_tiles()[0]
             tile_field.place_component(row = row, col = col, component = inst)
             inst.set_pos_in_tiles(row = row, col = col)
-            
-            inst_height = inst.get_size_in_tiles()[0]
-            offset_row += inst_height
-            
-        offset_col += 9
-        offset_row = 9
-    
     
     return tile_field
-    
\ No newline at end of file
@@ -23,40 +23,156 @@
     x = width, y = height, rule = rule
 '''
 
-def write_rle(filename, pattern):
+import re
+
+# Cell states of the input pattern -> Extended RLE symbols
+_RLE_STATES = {' ': '.', 'H': 'A', 'T': 'B', 'C': 'C'}
+
+# Golly keeps RLE lines up to 70 chars long
+RLE_LINE_WIDTH = 70
+
+# Output buffer size
+_BUFFER_SIZE = 1 << 20
+
+_RUN = re.compile(r'(.)\1*')
+
+
+class _RleLineWriter:
+    '''
+        Collects RLE items (such as '12C' or '3$') into lines of at most
+        line_width chars, never splitting an item, and writes every full line out.
+    '''
+    def __init__(self, f, line_width):
+        self._f = f
+        self._line_width = line_width
+        self._line = []
+        self._line_len = 0
+
+    def put(self, item):
+        if (self._line_len + len(item) > self._line_width and self._line_len > 0):
+            self._f.write(''.join(self._line) + '\n')
+            self._line = []
+            self._line_len = 0
+        self._line.append(item)
+        self._line_len += len(item)
+
+    def flush(self):
+        if (self._line_len > 0):
+            self._f.write(''.join(self._line) + '\n')
+            self._line = []
+            self._line_len = 0
+
+
+def _run_item(n, symbol):
+    if (n == 1):
+        return symbol
+    return str(n) + symbol
+
+
+def write_rle(filename, pattern, line_width=RLE_LINE_WIDTH):
     '''
         Function accepts CA pattern in a full
         cell-by-cell notation and produces
         Extended RLE file for it.
         
         Input pattern format is such:
-        It is a 1D list of strings where
-        each char in a string represents a state of a particular cell. 
+        It is a 1D list of rows, strings or lists of chars, where
+        each char represents a state of a particular cell. 
         States are:
         SPACE   empty
         H       electron head
         T       electron tail
         C       conductor
+        
+        Cells of the same state in a row are written as runs ('<count><state>'),
+        empty cells at the end of a row are dropped, and consecutive row ends
+        are merged ('<count>$'), so blank rows cost nothing.
+        The file is written row by row, the pattern is never converted as a whole.
     '''
-    f = open(filename, 'w')
-    
-    # writing header
-    f.write('x = 42, y = 42, rule = WireWorld\n') 
-    
-    # writing pattern
-    for input_line in pattern:
-        output_line = ''
-        for c in input_line:
-            if (c == ' '):
-                output_line += '.'
-            elif (c == 'H'):
-                output_line += 'A'
-            elif (c == 'T'):
-                output_line += 'B'
-            elif (c == 'C'):
-                output_line += 'C'
-        output_line += '$\n'
-        f.write(output_line)
+    height = len(pattern)
+    width = 0
+    for row in pattern:
+        width = max(width, len(row))
     
+    f = open(filename, 'w', _BUFFER_SIZE)
+    try:
+        # writing header
+        f.write('x = %d, y = %d, rule = WireWorld\n' % (width, height))
+        
+        # writing pattern
+        out = _RleLineWriter(f, line_width)
+        row_ends = 0    # row ends not written yet
+        for row in pattern:
+            if (not isinstance(row, str)):
+                row = ''.join(row)
+            row = row.rstrip(' ')
+            if (row != ''):
+                if (row_ends > 0):
+                    out.put(_run_item(row_ends, '$'))
+                    row_ends = 0
+                for m in _RUN.finditer(row):
+                    symbol = _RLE_STATES.get(m.group(1))
+                    if (symbol == None):
+                        raise RuntimeError('RLE writer: unknown cell state "' + m.group(1) + '"')
+                    out.put(_run_item(m.end() - m.start(), symbol))
+            row_ends += 1
+        out.put('!')
+        out.flush()
+    finally:
+        f.close()
+
+
+def read_rle(filename):
+    '''
+        Reads Extended RLE file with a WireWorld pattern.
+        Returns the pattern in the same format as accepted by write_rle():
+        a list of strings, one char per cell (SPACE, H, T or C).
+        Rows are padded with spaces to the width from the header
+        or to the width of the longest row, blank rows are added
+        up to the height from the header.
+    '''
+    states = {'.': ' ', 'A': 'H', 'B': 'T', 'C': 'C'}
+    width = 0
+    height = 0
+    rows = []
+    row = []
+    count = ''
+    finished = False
+    f = open(filename, 'r')
+    for line in f:
+        if (finished):
+            break
+        line = line.strip()
+        if (line.startswith('#') or line == ''):
+            continue
+        if (line.startswith('x')): # header
+            for item in line.split(','):
+                key, value = item.split('=')
+                if (key.strip() == 'x'):
+                    width = int(value)
+                elif (key.strip() == 'y'):
+                    height = int(value)
+            continue
+        for c in line:
+            if (c.isdigit()):
+                count += c
+                continue
+            n = 1
+            if (count != ''):
+                n = int(count)
+                count = ''
+            if (c == '$'):
+                rows.append(''.join(row))
+                rows += [''] * (n - 1)
+                row = []
+            elif (c == '!'):
+                finished = True
+                break
+            else:
+                row.append(states[c] * n)
     f.close()
-    
+    if (len(row) > 0):
+        rows.append(''.join(row))
+    rows += [''] * (height - len(rows))
+    width = max([width] + [len(r) for r in rows])
+    return [r.ljust(width) for r in rows]
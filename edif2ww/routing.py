@@ -3,149 +3,1133 @@
     Implements the routing part of the Place-&-Route process.
 '''
 
-#import wireworld as ww # what about multiple import?
+import wireworld as ww
 
-def do_cascade_routing(tile_field, nets, instances, cascades):
+import collections
+import heapq
+import multiprocessing
+import time
+from array import array
+
+def do_cascade_routing(tile_field, nets, instances, cascades, router='negotiated', channel_jobs=0):
     '''
         tile_field - wireworld.TileLevelWireWorldUniverse instance (need to import?)
-        nets - dict of nets as their names as keys
+        nets - netlist.Netlist of nets with their names as keys
         instances - dict of LPM and other instances with their names as keys
+        router - 'negotiated' - nets may share tiles for a while and are ripped up and rerouted
+                                until none do, see route_negotiated();
+                 'greedy' - nets are routed one at a time and never ripped up;
+                 'tracks' - the channels between cascades are routed by track assignment,
+                            the rest of the nets by the negotiated router, see route_tracks()
+        channel_jobs - if positive, the channels between neighbouring cascades are routed
+                       separately in a pool of this many processes, see route_channels()
         
         Function performs operations on tile_field in place.
+        Returns dict {net_name: list of (row, col) tiles of the routed wire},
+        nets which could not be routed are not included.
+    '''
+    net_order = get_net_order(nets, cascades)
+    for net_name in net_order:
+        if (len(nets[net_name]) != 2):
+            raise RuntimeError('Routing error: currently only 2-terminal nets are supported')
+    
+    if (router not in ('negotiated', 'greedy', 'tracks')):
+        raise RuntimeError('Routing error: unknown router ' + str(router))
+    if (router == 'tracks' and channel_jobs > 0):
+        raise RuntimeError('Routing error: the tracks router does not route channels in separate processes')
+    reset_search_window_counts()
+    reset_route_cache()
+    if (router == 'tracks'):
+        routes, report = route_tracks(tile_field, nets, instances, net_order, cascades)
+        print_tracks_report(report)
+    elif (channel_jobs > 0):
+        routes, report = route_channels(tile_field, nets, instances, net_order, cascades, router, channel_jobs)
+        print_channel_report(report)
+    elif (router == 'negotiated'):
+        routes, report = route_negotiated(tile_field, nets, instances, net_order)
+        print_report(report)
+    else:
+        routes = {}
+        for net_name in net_order:
+            path = wave_route_wire(tile_field, instances, net_name, nets[net_name])
+            if (path != None):
+                routes[net_name] = path
+    print_search_window_counts()
+    print_route_cache_stats()
+    return routes
+
+def get_net_order(nets, cascades):
+    '''
+        Returns names of the nets in the order of routing: cascade by cascade,
+        nets connected to inputs of the components from top to bottom.
     '''
-    # divide nets into cascades as well
-    net_cascades = []
+    net_order = []
     for cascade in cascades:
-        net_cascade = []
         for inst_name in cascade:
-            net_cascade += _find_incoming_nets(nets, instances[inst_name])
-        net_cascades.append(list(net_cascade))
-    
-    # route nets according to the order
-    for net_cascade in net_cascades:
-        for net_name in net_cascade:
-            net = nets[net_name]
-            if (len(net) != 2):
-                raise RuntimeError('Routing error: currently only 2-terminal nets are supported')
-            wave_route_wire(tile_field, instances, net_name, nets[net_name])
-        
-def _find_incoming_nets(nets, inst):
-    result = []
-    input_port_names = inst.get_input_port_names()
-    inst_name = inst.get_name()
-    
-    for net_name in nets:
-        net = nets[net_name]
-        for endpoint in net:
-            if (endpoint[0] == inst_name and endpoint[1] in input_port_names):
-                result.append(net_name)
-    
-    return result
+            net_order += nets.get_incoming_nets(inst_name)
+    return net_order
+        
+# When a net cannot be routed because the field is too small, the field
+# is grown by this many rows and columns (in tiles), at most this many times per net
+FIELD_GROWTH_STEP = 9
+MAX_FIELD_GROWTHS = 4
+
+class _SearchGrids:
+    '''
+        Distance and visit-stamp grids of the router.
+        They are allocated once per tile field size and reused by every routed net.
+        Instead of clearing the grids between nets, each search gets a new
+        generation number: a tile whose stamp differs from the current
+        generation is considered unvisited.
+    '''
+    def __init__(self, height, width):
+        self.height = height
+        self.width = width
+        self.dist = array('i', [0]) * (height * width)
+        self.stamp = array('i', [0]) * (height * width)
+        self.generation = 0
+
+    def new_search(self):
+        '''
+            Returns a fresh generation number, invalidating all previous visits.
+        '''
+        if (self.generation == 0x7fffffff): # stamp overflow, have to clear once in a while
+            self.stamp = array('i', [0]) * (self.height * self.width)
+            self.generation = 0
+        self.generation += 1
+        return self.generation
+
+_search_grids = None
+
+def _get_search_grids(fld):
+    global _search_grids
+    if (_search_grids == None or _search_grids.height != fld.get_height() or _search_grids.width != fld.get_width()):
+        _search_grids = _SearchGrids(fld.get_height(), fld.get_width())
+    return _search_grids
 
 def wave_route_wire(fld, instances, net_name, net):
     '''
-        Performs Wave propagation algorithm
+        Performs A* search (Manhattan distance heuristic) for a shortest path
         and draws a WireWorld conductor wire between
         terminals given in 'net' paremeter in format:
         [(inst_name, port_name), (inst_name, port_name), ...].
+        
+        Returns list of (row, col) tiles of the drawn wire from the first terminal
+        to the second one, or None if the net could not be routed.
+        Each tile delays the signal by TILE_SIZE generations.
+    '''
+    terminals = _get_terminals(fld, instances, net_name, net)
+    if (terminals == None):
+        return None
+    path = _wave_route_terminals(fld, net_name, terminals)
+    if (path == None):
+        print 'Routing error - Ports planarly unreachable:', net[0][0]+'.'+net[0][1], 'and', net[1][0]+'.'+net[1][1]
+    return path
+
+def _wave_route_terminals(fld, net_name, terminals, max_growths=MAX_FIELD_GROWTHS):
     '''
-    ## calculating start and destination global coordinates in tile space
-    inst_a_name = net[0][0]
-    inst_a = instances[inst_a_name]
-    inst_a_port_name = net[0][1]
-    inst_a_pos = inst_a.get_pos_in_tiles()
-    port_a_local_pos = inst_a.get_port_local_tile_pos(inst_a_port_name)
-    port_a_global_pos = _add_coords( inst_a_pos, port_a_local_pos )
-    port_a_full_name = inst_a_name + '.' + inst_a_port_name
-    
-    inst_b_name = net[1][0]
-    inst_b = instances[inst_b_name]
-    inst_b_port_name = net[1][1]
-    inst_b_pos = inst_b.get_pos_in_tiles()
-    port_b_local_pos = inst_b.get_port_local_tile_pos(inst_b_port_name)
-    port_b_global_pos = _add_coords( inst_b_pos, port_b_local_pos )
-    port_b_full_name = inst_b_name + '.' + inst_b_port_name
-    
-    ## passable labels for this net
-    passable_tile_labels = [' ', port_a_full_name, port_b_full_name]
-    
-    ## starting wave algo
-    start = port_a_global_pos
-    dest = port_b_global_pos
-    if (fld.get(start[0], start[1]) not in passable_tile_labels):
-        print 'Routing error - one of the terminals of net "' + net_name + '" is occupied by something with label "' + str(fld.get(start[0], start[1])) + '". Cannot route it.'
-        return
-    if (fld.get(dest[0], dest[1]) not in passable_tile_labels):
-        print 'Routing error - one of the terminals of net "' + net_name + '" is occupied by something with label "' + str(fld.get(dest[0], dest[1])) + '". Cannot route it.'
-        return
-    
-    # creating a copy of the field to store distances (should move this out of this function)
-    UNVISITED = -1
-    dist = [[UNVISITED for col in range(fld.get_width())] for row in range(fld.get_height())]
-    dist[start[0]][start[1]] = 0
-
-    # setting the wave off
-    wavefront = [start]
-    reached = False
+        Routes and draws the wire of the net between its terminals (see _get_terminals()),
+        growing the field at most max_growths times.
+        Returns list of (row, col) tiles from the first terminal to the second one, or None.
+    '''
+    start, dest, port_a_id, port_b_id = terminals
+    t0 = time.time()
+    key = _route_cache.get_key(fld, start, dest)
+    cached = _route_cache.get(key)
+    if (cached != None):
+        path = [(start[0] + row, start[1] + col) for (row, col) in cached]
+        # the window is the same, so the tiles are passable; checked anyway, it is cheap
+        if (all([_is_passable(fld, tile, port_a_id, port_b_id) for tile in path])):
+            for (row, col) in path:
+                fld.place_conductor(row, col, net_name)
+            _route_cache.hit_seconds += time.time() - t0
+            return path
+    
+    def search(box):
+        return _a_star_search(fld, start, dest, port_a_id, port_b_id, box)
+    if (not _search_in_windows(fld, search, start, dest, max_growths)):
+        return None
+    
+    # backtracing the wire
+    width = fld.get_width()
+    height = fld.get_height()
+    grids = _get_search_grids(fld)
+    dist = grids.dist
+    stamp = grids.stamp
+    generation = grids.generation
+    cur = dest
+    path = []
     while True:
-        # check if unprocessed wavefront cells left
-        if (len(wavefront) == 0):
-            print 'Routing error - Ports planarly unreachable:', inst_a_name+'.'+inst_a_port_name, 'and', inst_b_name+'.'+inst_b_port_name
-            reached = False
+        # drawing conductor
+        fld.place_conductor(cur[0], cur[1], net_name)
+        path.append(cur)
+        
+        # check if we reached the start
+        if (cur[0] == start[0] and cur[1] == start[1]):
             break
         
-        # check if current cell is the destination
-        cur = wavefront.pop()
-        if (cur[0] == dest[0] and cur[1] == dest[1]):
-            reached = True
+        # deciding where to go next
+        cur_dist = dist[cur[0] * width + cur[1]]
+        predating_neighs = []
+        for (n_row, n_col) in _neighs(cur[0], cur[1], height, width):
+            n = n_row * width + n_col
+            if (stamp[n] == generation and dist[n] == cur_dist-1 and _is_passable(fld, (n_row, n_col), port_a_id, port_b_id)):
+                predating_neighs.append((n_row, n_col))
+        if (len(predating_neighs) == 0):
+            print 'Routing error - one of the net terminals is occupied by something'
+            return None
+        else:
+            cur = predating_neighs[0]
+    path.reverse()
+    if (len(path) == abs(dest[0] - start[0]) + abs(dest[1] - start[1]) + 1):
+        _route_cache.put(key, tuple([(row - start[0], col - start[1]) for (row, col) in path]))
+        _route_cache.searches += 1
+        _route_cache.search_seconds += time.time() - t0
+    return path
+
+# Searches start in a window around the net: the bounding box of its terminals with this margin (in tiles)
+# on every side. Each time the search fails in the window, or finds a path which one leaving the window
+# might beat, the margin is doubled, until the window covers the whole field, and only then is the field grown.
+SEARCH_WINDOW_MARGIN = 4
+
+_window_counts = []  # number of searches which ended after i widenings of the window, by i
+
+def get_search_window_counts():
+    '''
+        Returns a list of the numbers of searches (nets routed or rerouted) which ended
+        in the first window, after one widening of it, after two, and so on.
+    '''
+    return list(_window_counts)
+
+def reset_search_window_counts():
+    del _window_counts[:]
+
+def _add_search_window_counts(counts):
+    while (len(_window_counts) < len(counts)):
+        _window_counts.append(0)
+    for (step, count) in enumerate(counts):
+        _window_counts[step] += count
+
+def print_search_window_counts():
+    counts = get_search_window_counts()
+    if (len(counts) > 0):
+        print '  searches by window widenings:', ', '.join(['%d: %d' % (step, count) for (step, count) in enumerate(counts)])
+
+# Number of routes kept by the route cache of wave_route_wire(), see _RouteCache
+ROUTE_CACHE_SIZE = 4096
+
+# Tile kinds as a search sees them: empty or not. The only port locations a net may pass are its terminals,
+# which are known to be passable
+_PASSABILITY = chr(0) + chr(1) * 255
+
+class _RouteCache:
+    '''
+        LRU cache of the shortest routes found by wave_route_wire(), the ones as long as the Manhattan
+        distance between the terminals. Every tile on such a route is as far from the goal as the start is,
+        so the search finds it before looking outside the bounding box of the terminals, and which of them
+        it finds depends only on which tiles of the box are empty (ties are broken by the order of tiles
+        in rows, which does not change when the box is moved). So the route is kept relative to the first
+        terminal, and a later net with the same box, e.g. in the next bit of an adder, gets it without a search.
+        Longer routes depend on more of the field and are not kept.
+    '''
+    def __init__(self, size):
+        self.size = size
+        self.routes = collections.OrderedDict()   # key -> tuple of (row, col) relative to the first terminal
+        self.reset_stats()
+
+    def reset(self):
+        self.routes.clear()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.lookups = 0
+        self.hits = 0
+        self.hit_seconds = 0.0
+        self.searches = 0           # searches which found a shortest route
+        self.search_seconds = 0.0
+
+    def get_stats(self):
+        return [self.lookups, self.hits, self.hit_seconds, self.searches, self.search_seconds]
+
+    def add_stats(self, stats):
+        self.lookups += stats[0]
+        self.hits += stats[1]
+        self.hit_seconds += stats[2]
+        self.searches += stats[3]
+        self.search_seconds += stats[4]
+
+    def get_key(self, fld, start, dest):
+        '''
+            Returns the key of the net between start and dest: offset of dest from start
+            and the passability of the tiles in their bounding box.
+        '''
+        top, bottom, left, right = _get_search_box(fld, start, dest, 0)
+        kinds = fld.get_kind_plane()
+        width = fld.get_width()
+        rows = [str(kinds[row * width + left : row * width + right + 1]) for row in range(top, bottom + 1)]
+        return (dest[0] - start[0], dest[1] - start[1], ''.join(rows).translate(_PASSABILITY))
+
+    def get(self, key):
+        self.lookups += 1
+        path = self.routes.pop(key, None)
+        if (path != None):
+            self.routes[key] = path     # the most recently used go last
+            self.hits += 1
+        return path
+
+    def put(self, key, path):
+        self.routes[key] = path
+        if (len(self.routes) > self.size):
+            self.routes.popitem(last = False)
+
+_route_cache = _RouteCache(ROUTE_CACHE_SIZE)
+
+def reset_route_cache():
+    '''
+        Empties the route cache and zeroes its statistics, see get_route_cache_stats().
+    '''
+    _route_cache.reset()
+
+def get_route_cache_stats():
+    '''
+        Returns dict of the route cache since the start of routing: 'lookups', 'hits', 'hit_rate',
+        'saved_seconds' - estimated time saved: hits times the mean time of a search
+        which found a shortest route, less the time spent replaying the hits
+    '''
+    cache = _route_cache
+    hit_rate = 0.0
+    if (cache.lookups > 0):
+        hit_rate = float(cache.hits) / cache.lookups
+    saved = 0.0
+    if (cache.searches > 0):
+        saved = cache.hits * cache.search_seconds / cache.searches - cache.hit_seconds
+    return {'lookups': cache.lookups, 'hits': cache.hits, 'hit_rate': hit_rate, 'saved_seconds': saved}
+
+def print_route_cache_stats():
+    stats = get_route_cache_stats()
+    if (stats['lookups'] > 0):
+        print '  route cache: %d hit(s) of %d lookups (%.1f%%), about %.3f s saved' % (
+            stats['hits'], stats['lookups'], 100.0 * stats['hit_rate'], stats['saved_seconds'])
+
+def _get_search_box(fld, start, dest, margin):
+    '''
+        Returns the window (top, bottom, left, right), inclusive, of the search between start and dest.
+    '''
+    return (max(min(start[0], dest[0]) - margin, 0), min(max(start[0], dest[0]) + margin, fld.get_height() - 1),
+            max(min(start[1], dest[1]) - margin, 0), min(max(start[1], dest[1]) + margin, fld.get_width() - 1))
+
+def _search_in_windows(fld, search, start, dest, max_growths):
+    '''
+        Calls search(box) in growing windows around start and dest until it reaches dest,
+        see SEARCH_WINDOW_MARGIN. A search which did not touch the sides of its window is not repeated.
+        Every tile costs at least 1, so a path leaving a window with the margin m costs at least
+        the Manhattan distance + 2 * (m + 1), and a path found inside it is taken only if it costs
+        no more than that; otherwise the window is widened, so the path is as cheap as a search
+        of the whole field would find. Once the window is the whole field, the field is grown at most
+        max_growths times if the search is boxed in by its bottom or right edge.
+        Returns True if dest was reached.
+    '''
+    margin = SEARCH_WINDOW_MARGIN
+    manhattan = abs(start[0] - dest[0]) + abs(start[1] - dest[1])
+    step = 0
+    growths = 0
+    while True:
+        box = _get_search_box(fld, start, dest, margin)
+        whole_field = (box == (0, fld.get_height() - 1, 0, fld.get_width() - 1))
+        reached, touched_edge, cost = search(box)
+        if (reached and (whole_field or not touched_edge or cost <= manhattan + 2 * (margin + 1))):
+            break
+        if (not reached and not touched_edge):
             break
-            
-        # get passable unvisited neighbors
-        neighs = _get_passable_neighs(fld, cur[0], cur[1], passable_tile_labels)
-        unvisited_neighs = [n for n in neighs if dist[n[0]][n[1]] == UNVISITED]
+        if (not whole_field):
+            margin *= 2
+            step += 1
+            continue
+        if (growths == max_growths):
+            break
+        fld.grow(FIELD_GROWTH_STEP, FIELD_GROWTH_STEP)
+        growths += 1
+    _add_search_window_counts([0] * step + [1])
+    return reached
+
+def _a_star_search(fld, start, dest, port_a_id, port_b_id, box):
+    '''
+        Fills the search grids with distances from start until dest is reached,
+        not leaving the box (top, bottom, left, right) of the field.
+        Returns tuple (reached, touched_edge, length), where touched_edge tells
+        whether the search ran into a side of the box inside the field
+        or into the bottom or the right edge of the field, and length is
+        the number of steps from start to dest if it was reached.
+    '''
+    kinds = fld.get_kind_plane()
+    ids = fld.get_id_plane()
+    
+    # tiles are addressed by flat indices row * width + col
+    width = fld.get_width()
+    grids = _get_search_grids(fld)
+    dist = grids.dist
+    stamp = grids.stamp
+    generation = grids.new_search()
+    start_idx = start[0] * width + start[1]
+    dest_idx = dest[0] * width + dest[1]
+    dest_row, dest_col = dest
+    stamp[start_idx] = generation
+    dist[start_idx] = 0
+
+    # open set entries are (f, h, idx); the heuristic is consistent,
+    # so a tile popped from the heap has its shortest distance
+    h = abs(start[0] - dest_row) + abs(start[1] - dest_col)
+    open_heap = [(h, h, start_idx)]
+    touched_edge = False
+    top, bottom, left, right = box
+    # the top and the left sides count only inside the field, the field is not grown there
+    top_side = top if (top > 0) else -1
+    left_side = left if (left > 0) else -1
+    while (len(open_heap) > 0):
+        f, h, cur = heapq.heappop(open_heap)
+        g = f - h
+        if (g > dist[cur]): # stale entry, the tile was reached by a shorter path since
+            continue
         
-        # expand the wave
-        for n in unvisited_neighs:
-            dist[n[0]][n[1]] = dist[cur[0]][cur[1]] + 1
-        wavefront = unvisited_neighs + wavefront # BFS way
+        # check if current tile is the destination
+        if (cur == dest_idx):
+            return (True, touched_edge, g)
         
-    # backtracing the wire
-    if (reached):
-        cur = dest
-        while True:
-            # drawing conductor
-            fld.place_conductor(cur[0], cur[1], net_name)
-            
-            # check if we reached the start
-            if (cur[0] == start[0] and cur[1] == start[1]):
+        # expand the search to passable neighbors
+        row, col = divmod(cur, width)
+        if (row == bottom or col == right or row == top_side or col == left_side):
+            touched_edge = True
+        g += 1
+        for (n_row, n_col) in _neighs_in_box(row, col, box):
+            n = n_row * width + n_col
+            if (stamp[n] == generation and dist[n] <= g):
+                continue
+            kind = kinds[n]
+            if (kind != ww.TILE_EMPTY and (kind != ww.TILE_PORT or (ids[n] != port_a_id and ids[n] != port_b_id))):
+                continue
+            stamp[n] = generation
+            dist[n] = g
+            h = abs(n_row - dest_row) + abs(n_col - dest_col)
+            heapq.heappush(open_heap, (g + h, h, n))
+    
+    return (False, touched_edge, None)
+
+# Negotiated congestion routing (PathFinder, McMurchie & Ebeling, 1995).
+# Cost of a tile for a net is (1 + history) * (1 + present_factor * nets already on the tile).
+# The present factor starts at PRESENT_COST_START and is multiplied by PRESENT_COST_GROWTH
+# every iteration, the history of a tile grows by HISTORY_COST_STEP per extra net on it
+# at the end of every iteration.
+PRESENT_COST_START = 0.5
+PRESENT_COST_GROWTH = 2.0
+HISTORY_COST_STEP = 0.5
+MAX_ROUTING_ITERATIONS = 50
+# Nets passing this close (in tiles) to a shared tile are rerouted along with the nets sharing it
+RIPUP_RADIUS = 3
+# Iterations without fewer shared tiles than the fewest so far after which nets are set aside (see route_negotiated())
+STALL_ITERATIONS = 3
+
+class _CongestionGrids:
+    '''
+        Per-tile congestion state of the negotiated router and the grids of its searches,
+        flat arrays indexed by row * width + col.
+        occupancy - number of nets routed through the tile
+        history - history cost of the tile
+    '''
+    def __init__(self, height, width):
+        self.height = height
+        self.width = width
+        size = height * width
+        self.occupancy = array('i', [0]) * size
+        self.history = array('d', [0.0]) * size
+        self.cost = array('d', [0.0]) * size
+        self.parent = array('i', [0]) * size
+        self.stamp = array('i', [0]) * size
+        self.generation = 0
+
+    def fit(self, fld):
+        '''
+            Follows the tile field after it has grown: the field grows to the bottom and to the right,
+            so tiles keep their (row, col).
+        '''
+        if (fld.get_height() == self.height and fld.get_width() == self.width):
+            return
+        grown = _CongestionGrids(fld.get_height(), fld.get_width())
+        for row in range(self.height):
+            old_start = row * self.width
+            new_start = row * grown.width
+            grown.occupancy[new_start : new_start + self.width] = self.occupancy[old_start : old_start + self.width]
+            grown.history[new_start : new_start + self.width] = self.history[old_start : old_start + self.width]
+        self.__dict__.update(grown.__dict__)
+
+    def new_search(self):
+        if (self.generation == 0x7fffffff):
+            self.stamp = array('i', [0]) * (self.height * self.width)
+            self.generation = 0
+        self.generation += 1
+        return self.generation
+
+    def add_path(self, path, delta):
+        width = self.width
+        occupancy = self.occupancy
+        for (row, col) in path:
+            occupancy[row * width + col] += delta
+
+    def is_shared(self, path):
+        width = self.width
+        occupancy = self.occupancy
+        for (row, col) in path:
+            if (occupancy[row * width + col] > 1):
+                return True
+        return False
+
+def route_negotiated(fld, nets, instances, net_order, max_iterations=MAX_ROUTING_ITERATIONS):
+    '''
+        Routes nets in net_order by negotiated congestion: in the first iteration every net takes
+        its cheapest path even through tiles used by other nets, which only makes those tiles costlier.
+        Then nets on and next to the shared tiles are ripped up and rerouted, over and over, with the costs
+        of shared tiles (present congestion) and of tiles shared in the previous iterations (history)
+        growing, until no tile is shared or max_iterations is reached.
+        
+        Some conflicts cannot be negotiated away: more nets have to pass a channel between
+        two cascades than it has room for without crossing (placement.do_cascade_placement() with channel_pitch
+        makes room for them). When the number of shared tiles has not gone below the fewest so far
+        for STALL_ITERATIONS iterations, the last net in net_order on every shared tile is set aside,
+        so that the rest may converge.
+        Wires are drawn on the field once the negotiation is over. Nets set aside, nets
+        still sharing tiles (all but the first one on a tile) and nets whose search found no path
+        (they are searched again in the following iterations) are routed by wave_route_wire() around the drawn ones.
+        
+        Returns tuple (routes, report):
+        routes - {net_name: list of (row, col) tiles from the first terminal to the second one}
+        report - dict 'iterations', 'shared_tiles' (number of shared tiles after each iteration),
+                 'converged' (every net got tiles of its own by negotiation: none was left sharing tiles,
+                 set aside, without a path or unrouted), 'set_aside' (number of nets set aside), 'conflicting' (number of nets
+                 left sharing tiles), 'failed' (number of nets without a path at the end of the negotiation),
+                 'seconds', 'routed', 'unrouted' (names of the nets which could not be routed)
+    '''
+    t0 = time.time()
+    terminals = {}  # {net_name: (start, dest, port_a_id, port_b_id)}
+    occupied = []
+    for net_name in net_order:
+        ends = _get_terminals(fld, instances, net_name, nets[net_name])
+        if (ends == None):
+            occupied.append(net_name)
+        else:
+            terminals[net_name] = ends
+    routes, report = _negotiate(fld, terminals, [net_name for net_name in net_order if net_name in terminals], max_iterations)
+    for net_name in report['unrouted']:
+        port_a, port_b = nets[net_name]
+        print 'Routing error - Ports planarly unreachable:', port_a[0]+'.'+port_a[1], 'and', port_b[0]+'.'+port_b[1]
+    report['unrouted'] = occupied + report['unrouted']
+    report['converged'] = report['converged'] and len(occupied) == 0
+    report['seconds'] = time.time() - t0
+    return (routes, report)
+
+def _negotiate(fld, terminals, net_order, max_iterations, max_growths=MAX_FIELD_GROWTHS):
+    '''
+        The negotiation of route_negotiated() for nets with known terminals, see _get_terminals().
+        The field is grown at most max_growths times per search.
+        Returns tuple (routes, report) as route_negotiated() does.
+    '''
+    t0 = time.time()
+    grids = _CongestionGrids(fld.get_height(), fld.get_width())
+    unrouted = []
+    failed = {} # nets whose last search found no path
+    paths = {}
+    set_aside = []
+    present_factor = PRESENT_COST_START
+    shared_tiles = []
+    fewest_shared = None
+    stalled = 0
+    to_route = list(net_order)
+    while (len(shared_tiles) < max_iterations and len(to_route) > 0):
+        for net_name in to_route:
+            if (net_name in paths):
+                grids.add_path(paths[net_name], -1)
+                del paths[net_name]
+            # a net retried after a failed search has had its growths, the field may have grown for other nets since
+            growths = max_growths
+            if (net_name in failed):
+                del failed[net_name]
+                growths = 0
+            path = _negotiated_search(fld, grids, terminals[net_name], present_factor, growths)
+            if (path == None):
+                failed[net_name] = True
+                continue
+            grids.add_path(path, 1)
+            paths[net_name] = path
+        
+        # tiles used by several nets get costlier for the next iterations
+        width = grids.width
+        occupancy = grids.occupancy
+        history = grids.history
+        shared = {}
+        for net_name in paths:
+            for (row, col) in paths[net_name]:
+                idx = row * width + col
+                if (occupancy[idx] > 1):
+                    shared[idx] = True
+        for idx in shared:
+            history[idx] += HISTORY_COST_STEP * (occupancy[idx] - 1)
+        if (fewest_shared == None or len(shared) < fewest_shared):
+            fewest_shared = len(shared)
+            stalled = 0
+        else:
+            stalled += 1
+        shared_tiles.append(len(shared))
+        present_factor *= PRESENT_COST_GROWTH
+        
+        if (stalled >= STALL_ITERATIONS):
+            # the last net in the routing order on every shared tile
+            last_nets = {}
+            for net_name in net_order:
+                if (net_name in paths):
+                    for (row, col) in paths[net_name]:
+                        if (row * width + col in shared):
+                            last_nets[row * width + col] = net_name
+            for net_name in net_order:
+                if (net_name in paths and net_name in last_nets.values()):
+                    grids.add_path(paths[net_name], -1)
+                    del paths[net_name]
+                    set_aside.append(net_name)
+            shared = dict((idx, True) for idx in shared if occupancy[idx] > 1)
+            fewest_shared = len(shared)
+            stalled = 0
+        
+        # nets next to the shared tiles are ripped up as well, they may be the ones which have to give way
+        near = {}
+        for idx in shared:
+            row, col = divmod(idx, width)
+            for n_row in range(max(row - RIPUP_RADIUS, 0), min(row + RIPUP_RADIUS + 1, grids.height)):
+                for n_col in range(max(col - RIPUP_RADIUS, 0), min(col + RIPUP_RADIUS + 1, width)):
+                    near[(n_row, n_col)] = True
+        # nets which failed are retried as long as other nets are rerouted
+        to_route = [net_name for net_name in net_order if net_name in paths and _passes_near(paths[net_name], near)]
+        if (len(to_route) > 0):
+            to_route = [net_name for net_name in net_order if net_name in failed or net_name in to_route]
+    
+    # drawing the wires; of the nets left sharing tiles the first one keeps its path,
+    # the rest get routed around the drawn ones
+    routes = {}
+    conflicting = []
+    for net_name in net_order:
+        if (net_name not in paths):
+            continue
+        if (_is_drawn_over(fld, paths[net_name])):
+            conflicting.append(net_name)
+            continue
+        for (row, col) in paths[net_name]:
+            fld.place_conductor(row, col, net_name)
+        routes[net_name] = paths[net_name]
+    failed = [net_name for net_name in net_order if net_name in failed]
+    for net_name in set_aside + conflicting + failed:
+        growths = max_growths
+        if (net_name in failed):
+            growths = 0
+        path = _wave_route_terminals(fld, net_name, terminals[net_name], growths)
+        if (path != None):
+            routes[net_name] = path
+        else:
+            unrouted.append(net_name)
+    
+    report = {
+        'iterations': len(shared_tiles),
+        'shared_tiles': shared_tiles,
+        'converged': len(conflicting) == 0 and len(set_aside) == 0 and len(failed) == 0 and len(unrouted) == 0,
+        'set_aside': len(set_aside),
+        'conflicting': len(conflicting),
+        'failed': len(failed),
+        'seconds': time.time() - t0,
+        'routed': len(routes),
+        'unrouted': unrouted,
+    }
+    return (routes, report)
+
+def _is_drawn_over(fld, path):
+    for (row, col) in path:
+        if (fld.get_kind(row, col) == ww.TILE_CONDUCTOR):
+            return True
+    return False
+
+def _passes_near(path, near):
+    for tile in path:
+        if (tile in near):
+            return True
+    return False
+
+def print_report(report):
+    if (report['converged']):
+        print 'Negotiated routing converged after %d iteration(s) in %.2f s, %d nets routed' % (
+            report['iterations'], report['seconds'], report['routed'])
+    else:
+        print 'Negotiated routing did not converge after %d iteration(s) in %.2f s, %d nets routed' % (
+            report['iterations'], report['seconds'], report['routed'])
+    print '  shared tiles after each iteration:', ' '.join([str(count) for count in report['shared_tiles']])
+    if (report['conflicting'] > 0):
+        print '  %d net(s) left sharing tiles and routed around the rest' % report['conflicting']
+    if (report['set_aside'] > 0):
+        print '  %d net(s) set aside from the negotiation and routed around the rest' % report['set_aside']
+    if (report['failed'] > 0):
+        print '  %d net(s) found no path in the negotiation and were routed around the rest' % report['failed']
+    if (len(report['unrouted']) > 0):
+        print '  %d net(s) could not be routed' % len(report['unrouted'])
+
+def route_channels(fld, nets, instances, net_order, cascades, router='negotiated', jobs=1):
+    '''
+        Routes nets channel by channel in a pool of jobs processes.
+        Every cascade is a column of components (see placement._place_cascades()), so a net
+        between cascades k and k+1 has both terminals in window k: the columns from the left edge
+        of cascade k up to the left edge of cascade k+1. Each window with nets is cut out of the field
+        (wireworld.TileLevelWireWorldUniverse.get_window()), its nets are routed there by the router
+        without leaving it, and the wires are drawn back on the field. Windows do not overlap,
+        so wires of different windows never collide.
+        Nets with terminals in different windows and nets which did not fit into their window
+        are routed by the router afterwards on the whole field, around the drawn wires.
+        
+        Returns tuple (routes, report):
+        routes - as route_negotiated() returns
+        report - dict 'windows' (number of windows routed), 'window_nets' (nets routed inside their windows),
+                 'serial_nets' (nets routed on the whole field), 'jobs', 'seconds',
+                 'unrouted' (names of the nets which could not be routed)
+    '''
+    t0 = time.time()
+    # window of every column, windows start at the left edges of the cascades
+    bounds = [0]
+    for cascade in cascades[1:]:
+        bounds.append(max(instances[cascade[0]].get_pos_in_tiles()[1], bounds[-1]))
+    bounds.append(fld.get_width())
+    window_of_col = array('i', [0]) * fld.get_width()
+    for k in range(len(bounds) - 1):
+        for col in range(bounds[k], bounds[k + 1]):
+            window_of_col[col] = k
+    
+    window_nets = [[] for k in range(len(bounds) - 1)]
+    serial = {}
+    unrouted = []
+    for net_name in net_order:
+        terminals = _get_terminals(fld, instances, net_name, nets[net_name])
+        if (terminals == None):
+            unrouted.append(net_name)
+            continue
+        start, dest = terminals[:2]
+        k = window_of_col[start[1]]
+        if (window_of_col[dest[1]] != k):
+            serial[net_name] = True
+            continue
+        port_labels = [inst_name + '.' + port_name for (inst_name, port_name) in nets[net_name]]
+        window_nets[k].append((net_name, (start[0], start[1] - bounds[k]), (dest[0], dest[1] - bounds[k]),
+                               port_labels[0], port_labels[1]))
+    
+    tasks = []
+    lefts = []
+    for k in range(len(window_nets)):
+        if (len(window_nets[k]) > 0):
+            tasks.append((fld.get_window(bounds[k], bounds[k + 1] - bounds[k]), router, window_nets[k]))
+            lefts.append(bounds[k])
+    counts = get_search_window_counts()
+    cache_stats = _route_cache.get_stats()
+    if (jobs > 1 and len(tasks) > 1):
+        pool = multiprocessing.Pool(processes=min(jobs, len(tasks)))
+        try:
+            results = pool.map(_route_window, tasks, 1)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [_route_window(task) for task in tasks]
+    
+    # counts of the searches in the windows, wherever they ran
+    reset_search_window_counts()
+    _add_search_window_counts(counts)
+    _route_cache.reset_stats()
+    _route_cache.add_stats(cache_stats)
+    routes = {}
+    window_routed = 0
+    for (left, (paths, failed, window_counts, window_cache_stats)) in zip(lefts, results):
+        _add_search_window_counts(window_counts)
+        _route_cache.add_stats(window_cache_stats)
+        window_routed += len(paths)
+        for net_name in paths:
+            path = [(row, col + left) for (row, col) in paths[net_name]]
+            for (row, col) in path:
+                fld.place_conductor(row, col, net_name)
+            routes[net_name] = path
+        for net_name in failed:
+            serial[net_name] = True
+    
+    serial_order = [net_name for net_name in net_order if net_name in serial]
+    if (router == 'negotiated'):
+        serial_routes, serial_report = route_negotiated(fld, nets, instances, serial_order)
+        routes.update(serial_routes)
+        unrouted += serial_report['unrouted']
+    else:
+        for net_name in serial_order:
+            path = wave_route_wire(fld, instances, net_name, nets[net_name])
+            if (path != None):
+                routes[net_name] = path
+            else:
+                unrouted.append(net_name)
+    
+    report = {
+        'windows': len(tasks),
+        'window_nets': window_routed,
+        'serial_nets': len(serial_order),
+        'jobs': jobs,
+        'seconds': time.time() - t0,
+        'unrouted': unrouted,
+    }
+    return (routes, report)
+
+def _route_window(task):
+    '''
+        Routes the nets of a window cut out of the field by route_channels() on it, without growing it.
+        task - tuple (window field, router, list of (net_name, start, dest, port_a_label, port_b_label)),
+               with the terminals in the coordinates of the window
+        Returns tuple (paths, failed, counts, cache_stats): {net_name: list of (row, col) tiles in the window},
+        names of the nets which did not fit into the window, get_search_window_counts() of its searches
+        and statistics of the route cache.
+    '''
+    window, router, window_nets = task
+    reset_search_window_counts()
+    _route_cache.reset_stats()
+    terminals = {}
+    net_order = []
+    for (net_name, start, dest, port_a, port_b) in window_nets:
+        terminals[net_name] = (start, dest, window.get_symbol_id(port_a), window.get_symbol_id(port_b))
+        net_order.append(net_name)
+    if (router == 'negotiated'):
+        paths, report = _negotiate(window, terminals, net_order, MAX_ROUTING_ITERATIONS, 0)
+        return (paths, report['unrouted'], get_search_window_counts(), _route_cache.get_stats())
+    paths = {}
+    failed = []
+    for net_name in net_order:
+        path = _wave_route_terminals(window, net_name, terminals[net_name], 0)
+        if (path != None):
+            paths[net_name] = path
+        else:
+            failed.append(net_name)
+    return (paths, failed, get_search_window_counts(), _route_cache.get_stats())
+
+def print_channel_report(report):
+    print 'Channel routing: %d window(s) in %d process(es), %d nets routed inside their windows, %d on the whole field, %.2f s' % (
+        report['windows'], report['jobs'], report['window_nets'], report['serial_nets'], report['seconds'])
+    if (len(report['unrouted']) > 0):
+        print '  %d net(s) could not be routed' % len(report['unrouted'])
+
+def assign_tracks(channel_nets):
+    '''
+        Left-edge track assignment for the channel between two neighbouring cascades.
+        channel_nets - list of tuples (net_name, left_row, right_row), rows of the terminals of a net
+                       on the left side of the channel (outputs of the left cascade) and on its right side
+                       (inputs of the right cascade)
+        
+        A net runs from its left terminal to the right along its left row up to its track,
+        a column of the channel, along the track to its right row and along that to the right terminal.
+        Nets keeping their order from top to bottom (placement._add_crossings() has made them so) never need to cross:
+        nets going down never overlap nets going up, a net going down has to turn before the tracks of
+        the nets going down from above it whose rows it overlaps, and a net going up has to turn before
+        the tracks of the nets going up from below it. So the nets going down are given tracks from the bottom up
+        and the nets going up from the top down, each the first track right of the tracks of the nets it overlaps,
+        in one pass in the order of rows. The number of tracks is the least possible, the length of the longest
+        chain of overlapping nets. Nets out of order are left out, keeping the others in order.
+        
+        Returns tuple (tracks, width, rejected):
+        tracks - {net_name: track}, 0 is the leftmost track, straight nets need none and get None
+        width - number of tracks used
+        rejected - names of the nets out of order
+    '''
+    tracks = {}
+    rejected = []
+    down = []
+    up = []
+    last_right = None
+    for (net_name, left_row, right_row) in sorted(channel_nets, key=lambda net: net[1]):
+        if (last_right != None and right_row <= last_right):
+            rejected.append(net_name)
+            continue
+        last_right = right_row
+        if (right_row > left_row):
+            down.append((net_name, left_row, right_row))
+        elif (right_row < left_row):
+            up.append((net_name, left_row, right_row))
+        else:
+            tracks[net_name] = None
+    
+    width = 0
+    # nets going down from the bottom up: a net overlaps the ones below it starting above its right row
+    done = []
+    for (net_name, left_row, right_row) in reversed(down):
+        track = 0
+        for other in reversed(done):
+            if (other[1] > right_row):
                 break
-            
-            # deciding where to go next
-            cur_dist = dist[cur[0]][cur[1]]
-            neighs = _get_passable_neighs(fld, cur[0], cur[1], passable_tile_labels) # TODO maybe remove passability condition?
-            predating_neighs = [n for n in neighs if dist[n[0]][n[1]] == cur_dist-1]
-            if (len(predating_neighs) == 0):
-                print 'Routing error - one of the net terminals is occupied by something'
+            track = max(track, tracks[other[0]] + 1)
+        tracks[net_name] = track
+        width = max(width, track + 1)
+        done.append((net_name, left_row, right_row))
+    # nets going up from the top down: a net overlaps the ones above it starting below its right row
+    done = []
+    for (net_name, left_row, right_row) in up:
+        track = 0
+        for other in reversed(done):
+            if (other[1] < right_row):
                 break
+            track = max(track, tracks[other[0]] + 1)
+        tracks[net_name] = track
+        width = max(width, track + 1)
+        done.append((net_name, left_row, right_row))
+    return (tracks, width, rejected)
+
+def get_channel_nets(nets, instances, cascades, k):
+    '''
+        Returns tuple (channel_nets, first_track_col): nets of the channel between cascades k and k+1
+        as assign_tracks() takes them, and the column of its leftmost track, right of all the tiles
+        of cascade k. Nets are taken as they are placed, only rows and columns within cascade k matter,
+        so it may be called before the cascades get their final columns.
+    '''
+    cascade = cascades[k]
+    left_col = instances[cascade[0]].get_pos_in_tiles()[1]
+    first_track_col = left_col
+    for inst_name in cascade:
+        inst = instances[inst_name]
+        row, col = inst.get_pos_in_tiles()
+        first_track_col = max(first_track_col, col + inst.get_size_in_tiles()[1])
+        for port_name in inst.get_output_port_names():
+            first_track_col = max(first_track_col, col + inst.get_port_local_tile_pos(port_name)[1] + 1)
+    right_cascade = dict((inst_name, True) for inst_name in cascades[k + 1])
+    channel_nets = []
+    for inst_name in cascade:
+        for net_name in nets.get_outgoing_nets(inst_name):
+            ends = []
+            for (end_inst, port_name) in nets[net_name]:
+                ends.append(_add_coords(instances[end_inst].get_pos_in_tiles(),
+                                        instances[end_inst].get_port_local_tile_pos(port_name)))
+            if (nets[net_name][0][0] == inst_name):
+                left_end, right_end = ends
+                sink = nets[net_name][1][0]
             else:
-                cur = predating_neighs[0]
-            
-def _get_passable_neighs(fld, row, col, passable_tile_labels):
+                right_end, left_end = ends
+                sink = nets[net_name][0][0]
+            if (sink in right_cascade and left_end[1] < first_track_col):
+                channel_nets.append((net_name, left_end[0], right_end[0]))
+    return (channel_nets, first_track_col)
+
+def route_tracks(fld, nets, instances, net_order, cascades):
     '''
-        Returns a list of tuples with coords of
-        passable von Neumann neighbors.
+        Routes the channel between every two neighbouring cascades in one pass by assign_tracks(),
+        the tracks being the free columns between the outputs of the left cascade and
+        the input port locations of the right one. Nets which are not between neighbouring cascades,
+        nets out of order and nets which got a track beyond the free columns are routed
+        afterwards by route_negotiated() around the drawn wires.
+        
+        Returns tuple (routes, report):
+        routes - as route_negotiated() returns
+        report - dict 'channels' (list of (tracks needed, free columns) of every channel),
+                 'track_nets' (nets routed by tracks), 'maze_nets' (nets left to the negotiated router),
+                 'maze_report' (its report), 'seconds', 'unrouted'
+    '''
+    t0 = time.time()
+    routes = {}
+    channels = []
+    for k in range(len(cascades) - 1):
+        channel_nets, first_track_col = get_channel_nets(nets, instances, cascades, k)
+        right_col = instances[cascades[k + 1][0]].get_pos_in_tiles()[1]
+        # the column left of the right cascade holds its input port locations
+        columns = right_col - 1 - first_track_col
+        tracks, width, rejected = assign_tracks(channel_nets)
+        channels.append((width, columns))
+        for (net_name, left_row, right_row) in channel_nets:
+            if (net_name not in tracks or (tracks[net_name] != None and tracks[net_name] >= columns)):
+                continue
+            track_col = first_track_col
+            if (tracks[net_name] != None):
+                track_col += tracks[net_name]
+            path = _get_track_path(nets, instances, net_name, track_col)
+            terminals = _get_terminals(fld, instances, net_name, nets[net_name])
+            if (terminals == None or not all(_is_passable(fld, tile, terminals[2], terminals[3]) for tile in path)):
+                continue
+            for (row, col) in path:
+                fld.place_conductor(row, col, net_name)
+            routes[net_name] = path
+    
+    maze_order = [net_name for net_name in net_order if net_name not in routes]
+    maze_routes, maze_report = route_negotiated(fld, nets, instances, maze_order)
+    track_nets = len(routes)
+    routes.update(maze_routes)
+    report = {
+        'channels': channels,
+        'track_nets': track_nets,
+        'maze_nets': len(maze_order),
+        'maze_report': maze_report,
+        'seconds': time.time() - t0,
+        'unrouted': maze_report['unrouted'],
+    }
+    return (routes, report)
+
+def _get_track_path(nets, instances, net_name, track_col):
+    '''
+        Returns the tiles of the net routed along the track at track_col,
+        from the first terminal of the net to the second one.
+    '''
+    ends = []
+    for (inst_name, port_name) in nets[net_name]:
+        ends.append(_add_coords(instances[inst_name].get_pos_in_tiles(), instances[inst_name].get_port_local_tile_pos(port_name)))
+    left_end, right_end = sorted(ends, key=lambda end: end[1])
+    path = [(left_end[0], col) for col in range(left_end[1], track_col)]
+    step = 1 if (right_end[0] >= left_end[0]) else -1
+    path += [(row, track_col) for row in range(left_end[0], right_end[0], step)]
+    path += [(right_end[0], col) for col in range(track_col, right_end[1] + 1)]
+    if (ends[0] != left_end):
+        path.reverse()
+    return path
+
+def print_tracks_report(report):
+    widest = max(report['channels'] + [(0, 0)])
+    short = len([1 for (width, columns) in report['channels'] if width > columns])
+    print 'Track routing: %d nets routed in %d channel(s) in %.2f s, the widest needs %d track(s), %d channel(s) too narrow' % (
+        report['track_nets'], len(report['channels']), report['seconds'], widest[0], short)
+    print '  %d net(s) left to the negotiated router' % report['maze_nets']
+    if (report['maze_nets'] > 0):
+        print_report(report['maze_report'])
+
+def _get_terminals(fld, instances, net_name, net):
+    '''
+        Returns tuple (start, dest, port_a_id, port_b_id) of the net: tiles of its two terminals
+        and ids of its port locations, which are passable for it along with empty tiles.
+        Returns None if a terminal is occupied.
+    '''
+    ends = []
+    for (inst_name, port_name) in net:
+        inst = instances[inst_name]
+        ends.append(_add_coords(inst.get_pos_in_tiles(), inst.get_port_local_tile_pos(port_name)))
+    port_a_id = fld.get_symbol_id(net[0][0] + '.' + net[0][1])
+    port_b_id = fld.get_symbol_id(net[1][0] + '.' + net[1][1])
+    for end in ends:
+        if (not _is_passable(fld, end, port_a_id, port_b_id)):
+            print 'Routing error - one of the terminals of net "' + net_name + '" is occupied by something with label "' + str(fld.get(end[0], end[1])) + '". Cannot route it.'
+            return None
+    return (ends[0], ends[1], port_a_id, port_b_id)
+
+def _negotiated_search(fld, grids, terminals, present_factor, max_growths=MAX_FIELD_GROWTHS):
+    '''
+        A* search for the cheapest path between the terminals under the congestion costs,
+        growing the field like wave_route_wire() does if the search is boxed in by its edge.
+        Returns list of (row, col) tiles from start to dest, or None.
+        All tile costs are at least 1, so Manhattan distance is a consistent heuristic,
+        and the cheapest path never touches itself, which would make a shortcut.
+    '''
+    start, dest, port_a_id, port_b_id = terminals
+    def search(box):
+        grids.fit(fld)
+        return _cost_search(fld, grids, start, dest, port_a_id, port_b_id, present_factor, box)
+    if (not _search_in_windows(fld, search, start, dest, max_growths)):
+        return None
+    
+    width = grids.width
+    parent = grids.parent
+    start_idx = start[0] * width + start[1]
+    cur = dest[0] * width + dest[1]
+    path = [dest]
+    while (cur != start_idx):
+        cur = parent[cur]
+        path.append(divmod(cur, width))
+    path.reverse()
+    return path
+
+def _cost_search(fld, grids, start, dest, port_a_id, port_b_id, present_factor, box):
+    '''
+        Fills cost and parent grids from start until dest is reached, not leaving the box.
+        Returns tuple (reached, touched_edge, cost) as _a_star_search() does, with the cost of the path.
+    '''
+    kinds = fld.get_kind_plane()
+    ids = fld.get_id_plane()
+    width = grids.width
+    occupancy = grids.occupancy
+    history = grids.history
+    cost = grids.cost
+    parent = grids.parent
+    stamp = grids.stamp
+    generation = grids.new_search()
+    start_idx = start[0] * width + start[1]
+    dest_idx = dest[0] * width + dest[1]
+    dest_row, dest_col = dest
+    stamp[start_idx] = generation
+    cost[start_idx] = 0.0
+    
+    # open set entries are (f, h, g, idx), ties of f are broken towards dest
+    h = abs(start[0] - dest_row) + abs(start[1] - dest_col)
+    open_heap = [(h, h, 0.0, start_idx)]
+    touched_edge = False
+    top, bottom, left, right = box
+    # the top and the left sides count only inside the field, the field is not grown there
+    top_side = top if (top > 0) else -1
+    left_side = left if (left > 0) else -1
+    while (len(open_heap) > 0):
+        f, h, g, cur = heapq.heappop(open_heap)
+        if (g > cost[cur]): # stale entry
+            continue
+        if (cur == dest_idx):
+            return (True, touched_edge, g)
         
-        Net port names are needed so that components' port connection locations can be made
-        passable for the currently created route.
+        row, col = divmod(cur, width)
+        if (row == bottom or col == right or row == top_side or col == left_side):
+            touched_edge = True
+        for (n_row, n_col) in _neighs_in_box(row, col, box):
+            n = n_row * width + n_col
+            kind = kinds[n]
+            if (kind != ww.TILE_EMPTY and (kind != ww.TILE_PORT or (ids[n] != port_a_id and ids[n] != port_b_id))):
+                continue
+            n_g = g + (1.0 + history[n]) * (1.0 + present_factor * occupancy[n])
+            if (stamp[n] == generation and cost[n] <= n_g):
+                continue
+            stamp[n] = generation
+            cost[n] = n_g
+            parent[n] = cur
+            h = abs(n_row - dest_row) + abs(n_col - dest_col)
+            heapq.heappush(open_heap, (n_g + h, h, n_g, n))
+    
+    return (False, touched_edge, None)
+
+def _is_passable(fld, pos, port_a_id, port_b_id):
+    '''
+        Tells whether the tile at pos = (row, col) is empty
+        or is one of the two port locations of the net being routed.
+    '''
+    kind = fld.get_kind(pos[0], pos[1])
+    if (kind == ww.TILE_EMPTY):
+        return True
+    return kind == ww.TILE_PORT and fld.get_id(pos[0], pos[1]) in (port_a_id, port_b_id)
+
+def _neighs(row, col, height, width):
+    '''
+        Returns a list of tuples with coords of
+        von Neumann neighbors which are inside the field.
+    '''
+    neighs = []
+    if (row > 0):
+        neighs.append( (row-1, col) )
+    if (col > 0):
+        neighs.append( (row, col-1) )
+    if (row < height-1):
+        neighs.append( (row+1, col) )
+    if (col < width-1):
+        neighs.append( (row, col+1) )
+    return neighs
+    
+def _neighs_in_box(row, col, box):
+    '''
+        Returns von Neumann neighbors inside the box (top, bottom, left, right),
+        in the same order as _neighs().
     '''
+    top, bottom, left, right = box
     neighs = []
-    if (row > 0 and fld.get(row-1, col) in passable_tile_labels):
+    if (row > top):
         neighs.append( (row-1, col) )
-    if (col > 0 and fld.get(row, col-1) in passable_tile_labels):
+    if (col > left):
         neighs.append( (row, col-1) )
-    if (row < fld.get_height()-1 and fld.get(row+1, col) in passable_tile_labels):
+    if (row < bottom):
         neighs.append( (row+1, col) )
-    if (col < fld.get_width()-1 and fld.get(row, col+1) in passable_tile_labels):
+    if (col < right):
         neighs.append( (row, col+1) )
     return neighs
     
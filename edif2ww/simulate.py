@@ -0,0 +1,538 @@
+'''
+    EDIF2WW project file.
+    Built-in WireWorld simulator, so that generated patterns can be checked
+    without opening them in Golly. Requires NumPy.
+
+    Patterns are communicated in the same format as everywhere in the project:
+    a list of rows, each row being a string (or a list) of chars:
+    SPACE   empty
+    H       electron head
+    T       electron tail
+    C       conductor
+'''
+
+import numpy as np
+
+import rle_writer
+import wireworld as ww
+
+# Cell states
+EMPTY = 0
+HEAD = 1
+TAIL = 2
+CONDUCTOR = 3
+
+_STATE_CHARS = ' HTC'
+
+# char code -> state
+_STATE_LOOKUP = np.zeros(256, dtype=np.uint8)
+for _state, _char in enumerate(_STATE_CHARS):
+    _STATE_LOOKUP[ord(_char)] = _state
+
+
+def pattern_to_array(pattern):
+    '''
+        Converts a pattern (list of rows of chars) into a 2D uint8 array of states.
+    '''
+    height = len(pattern)
+    width = max([len(row) for row in pattern] + [0])
+    cells = np.zeros((height, width), dtype=np.uint8)
+    for r in range(height):
+        row = ''.join(pattern[r])
+        cells[r, :len(row)] = _STATE_LOOKUP[np.frombuffer(row, dtype=np.uint8)]
+    return cells
+
+
+def array_to_pattern(cells):
+    '''
+        Converts a 2D array of states back into a pattern (list of strings).
+    '''
+    chars = np.array([ord(c) for c in _STATE_CHARS], dtype=np.uint8)[cells]
+    return [row.tostring() for row in chars]
+
+
+def load_rle(filename):
+    '''
+        Reads a pattern from Extended RLE file.
+    '''
+    return rle_writer.read_rle(filename)
+
+
+class DenseSimulator:
+    '''
+        Steps the WireWorld rule over the whole pattern at once with NumPy:
+        head -> tail, tail -> conductor,
+        conductor -> head if exactly 1 or 2 of its 8 neighbours are heads.
+
+        Only the bounding box of the copper (all non-empty cells) is simulated,
+        the rest of the pattern is empty forever.
+    '''
+
+    def __init__(self, pattern):
+        '''
+            pattern - list of rows of chars, e.g. WireWorldUniverse.get_field() or load_rle() result.
+        '''
+        cells = pattern_to_array(pattern)
+        self._height, self._width = cells.shape
+        rows = np.nonzero(cells.any(axis=1))[0]
+        cols = np.nonzero(cells.any(axis=0))[0]
+        if (len(rows) == 0):
+            self._origin = (0, 0)
+            cells = np.zeros((0, 0), dtype=np.uint8)
+        else:
+            self._origin = (rows[0], cols[0])
+            cells = cells[rows[0] : rows[-1]+1, cols[0] : cols[-1]+1]
+        # one cell of empty border, so that neighbour counts need no bounds checks
+        self._state = np.zeros((cells.shape[0] + 2, cells.shape[1] + 2), dtype=np.uint8)
+        self._state[1:-1, 1:-1] = cells
+        self._generation = 0
+
+    def get_generation(self):
+        return self._generation
+
+    def get_size(self):
+        ''' Returns tuple (height, width) of the whole pattern '''
+        return (self._height, self._width)
+
+    def get_simulated_size(self):
+        ''' Returns tuple (height, width) of the area actually simulated (copper bounding box) '''
+        return (self._state.shape[0] - 2, self._state.shape[1] - 2)
+
+    def _to_local(self, row, col):
+        r = row - self._origin[0] + 1
+        c = col - self._origin[1] + 1
+        if (r < 1 or c < 1 or r > self._state.shape[0] - 2 or c > self._state.shape[1] - 2):
+            return None
+        return (r, c)
+
+    def get_state(self, row, col):
+        '''
+            Returns state of the cell at (row, col) of the pattern.
+        '''
+        pos = self._to_local(row, col)
+        if (pos == None):
+            return EMPTY
+        return int(self._state[pos])
+
+    def set_state(self, row, col, state):
+        '''
+            Sets state of a copper cell, e.g. to inject an electron.
+        '''
+        pos = self._to_local(row, col)
+        if (pos == None or self._state[pos] == EMPTY):
+            raise RuntimeError('Simulator: cell (' + str(row) + ', ' + str(col) + ') is not a conductor')
+        self._state[pos] = state
+
+    def get_pattern(self):
+        '''
+            Returns current state of the whole pattern as a list of strings.
+        '''
+        cells = np.zeros((self._height, self._width), dtype=np.uint8)
+        h, w = self.get_simulated_size()
+        r0, c0 = self._origin
+        cells[r0 : r0+h, c0 : c0+w] = self._state[1:-1, 1:-1]
+        return array_to_pattern(cells)
+
+    def _step(self):
+        s = self._state
+        heads = (s == HEAD).view(np.uint8)
+        counts = (heads[:-2, :-2] + heads[:-2, 1:-1] + heads[:-2, 2:] +
+                  heads[1:-1, :-2]                    + heads[1:-1, 2:] +
+                  heads[2:, :-2]  + heads[2:, 1:-1]   + heads[2:, 2:])
+        inner = s[1:-1, 1:-1]
+        is_head = heads[1:-1, 1:-1].view(np.bool_)
+        is_tail = (inner == TAIL)
+        born = (inner == CONDUCTOR) & ((counts == 1) | (counts == 2))
+        inner[is_head] = TAIL
+        inner[is_tail] = CONDUCTOR
+        inner[born] = HEAD
+
+    def step(self, generations=1):
+        '''
+            Advances the pattern by the given number of generations.
+        '''
+        for i in range(generations):
+            self._step()
+        self._generation += generations
+
+    def run(self, generations, probes=[]):
+        '''
+            Advances the pattern by the given number of generations
+            and records states of the probe cells after each of them.
+            probes - list of (row, col) cells of the pattern.
+            Returns a list with a list of states per probe.
+        '''
+        history = [[] for p in probes]
+        for i in range(generations):
+            self.step()
+            for k in range(len(probes)):
+                history[k].append(self.get_state(probes[k][0], probes[k][1]))
+        return history
+
+
+# offsets of the Moore neighbourhood
+_NEIGHBOURHOOD = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+
+class EventSimulator:
+    '''
+        Event-driven WireWorld engine with the same interface as DenseSimulator.
+        Copper cells and their copper neighbours are found once when the
+        simulator is created. After that each generation only visits current
+        heads and tails and the conductor cells next to heads, so its cost
+        depends on signal activity rather than on layout area.
+        Results are identical to DenseSimulator's.
+    '''
+
+    def __init__(self, pattern):
+        '''
+            pattern - list of rows of chars, e.g. WireWorldUniverse.get_field() or load_rle() result.
+        '''
+        cells = pattern_to_array(pattern)
+        self._height, self._width = cells.shape
+        rows, cols = np.nonzero(cells)
+        copper_count = len(rows)
+        self._rows = rows
+        self._cols = cols
+        # copper cell id for every position of the pattern (with empty border), -1 for empty space
+        ids = np.empty((self._height + 2, self._width + 2), dtype=np.int32)
+        ids.fill(-1)
+        ids[rows + 1, cols + 1] = np.arange(copper_count)
+        self._ids = ids
+
+        self._adjacent = [[] for i in range(copper_count)]
+        for (dr, dc) in _NEIGHBOURHOOD:
+            neighbour_ids = ids[rows + 1 + dr, cols + 1 + dc]
+            for (cell, neighbour) in zip(np.nonzero(neighbour_ids >= 0)[0].tolist(), neighbour_ids[neighbour_ids >= 0].tolist()):
+                self._adjacent[cell].append(neighbour)
+
+        self._state = cells[rows, cols].tolist()
+        self._heads = set([i for i in range(copper_count) if self._state[i] == HEAD])
+        self._tails = set([i for i in range(copper_count) if self._state[i] == TAIL])
+        self._generation = 0
+
+    def get_generation(self):
+        return self._generation
+
+    def get_size(self):
+        ''' Returns tuple (height, width) of the whole pattern '''
+        return (self._height, self._width)
+
+    def get_copper_count(self):
+        return len(self._state)
+
+    def _cell_id(self, row, col):
+        if (row < 0 or col < 0 or row >= self._height or col >= self._width):
+            return -1
+        return int(self._ids[row + 1, col + 1])
+
+    def get_state(self, row, col):
+        '''
+            Returns state of the cell at (row, col) of the pattern.
+        '''
+        cell = self._cell_id(row, col)
+        if (cell < 0):
+            return EMPTY
+        return self._state[cell]
+
+    def set_state(self, row, col, state):
+        '''
+            Sets state of a copper cell, e.g. to inject an electron.
+        '''
+        cell = self._cell_id(row, col)
+        if (cell < 0):
+            raise RuntimeError('Simulator: cell (' + str(row) + ', ' + str(col) + ') is not a conductor')
+        self._heads.discard(cell)
+        self._tails.discard(cell)
+        self._state[cell] = state
+        if (state == HEAD):
+            self._heads.add(cell)
+        elif (state == TAIL):
+            self._tails.add(cell)
+
+    def get_pattern(self):
+        '''
+            Returns current state of the whole pattern as a list of strings.
+        '''
+        cells = np.zeros((self._height, self._width), dtype=np.uint8)
+        cells[self._rows, self._cols] = self._state
+        return array_to_pattern(cells)
+
+    def _step(self):
+        state = self._state
+        adjacent = self._adjacent
+        # counting heads around conductors which may become heads
+        counts = {}
+        for cell in self._heads:
+            for neighbour in adjacent[cell]:
+                if (state[neighbour] == CONDUCTOR):
+                    counts[neighbour] = counts.get(neighbour, 0) + 1
+        for cell in self._tails:
+            state[cell] = CONDUCTOR
+        for cell in self._heads:
+            state[cell] = TAIL
+        new_heads = set()
+        for cell in counts:
+            if (counts[cell] <= 2):
+                state[cell] = HEAD
+                new_heads.add(cell)
+        self._tails = self._heads
+        self._heads = new_heads
+
+    def step(self, generations=1):
+        '''
+            Advances the pattern by the given number of generations.
+        '''
+        for i in range(generations):
+            self._step()
+        self._generation += generations
+
+    def run(self, generations, probes=[]):
+        '''
+            Advances the pattern by the given number of generations
+            and records states of the probe cells after each of them.
+            probes - list of (row, col) cells of the pattern.
+            Returns a list with a list of states per probe.
+        '''
+        history = [[] for p in probes]
+        for i in range(generations):
+            self.step()
+            for k in range(len(probes)):
+                history[k].append(self.get_state(probes[k][0], probes[k][1]))
+        return history
+
+
+# number of independent vectors simulated at once by MultiVectorSimulator
+LANES = 64
+ALL_LANES = (1 << LANES) - 1
+
+
+class MultiVectorSimulator:
+    '''
+        Bit-sliced WireWorld engine which simulates LANES copies of the
+        pattern at once, e.g. one per input vector. Every cell holds an
+        uint64 in each of two planes, head and tail, where bit k is the cell's
+        state in copy k; conductors are the copper cells with neither bit set.
+        The count of neighbouring heads is kept in bit-sliced counters, so
+        all copies advance in one pass of bitwise operations.
+    '''
+
+    def __init__(self, pattern):
+        '''
+            pattern - list of rows of chars. All lanes start from this pattern.
+        '''
+        cells = pattern_to_array(pattern)
+        self._height, self._width = cells.shape
+        rows = np.nonzero(cells.any(axis=1))[0]
+        cols = np.nonzero(cells.any(axis=0))[0]
+        if (len(rows) == 0):
+            self._origin = (0, 0)
+            cells = np.zeros((0, 0), dtype=np.uint8)
+        else:
+            self._origin = (rows[0], cols[0])
+            cells = cells[rows[0] : rows[-1]+1, cols[0] : cols[-1]+1]
+        shape = (cells.shape[0] + 2, cells.shape[1] + 2)
+        ones = np.uint64(ALL_LANES)
+        self._copper = np.zeros(shape, dtype=np.uint64)
+        self._head = np.zeros(shape, dtype=np.uint64)
+        self._tail = np.zeros(shape, dtype=np.uint64)
+        self._copper[1:-1, 1:-1][cells != EMPTY] = ones
+        self._head[1:-1, 1:-1][cells == HEAD] = ones
+        self._tail[1:-1, 1:-1][cells == TAIL] = ones
+        self._generation = 0
+
+    def get_generation(self):
+        return self._generation
+
+    def get_size(self):
+        ''' Returns tuple (height, width) of the whole pattern '''
+        return (self._height, self._width)
+
+    def get_simulated_size(self):
+        ''' Returns tuple (height, width) of the area actually simulated (copper bounding box) '''
+        return (self._head.shape[0] - 2, self._head.shape[1] - 2)
+
+    def _to_local(self, row, col):
+        r = row - self._origin[0] + 1
+        c = col - self._origin[1] + 1
+        if (r < 1 or c < 1 or r > self._head.shape[0] - 2 or c > self._head.shape[1] - 2):
+            return None
+        return (r, c)
+
+    def get_lanes(self, row, col, state=HEAD):
+        '''
+            Returns a bitmask of the lanes in which cell (row, col) is in the given state.
+        '''
+        pos = self._to_local(row, col)
+        if (pos == None):
+            if (state == EMPTY):
+                return ALL_LANES
+            return 0
+        head = int(self._head[pos])
+        tail = int(self._tail[pos])
+        copper = int(self._copper[pos])
+        if (state == HEAD):
+            return head
+        elif (state == TAIL):
+            return tail
+        elif (state == CONDUCTOR):
+            return copper & ~head & ~tail
+        return ~copper & ALL_LANES
+
+    def get_state(self, row, col, lane):
+        '''
+            Returns state of the cell at (row, col) in the given lane.
+        '''
+        for state in [HEAD, TAIL, CONDUCTOR]:
+            if ((self.get_lanes(row, col, state) >> lane) & 1):
+                return state
+        return EMPTY
+
+    def get_pattern(self, lane):
+        '''
+            Returns current state of the whole pattern in the given lane as a list of strings.
+        '''
+        bit = np.uint64(1 << lane)
+        inner = (slice(1, -1), slice(1, -1))
+        cells = np.zeros(self._copper[inner].shape, dtype=np.uint8)
+        cells[(self._copper[inner] & bit) != 0] = CONDUCTOR
+        cells[(self._head[inner] & bit) != 0] = HEAD
+        cells[(self._tail[inner] & bit) != 0] = TAIL
+        pattern = np.zeros((self._height, self._width), dtype=np.uint8)
+        h, w = cells.shape
+        r0, c0 = self._origin
+        pattern[r0 : r0+h, c0 : c0+w] = cells
+        return array_to_pattern(pattern)
+
+    def set_state(self, row, col, state, lanes=ALL_LANES):
+        '''
+            Sets state of a copper cell in the lanes selected by the bitmask.
+        '''
+        pos = self._to_local(row, col)
+        if (pos == None or self._copper[pos] == 0):
+            raise RuntimeError('Simulator: cell (' + str(row) + ', ' + str(col) + ') is not a conductor')
+        lanes = np.uint64(lanes)
+        self._head[pos] &= ~lanes
+        self._tail[pos] &= ~lanes
+        if (state == HEAD):
+            self._head[pos] |= lanes
+        elif (state == TAIL):
+            self._tail[pos] |= lanes
+
+    def _step(self):
+        head = self._head
+        tail = self._tail
+        height, width = head.shape
+        # bit-sliced saturating counter of neighbouring heads: ones, twos and "four or more"
+        ones = np.zeros((height - 2, width - 2), dtype=np.uint64)
+        twos = np.zeros(ones.shape, dtype=np.uint64)
+        fours = np.zeros(ones.shape, dtype=np.uint64)
+        carry = np.empty(ones.shape, dtype=np.uint64)
+        overflow = np.empty(ones.shape, dtype=np.uint64)
+        for (dr, dc) in _NEIGHBOURHOOD:
+            x = head[1+dr : height-1+dr, 1+dc : width-1+dc]
+            np.bitwise_and(ones, x, out=carry)
+            ones ^= x
+            np.bitwise_and(twos, carry, out=overflow)
+            twos ^= carry
+            fours |= overflow
+        inner_head = head[1:-1, 1:-1]
+        inner_tail = tail[1:-1, 1:-1]
+        # a conductor becomes head when 1 (ones without twos) or 2 (twos without ones) neighbours are heads
+        ones ^= twos
+        ones &= ~fours
+        ones &= self._copper[1:-1, 1:-1]
+        ones &= ~inner_head
+        ones &= ~inner_tail
+        inner_tail[:] = inner_head
+        inner_head[:] = ones
+
+    def step(self, generations=1):
+        '''
+            Advances all lanes by the given number of generations.
+        '''
+        for i in range(generations):
+            self._step()
+        self._generation += generations
+
+    def run(self, generations, probes=[]):
+        '''
+            Advances all lanes by the given number of generations
+            and records which lanes have a head at the probe cells after each of them.
+            probes - list of (row, col) cells of the pattern.
+            Returns a list with a list of lane bitmasks per probe.
+        '''
+        history = [[] for p in probes]
+        for i in range(generations):
+            self.step()
+            for k in range(len(probes)):
+                history[k].append(self.get_lanes(probes[k][0], probes[k][1], HEAD))
+        return history
+
+
+def _instance_cell_pos(instance, local_pos):
+    '''
+        Converts a cell position inside instance's pattern into a position in the cell-level pattern.
+    '''
+    row, col = instance.get_pos_in_tiles()
+    return (row * ww.TILE_SIZE + local_pos[0], col * ww.TILE_SIZE + local_pos[1])
+
+
+def _generator_cells(instance):
+    '''
+        Returns positions of the electron cells (H and T) of an input MODULE_PORT's
+        signal generator in the cell-level pattern.
+    '''
+    cells = []
+    pattern = instance.get_pattern()
+    for r in range(len(pattern)):
+        for c in range(len(pattern[r])):
+            if (pattern[r][c] in 'HT'):
+                cells.append(_instance_cell_pos(instance, (r, c)))
+    return cells
+
+
+def simulate_vectors(pattern, instances, input_names, output_names, vectors, generations, window=6):
+    '''
+        Simulates the placed-and-routed layout for every input vector.
+        
+        pattern - cell-level pattern of the layout
+        instances - placed instances, used to locate MODULE_PORTs
+        input_names, output_names - names of input and output MODULE_PORT instances
+        vectors - list of dicts {input_name: 0 or 1}
+        generations - number of generations to run before sampling the outputs
+        window - outputs are sampled during this many last generations
+        
+        Input MODULE_PORTs emit a constant train of electrons from their generator loop.
+        An input set to 0 has its generator's electron turned into conductor.
+        An output reads 1 if an electron head passes its port cell during the window.
+        Vectors are packed LANES per simulation pass.
+        Returns list of dicts {output_name: 0 or 1}, one per vector.
+    '''
+    probes = []
+    for name in output_names:
+        inst = instances[name]
+        probes.append(_instance_cell_pos(inst, inst.get_port_local_pos(inst.get_input_port_names()[0])))
+
+    results = []
+    for batch_start in range(0, len(vectors), LANES):
+        batch = vectors[batch_start : batch_start + LANES]
+        sim = MultiVectorSimulator(pattern)
+        for name in input_names:
+            zero_lanes = 0
+            for lane in range(len(batch)):
+                if (not batch[lane][name]):
+                    zero_lanes |= 1 << lane
+            for (row, col) in _generator_cells(instances[name]):
+                sim.set_state(row, col, CONDUCTOR, zero_lanes)
+        sim.step(max(generations - window, 0))
+        history = sim.run(min(window, generations), probes)
+        for lane in range(len(batch)):
+            outputs = {}
+            for k in range(len(output_names)):
+                seen = 0
+                for mask in history[k]:
+                    seen |= mask
+                outputs[output_names[k]] = (seen >> lane) & 1
+            results.append(outputs)
+    return results
@@ -0,0 +1,177 @@
+'''
+    EDIF2WW project file.
+    Static timing analysis of a placed-and-routed layout.
+
+    Time is measured in WireWorld generations. An electron emitted by an input
+    MODULE_PORT at generation 0 reaches the end of a routed wire after
+    TILE_SIZE generations per conductor tile, and the outputs of a component
+    follow the latest of its inputs after the component's get_delay().
+
+    Gates such as LPM_AND and LPM_XOR only work when the electrons of their
+    inputs arrive in phase, so besides the critical path the analysis reports
+    the arrival skew at the inputs of every gate combining several inputs.
+'''
+
+import json
+
+import wireworld as ww
+
+# Components whose outputs follow a single input each rather than all of them:
+# {class name: {output port: input port}}. Their input skew does not matter.
+_CHANNELS = {
+    'DIRECTED_BICHANNEL_CROSSING': {'OutputA': 'InputA', 'OutputB': 'InputB'},
+}
+
+# Outputs which are faster than the component's get_delay(): {class name: {output port: delay}}.
+_OUTPUT_DELAYS = {
+    'DIRECTED_JUNCTION': {'Output1': 6},
+}
+
+
+def get_channels(inst):
+    '''
+        Returns {output port: input port} for components passing every input
+        to an output of its own, empty dict for the rest.
+    '''
+    return _CHANNELS.get(inst.__class__.__name__, {})
+
+
+def combines_inputs(inst):
+    '''
+        Tells whether the outputs of the instance depend on several of its inputs,
+        so the electrons of those have to arrive in phase.
+    '''
+    return len(inst.get_input_port_names()) > 1 and len(get_channels(inst)) == 0
+
+
+def analyze(instances, nets, routes):
+    '''
+        instances - dict of placed instances
+        nets - netlist.Netlist of 2-terminal nets
+        routes - dict {net_name: list of tiles of the wire}, as returned by routing.do_cascade_routing
+
+        Returns a report dict, which may be written as JSON:
+        'arrivals' - {'inst_name.port_name': generation} for every connected port;
+                     for input ports it is the arrival of the signal,
+                     for output ports - the generation when the signal leaves the component
+        'critical_path' - list of {'instance', 'port', 'arrival'} from an input MODULE_PORT
+                          to the latest output MODULE_PORT
+        'max_arrival' - arrival generation at the end of the critical path
+        'skews' - list of {'instance', 'type', 'arrivals': {port_name: generation}, 'skew'}
+                  for every component combining several inputs, the largest skew first
+        'max_skew' - the largest input skew
+        'min_input_period' - minimum number of generations between two consecutive input
+                             vectors such that no gate sees electrons of different vectors
+        'unrouted_nets' - names of nets without a route, taken as zero length
+    '''
+    order = nets.get_topological_order()
+    arrivals = {}       # {(inst_name, port_name): generation}
+    came_from = {}      # {(inst_name, port_name): port the arrival is determined by}
+    unrouted = []
+
+    for inst_name in order:
+        inst = instances[inst_name]
+        latest_port = None
+        for net_name in nets.get_incoming_nets(inst_name):
+            driver = nets.get_driver(net_name)
+            if (driver == None):
+                continue
+            if (net_name in routes):
+                wire_delay = len(routes[net_name]) * ww.TILE_SIZE
+            else:
+                wire_delay = 0
+                unrouted.append(net_name)
+            for port in nets.get_sinks(net_name):
+                if (port[0] == inst_name):
+                    arrivals[port] = arrivals[driver] + wire_delay
+                    came_from[port] = driver
+                    if (latest_port == None or arrivals[port] > arrivals[latest_port]):
+                        latest_port = port
+
+        channels = get_channels(inst)
+        output_delays = _OUTPUT_DELAYS.get(inst.__class__.__name__, {})
+        for port_name in inst.get_output_port_names():
+            source = latest_port
+            if (port_name in channels):
+                source = (inst_name, channels[port_name])
+                if (source not in arrivals):
+                    source = None
+            ready = output_delays.get(port_name, inst.get_delay())
+            if (source != None):
+                ready += arrivals[source]
+                came_from[(inst_name, port_name)] = source
+            arrivals[(inst_name, port_name)] = ready
+
+    # the latest input of the instances driving nothing (output MODULE_PORTs)
+    end = None
+    for inst_name in order:
+        if (len(nets.get_outgoing_nets(inst_name)) > 0):
+            continue
+        for port_name in instances[inst_name].get_input_port_names():
+            port = (inst_name, port_name)
+            if (port in arrivals and (end == None or arrivals[port] > arrivals[end])):
+                end = port
+    critical_path = []
+    while (end != None):
+        critical_path.append({'instance': end[0], 'port': end[1], 'arrival': arrivals[end]})
+        end = came_from.get(end)
+    critical_path.reverse()
+
+    skews = []
+    for inst_name in order:
+        inst = instances[inst_name]
+        port_arrivals = {}
+        for port_name in inst.get_input_port_names():
+            if ((inst_name, port_name) in arrivals):
+                port_arrivals[port_name] = arrivals[(inst_name, port_name)]
+        if (len(port_arrivals) > 1 and combines_inputs(inst)):
+            skews.append({
+                'instance': inst_name,
+                'type': inst.__class__.__name__,
+                'arrivals': port_arrivals,
+                'skew': max(port_arrivals.values()) - min(port_arrivals.values()),
+            })
+    skews.sort(key=lambda s: (-s['skew'], s['instance']))
+    max_skew = 0
+    if (len(skews) > 0):
+        max_skew = skews[0]['skew']
+
+    port_arrivals = {}
+    for (inst_name, port_name) in arrivals:
+        port_arrivals[inst_name + '.' + port_name] = arrivals[(inst_name, port_name)]
+    max_arrival = 0
+    if (len(critical_path) > 0):
+        max_arrival = critical_path[-1]['arrival']
+    return {
+        'arrivals': port_arrivals,
+        'critical_path': critical_path,
+        'max_arrival': max_arrival,
+        'skews': skews,
+        'max_skew': max_skew,
+        # input MODULE_PORTs emit one electron per TILE_SIZE generations at most
+        'min_input_period': max_skew + ww.TILE_SIZE,
+        'unrouted_nets': sorted(unrouted),
+    }
+
+
+def write_report(report, path):
+    '''
+        Writes the report returned by analyze() as JSON.
+    '''
+    f = open(path, 'w')
+    try:
+        json.dump(report, f, indent=1, sort_keys=True)
+    finally:
+        f.close()
+
+
+def print_summary(report, max_skews=5):
+    print 'Critical path: %d generations through %d ports, max input skew %d, min input period %d generations' % (
+        report['max_arrival'], len(report['critical_path']), report['max_skew'], report['min_input_period'])
+    for s in report['skews'][:max_skews]:
+        if (s['skew'] == 0):
+            break
+        print '  skew %4d at %s %s: %s' % (s['skew'], s['type'], s['instance'],
+            ' '.join('%s=%d' % (p, s['arrivals'][p]) for p in sorted(s['arrivals'])))
+    if (len(report['unrouted_nets']) > 0):
+        print '  %d unrouted net(s) taken as zero length' % len(report['unrouted_nets'])
@@ -0,0 +1,177 @@
+'''
+    EDIF2WW project file.
+    Functional equivalence checker of a placed-and-routed layout against its netlist.
+
+    The mapped netlist (LPM gates, junctions, feedthroughs and crossings) is
+    evaluated directly in Python, and the cell-level pattern is simulated
+    with the same input vectors (see simulate.simulate_vectors). Outputs of the
+    layout are sampled once every signal is expected to have arrived, and are
+    compared with the ones of the netlist.
+
+    The netlist is evaluated for all vectors at once: the value of a net is
+    an integer whose bit k is the value of the net for vector k, so each gate
+    is evaluated with a single bitwise operation per batch.
+'''
+
+import random
+import time
+
+import sta
+import wireworld as ww
+
+# Generations added to the expected arrival generation before the outputs are sampled.
+# Covers the wires inside components' port tiles, which delays do not account for.
+SETTLE_MARGIN = 4 * ww.TILE_SIZE
+
+# Inputs up to this count are checked exhaustively, otherwise random vectors are taken.
+MAX_EXHAUSTIVE_INPUTS = 10
+RANDOM_VECTOR_COUNT = 256
+
+
+def _eval_and(values, mask):
+    return [values[0] & values[1]]
+
+def _eval_or(values, mask):
+    return [values[0] | values[1]]
+
+def _eval_xor(values, mask):
+    return [values[0] ^ values[1]]
+
+def _eval_inv(values, mask):
+    return [~values[0] & mask]
+
+def _eval_junction(values, mask):
+    return [values[0], values[0]]
+
+def _eval_wire(values, mask):
+    # feedthroughs, crossings and delay lines pass their inputs to the outputs of the same index
+    return list(values)
+
+# Component class name -> function (values of input ports, all-vectors mask) -> values of output ports.
+# Port values are in the order of get_input_port_names() and get_output_port_names().
+_LOGIC = {
+    'LPM_AND': _eval_and,
+    'LPM_OR': _eval_or,
+    'LPM_XOR': _eval_xor,
+    'LPM_INV': _eval_inv,
+    'DIRECTED_JUNCTION': _eval_junction,
+    'FEEDTHROUGH': _eval_wire,
+    'DIRECTED_BICHANNEL_CROSSING': _eval_wire,
+    'DELAY_LINE': _eval_wire,
+}
+
+
+def evaluate_netlist(instances, nets, input_names, output_names, vectors, order=None):
+    '''
+        Computes outputs of the netlist for every input vector.
+        vectors - list of dicts {input_name: 0 or 1}
+        Returns list of dicts {output_name: 0 or 1}, one per vector.
+    '''
+    if (order == None):
+        order = nets.get_topological_order()
+    mask = (1 << len(vectors)) - 1
+
+    port_values = {}    # {(inst_name, port_name): value bits}
+    for name in input_names:
+        bits = 0
+        for k in range(len(vectors)):
+            if (vectors[k][name]):
+                bits |= 1 << k
+        port_values[(name, instances[name].get_output_port_names()[0])] = bits
+
+    def input_value(inst_name, port_name):
+        net_name = nets.find_net((inst_name, port_name))
+        driver = nets.get_driver(net_name)
+        if (driver == None):
+            return 0
+        return port_values[driver]
+
+    for inst_name in order:
+        inst = instances[inst_name]
+        logic = _LOGIC.get(inst.__class__.__name__)
+        if (logic == None):
+            continue
+        values = [input_value(inst_name, p) for p in inst.get_input_port_names()]
+        for (port_name, value) in zip(inst.get_output_port_names(), logic(values, mask)):
+            port_values[(inst_name, port_name)] = value
+
+    output_bits = []
+    for name in output_names:
+        output_bits.append(input_value(name, instances[name].get_input_port_names()[0]))
+    results = []
+    for k in range(len(vectors)):
+        outputs = {}
+        for i in range(len(output_names)):
+            outputs[output_names[i]] = (output_bits[i] >> k) & 1
+        results.append(outputs)
+    return results
+
+
+def make_vectors(input_names, seed=0):
+    '''
+        Returns input vectors to check: all of them if there are at most
+        MAX_EXHAUSTIVE_INPUTS inputs, otherwise RANDOM_VECTOR_COUNT random ones.
+    '''
+    vectors = []
+    if (len(input_names) <= MAX_EXHAUSTIVE_INPUTS):
+        for n in range(1 << len(input_names)):
+            vectors.append(dict((input_names[i], (n >> i) & 1) for i in range(len(input_names))))
+    else:
+        rng = random.Random(seed)
+        for n in range(RANDOM_VECTOR_COUNT):
+            vectors.append(dict((name, rng.randint(0, 1)) for name in input_names))
+    return vectors
+
+
+def check_layout(pattern, instances, nets, routes, input_names, output_names, vectors=None, generations=None):
+    '''
+        Checks that the cell-level pattern computes the same function as the netlist.
+        pattern - cell-level pattern of the layout (cell_field.get_field())
+        routes - dict {net_name: tiles of the wire}, as returned by routing.do_cascade_routing
+        vectors - list of dicts {input_name: 0 or 1}, by default see make_vectors()
+        generations - when to sample the outputs, by default the arrival generation
+        at the end of the critical path (see sta.analyze) plus SETTLE_MARGIN
+
+        Returns report dict:
+        'vectors' - number of vectors checked
+        'generations' - generation at which the outputs were sampled
+        'mismatches' - list of dicts {'vector', 'expected', 'actual'}
+        'seconds' - time spent
+        'vectors_per_second' - checking throughput
+    '''
+    import simulate
+
+    t0 = time.time()
+    if (vectors == None):
+        vectors = make_vectors(input_names)
+    if (generations == None):
+        generations = sta.analyze(instances, nets, routes)['max_arrival'] + SETTLE_MARGIN
+
+    expected = evaluate_netlist(instances, nets, input_names, output_names, vectors)
+    actual = simulate.simulate_vectors(pattern, instances, input_names, output_names, vectors, generations)
+
+    mismatches = []
+    for k in range(len(vectors)):
+        if (expected[k] != actual[k]):
+            mismatches.append({'vector': vectors[k], 'expected': expected[k], 'actual': actual[k]})
+    elapsed = time.time() - t0
+    return {
+        'vectors': len(vectors),
+        'generations': generations,
+        'mismatches': mismatches,
+        'seconds': elapsed,
+        'vectors_per_second': len(vectors) / max(elapsed, 1e-9),
+    }
+
+
+def print_report(report, max_mismatches=10):
+    print 'Checked %d vectors at generation %d: %d mismatch(es), %.3f s, %.1f vectors/s' % (
+        report['vectors'], report['generations'], len(report['mismatches']), report['seconds'], report['vectors_per_second'])
+    for m in report['mismatches'][:max_mismatches]:
+        print '  inputs', _format_bits(m['vector']), 'expected', _format_bits(m['expected']), 'got', _format_bits(m['actual'])
+    if (len(report['mismatches']) > max_mismatches):
+        print '  ...'
+
+
+def _format_bits(values):
+    return ' '.join('%s=%d' % (name, values[name]) for name in sorted(values))
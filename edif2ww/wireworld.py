@@ -7,23 +7,41 @@
     and necessary transition from it to the CA cell-level which can then be written to RLE.
 '''
 
+from array import array
+
 import wireworld_wires_library_tile6 as wires
 
+# Side of a square chunk of the cell-level universe, in cells
+CHUNK_SIZE = 64
+# Side of a square block of chunks the batched conversion builds at a time;
+# BLOCK_CHUNKS * CHUNK_SIZE must be a multiple of TILE_SIZE
+BLOCK_CHUNKS = 3
+
 class WireWorldUniverse:
-    _field = []
-    _width = 0
-    _height = 0
     def __init__(self, width, height):
-        for row in range(height):
-            self._field.append([' '] * width)
+        '''
+            width, height - in CA cells.
+            The field is stored sparsely: a dict of square chunks of CHUNK_SIZE x CHUNK_SIZE cells
+            keyed by (chunk_row, chunk_col). Each chunk is a flat bytearray of cell chars,
+            indexed by row * CHUNK_SIZE + col within the chunk. Chunks nothing has been
+            written to are never allocated and read as empty cells, so the memory taken
+            follows the occupied area of the layout rather than its bounding box.
+        '''
         self._width = width
         self._height = height
+        self._chunks = {}
     
     def get_width(self):
         return self._width
         
     def get_height(self):
         return self._height
+    
+    def get_chunk_count(self):
+        '''
+            Returns the number of allocated chunks.
+        '''
+        return len(self._chunks)
         
     def write_pattern(self, row, col, pattern):
         '''
@@ -38,21 +56,92 @@ class WireWorldUniverse:
             'pattern' is a 1D array of strings.
         '''
         pattern_width = len(pattern[0]) # assuming pattern shape is OK
-        pattern_height = len(pattern)
-        for r in range(pattern_height):
-            for c in range(pattern_width):
-                self._field[r + row][c + col] = pattern[r][c]
+        for r in range(len(pattern)):
+            cell_row = r + row
+            chunk_row, local_row = divmod(cell_row, CHUNK_SIZE)
+            c = 0
+            while (c < pattern_width):
+                chunk_col, local_col = divmod(c + col, CHUNK_SIZE)
+                n = min(pattern_width - c, CHUNK_SIZE - local_col)
+                chunk = self._chunks.get((chunk_row, chunk_col))
+                if (chunk == None):
+                    chunk = bytearray(' ' * (CHUNK_SIZE * CHUNK_SIZE))
+                    self._chunks[(chunk_row, chunk_col)] = chunk
+                start = local_row * CHUNK_SIZE + local_col
+                chunk[start : start + n] = pattern[r][c : c + n]
+                c += n
+    
+    def write_chunk(self, chunk_row, chunk_col, cells):
+        '''
+            Replaces a whole chunk.
+            cells - CHUNK_SIZE * CHUNK_SIZE chars, row by row
+        '''
+        if (len(cells) != CHUNK_SIZE * CHUNK_SIZE):
+            raise RuntimeError('Cell level universe: wrong chunk size ' + str(len(cells)))
+        self._chunks[(int(chunk_row), int(chunk_col))] = bytearray(cells)
+    
+    def get_cell(self, row, col):
+        chunk = self._chunks.get((row // CHUNK_SIZE, col // CHUNK_SIZE))
+        if (chunk == None):
+            return ' '
+        return chr(chunk[(row % CHUNK_SIZE) * CHUNK_SIZE + col % CHUNK_SIZE])
+    
+    def get_row(self, row):
+        '''
+            Returns the row of the field as a string, one char per cell.
+        '''
+        chunk_row, local_row = divmod(row, CHUNK_SIZE)
+        start = local_row * CHUNK_SIZE
+        blank = ' ' * CHUNK_SIZE
+        parts = []
+        for chunk_col in range((self._width + CHUNK_SIZE - 1) // CHUNK_SIZE):
+            chunk = self._chunks.get((chunk_row, chunk_col))
+            if (chunk == None):
+                parts.append(blank)
+            else:
+                parts.append(str(chunk[start : start + CHUNK_SIZE]))
+        return ''.join(parts)[:self._width]
                 
     def get_field(self):
-        return self._field
+        '''
+            Returns the rows of the field as a read-only sequence of strings,
+            which are built from the chunks on access, one at a time.
+        '''
+        return _FieldRows(self)
         
         
-
+class _FieldRows:
+    '''
+        Sequence of rows of a WireWorldUniverse, see WireWorldUniverse.get_field().
+    '''
+    def __init__(self, universe):
+        self._universe = universe
+    
+    def __len__(self):
+        return self._universe.get_height()
+    
+    def __getitem__(self, row):
+        if (row < 0):
+            row += self._universe.get_height()
+        if (row < 0 or row >= self._universe.get_height()):
+            raise IndexError('row index out of range')
+        return self._universe.get_row(row)
+    
+    def __iter__(self):
+        for row in range(self._universe.get_height()):
+            yield self._universe.get_row(row)
         
+
+# Size of a tile in CA cells
+TILE_SIZE = 6
+
+# Tile kinds of the Tile-level universe
+TILE_EMPTY = 0
+TILE_COMPONENT = 1  # tile is occupied by a component instance
+TILE_PORT = 2       # tile is a component's port connection location
+TILE_CONDUCTOR = 3  # tile is a part of a routed net
+
 class TileLevelWireWorldUniverse:
-    _field = []
-    _width = 0
-    _height = 0
     def __init__(self, width, height):
         '''
             width, height - in tiles of size 6x6 CA cells.
@@ -67,25 +156,132 @@ class TileLevelWireWorldUniverse:
             On Tile-level field, it occupies 6 cells; each cell contains
             the instance's name which acts more like a label or a pointer to the instance.
             
+            Internally labels are not stored per tile. The field is kept in two flat
+            planes indexed by row * width + col: a kind plane (one of TILE_* constants)
+            and an id plane holding integer ids of instance names, port labels
+            ('U1.Data0x0') or net names. The symbol table maps ids back to names.
+            
             After the placement and routing is done, Tile-level field is converted into
             CA cell field and written to RLE.
         '''
-        for row in range(height):
-            self._field.append([' '] * width)
         self._width = width
         self._height = height
+        self._kinds = bytearray(width * height)
+        self._ids = array('i', [0]) * (width * height)
+        self._symbols = []      # id -> name
+        self._symbol_ids = {}   # name -> id
+      
+    def _intern(self, name):
+        '''
+            Returns id of the name, adding it to the symbol table if needed.
+        '''
+        symbol_id = self._symbol_ids.get(name)
+        if (symbol_id == None):
+            symbol_id = len(self._symbols)
+            self._symbols.append(name)
+            self._symbol_ids[name] = symbol_id
+        return symbol_id
+    
+    def get_symbol_id(self, name):
+        '''
+            Returns id of an instance name, a port label or a net name, or -1 if it is not on the field.
+        '''
+        return self._symbol_ids.get(name, -1)
+    
+    def get_symbol(self, symbol_id):
+        return self._symbols[symbol_id]
       
     def get(self, row, col):
         '''
             Returns tile state at (row, col)
         '''
-        return self._field[row][col]
+        idx = row * self._width + col
+        kind = self._kinds[idx]
+        if (kind == TILE_EMPTY):
+            return ' '
+        elif (kind == TILE_CONDUCTOR):
+            return ('C', self._symbols[self._ids[idx]])
+        else:
+            return self._symbols[self._ids[idx]]
+    
+    def get_kind(self, row, col):
+        return self._kinds[row * self._width + col]
+    
+    def get_id(self, row, col):
+        return self._ids[row * self._width + col]
+    
+    def get_kind_plane(self):
+        '''
+            Returns the flat kind plane (indexed by row * width + col).
+            Meant for read-only use in hot loops such as routing.
+        '''
+        return self._kinds
+    
+    def get_id_plane(self):
+        '''
+            Returns the flat id plane (indexed by row * width + col).
+            Meant for read-only use in hot loops such as routing.
+        '''
+        return self._ids
       
     def get_width(self):
         return self._width
         
     def get_height(self):
         return self._height
+    
+    def grow(self, extra_rows, extra_cols):
+        '''
+            Enlarges the field by adding empty rows at the bottom and empty columns on the right.
+            Coordinates of everything already on the field stay the same.
+        '''
+        new_width = self._width + extra_cols
+        new_height = self._height + extra_rows
+        kinds = bytearray(new_width * new_height)
+        ids = array('i', [0]) * (new_width * new_height)
+        for r in range(self._height):
+            old_start = r * self._width
+            new_start = r * new_width
+            kinds[new_start : new_start + self._width] = self._kinds[old_start : old_start + self._width]
+            ids[new_start : new_start + self._width] = self._ids[old_start : old_start + self._width]
+        self._kinds = kinds
+        self._ids = ids
+        self._width = new_width
+        self._height = new_height
+        
+    def insert_columns(self, col, count):
+        '''
+            Enlarges the field by inserting count empty columns before column col:
+            everything from column col on moves count columns to the right.
+        '''
+        new_width = self._width + count
+        kinds = bytearray(new_width * self._height)
+        ids = array('i', [0]) * (new_width * self._height)
+        for r in range(self._height):
+            old_start = r * self._width
+            new_start = r * new_width
+            kinds[new_start : new_start + col] = self._kinds[old_start : old_start + col]
+            ids[new_start : new_start + col] = self._ids[old_start : old_start + col]
+            kinds[new_start + col + count : new_start + new_width] = self._kinds[old_start + col : old_start + self._width]
+            ids[new_start + col + count : new_start + new_width] = self._ids[old_start + col : old_start + self._width]
+        self._kinds = kinds
+        self._ids = ids
+        self._width = new_width
+        
+    def get_window(self, col, width):
+        '''
+            Returns a new field made of columns col ... col+width-1 of this one, of full height.
+            It has a symbol table of its own, holding only the labels found in those columns,
+            so it is small enough to be sent to another process.
+        '''
+        window = TileLevelWireWorldUniverse(width = width, height = self._height)
+        for r in range(self._height):
+            start = r * self._width + col
+            window._kinds[r * width : (r + 1) * width] = self._kinds[start : start + width]
+            for c in range(width):
+                if (self._kinds[start + c] != TILE_EMPTY):
+                    window._ids[r * width + c] = window._intern(self._symbols[self._ids[start + c]])
+        return window
         
     def place_component(self, row, col, component):
         ''' 
@@ -96,11 +292,13 @@ class TileLevelWireWorldUniverse:
         comp_size = component.get_size_in_tiles()
         height = comp_size[0]
         width = comp_size[1]
-        instance_name = component.get_name()
+        instance_id = self._intern(component.get_name())
         for r in range(height):
             for c in range(width):
-                if (self._field[r + row][c + col] == ' '):
-                    self._field[r + row][c + col] = instance_name
+                idx = (r + row) * self._width + (c + col)
+                if (self._kinds[idx] == TILE_EMPTY):
+                    self._kinds[idx] = TILE_COMPONENT
+                    self._ids[idx] = instance_id
                 else:
                     raise RuntimeError('Tile level of abstraction: component overlap detected.')
         
@@ -110,79 +308,304 @@ class TileLevelWireWorldUniverse:
         ports = input_ports + output_ports
         for port_name in ports:
             port_row, port_col = component.get_port_local_tile_pos(port_name)
-            label = instance_name + '.' + port_name
-            if (self._field[port_row + row][port_col + col] == ' '):
-                self._field[port_row + row][port_col + col] = label
+            idx = (port_row + row) * self._width + (port_col + col)
+            if (self._kinds[idx] == TILE_EMPTY):
+                self._kinds[idx] = TILE_PORT
+                self._ids[idx] = self._intern(component.get_name() + '.' + port_name)
             else:
                 raise RuntimeError('Tile level of abstraction: component overlap detected. Outside port location overlaps something')
             
             
           
+    def place_inline_component(self, row, col, component):
+        '''
+            Places a component (such as a delay line) over conductor tiles of a routed wire.
+            Unlike place_component, the tiles under the component may be conductors,
+            and its port locations are not marked, as they are the ends of the wire's remaining parts.
+        '''
+        comp_size = component.get_size_in_tiles()
+        instance_id = self._intern(component.get_name())
+        for r in range(comp_size[0]):
+            for c in range(comp_size[1]):
+                idx = (r + row) * self._width + (c + col)
+                if (self._kinds[idx] not in (TILE_EMPTY, TILE_CONDUCTOR)):
+                    raise RuntimeError('Tile level of abstraction: component overlap detected.')
+                self._kinds[idx] = TILE_COMPONENT
+                self._ids[idx] = instance_id
+
     def place_conductor(self, row, col, net_name):
         '''
             Places one WireWorld conductor tile at specified location.
             net_name - net of which this conductor cell is a part
         '''
-        if (self._field[row][col] != ' '):
-            #raise RuntimeError('Tile level of abstraction: wire drawn over something with label: ' + str(self._field[row][col]))
-            #print 'Tile level of abstraction: wire drawn over something with label: ' + str(self._field[row][col])
+        idx = row * self._width + col
+        if (self._kinds[idx] != TILE_EMPTY):
+            #raise RuntimeError('Tile level of abstraction: wire drawn over something with label: ' + str(self.get(row, col)))
+            #print 'Tile level of abstraction: wire drawn over something with label: ' + str(self.get(row, col))
             pass
-        self._field[row][col] = ('C', net_name)
+        self._kinds[idx] = TILE_CONDUCTOR
+        self._ids[idx] = self._intern(net_name)
+          
+    def remove_conductor(self, row, col):
+        '''
+            Clears a conductor tile, e.g. when a wire is re-routed.
+        '''
+        idx = row * self._width + col
+        if (self._kinds[idx] == TILE_CONDUCTOR):
+            self._kinds[idx] = TILE_EMPTY
+            self._ids[idx] = 0
+          
+    def _get_wire_dir(self, r, c, nets_dict):
+        '''
+            Returns the direction string of the conductor tile at (r, c) for wires.get_wire_pattern().
+        '''
+        kinds = self._kinds
+        ids = self._ids
+        width = self._width
+        height = self._height
+        idx = r * width + c
+        # determining the wire direction
+        # finding two neighbors with identical net, current piece of wire should connect to them 
+        net_id = ids[idx]
+        dir = ''
+        if (r-1 >= 0 and kinds[idx-width] == TILE_CONDUCTOR and ids[idx-width] == net_id):
+            dir += 'N'
+        if (c+1 < width and kinds[idx+1] == TILE_CONDUCTOR and ids[idx+1] == net_id):
+            dir += 'E'
+        if (r+1 < height and kinds[idx+width] == TILE_CONDUCTOR and ids[idx+width] == net_id):
+            dir += 'S'
+        if (c-1 >= 0 and kinds[idx-1] == TILE_CONDUCTOR and ids[idx-1] == net_id):
+            dir += 'W'
+        
+        if (len(dir) == 1):
+            # current piece of wire connects to instance port
+            net = nets_dict[self._symbols[net_id]]
+            instance_ids = [self.get_symbol_id(x[0]) for x in net]
+            if (r-1 >= 0 and kinds[idx-width] == TILE_COMPONENT and ids[idx-width] in instance_ids):
+                dir += 'N'
+            if (c+1 < width and kinds[idx+1] == TILE_COMPONENT and ids[idx+1] in instance_ids):
+                dir += 'E'
+            if (r+1 < height and kinds[idx+width] == TILE_COMPONENT and ids[idx+width] in instance_ids):
+                dir += 'S'
+            if (c-1 >= 0 and kinds[idx-1] == TILE_COMPONENT and ids[idx-1] in instance_ids):
+                dir += 'W'
+        return dir
+    
+    def get_tile_patterns(self, instances_dict, nets_dict):
+        '''
+            Describes the cell level of the field tile by tile, without building it.
+            Returns tuple (tile_patterns, plane):
+            tile_patterns - list of distinct TILE_SIZE x TILE_SIZE cell patterns (tuples of strings);
+                            entry 0 is None and stands for an empty tile
+            plane - flat array indexed by row * width + col with the index of the pattern of every tile
+            Conductor tiles get wire patterns, component tiles get their part of the component's pattern.
+        '''
+        kinds = self._kinds
+        ids = self._ids
+        width = self._width
+        tile_patterns = [None]
+        pattern_ids = {}    # pattern -> index in tile_patterns
+        plane = array('i', [0]) * (width * self._height)
+        def intern_pattern(pattern):
+            pattern_id = pattern_ids.get(pattern)
+            if (pattern_id == None):
+                pattern_id = len(tile_patterns)
+                tile_patterns.append(pattern)
+                pattern_ids[pattern] = pattern_id
+            return pattern_id
+        
+        wire_ids = {}       # direction string -> pattern index
+        for r in range(self._height):
+            for c in range(width):
+                idx = r * width + c
+                kind = kinds[idx]
+                if (kind == TILE_CONDUCTOR):
+                    dir = self._get_wire_dir(r, c, nets_dict)
+                    if (dir not in wire_ids):
+                        wire_ids[dir] = intern_pattern(tuple(wires.get_wire_pattern(dir)))
+                    plane[idx] = wire_ids[dir]
+                elif (kind == TILE_COMPONENT):
+                    instance = instances_dict[self._symbols[ids[idx]]]
+                    pos_row, pos_col = instance.get_pos_in_tiles()
+                    cell_row = (r - pos_row) * TILE_SIZE
+                    cell_col = (c - pos_col) * TILE_SIZE
+                    pattern = instance.get_pattern()
+                    plane[idx] = intern_pattern(tuple(line[cell_col : cell_col + TILE_SIZE]
+                                                      for line in pattern[cell_row : cell_row + TILE_SIZE]))
+        return (tile_patterns, plane)
           
     def write_cell_level_universe(self, instances_dict, nets_dict):
         '''
             Writes CA cell level WireWorld field.
             Requires a list of instantiated LPM cells and crossovers,
             because it needs access to their patterns and their names.
+            
+            Uses the batched conversion (write_cell_level_universe_batched) if NumPy is available,
+            otherwise converts the field tile by tile.
+        '''
+        try:
+            import numpy
+        except ImportError:
+            return self.write_cell_level_universe_by_tile(instances_dict, nets_dict)
+        return self.write_cell_level_universe_batched(instances_dict, nets_dict)
+    
+    def write_cell_level_universe_batched(self, instances_dict, nets_dict):
+        '''
+            Same as write_cell_level_universe(), done with NumPy array operations
+            instead of a Python loop over the tiles (requires NumPy):
+            - wire directions of all conductor tiles are found by comparing
+              the kind and id planes with their shifted copies;
+            - every wire pattern and component cell type is turned into a uint8 stamp once;
+            - the cells are built one block of BLOCK_CHUNKS x BLOCK_CHUNKS chunks at a time, a whole
+              number of tiles, skipping blocks without tiles: all wire tiles of a block are stamped
+              at once by indexing a table of stamps with the tiles' directions through
+              a (row, col, TILE_SIZE, TILE_SIZE) view of the block, the components overlapping
+              the block are blitted clipped to it, and the block is cut into the universe's chunks.
+            Only the tile planes and one block of cells are held at a time, so the memory taken
+            still follows the occupied area of the layout.
+        '''
+        import numpy as np
+        
+        height = self._height
+        width = self._width
+        kinds = np.frombuffer(self._kinds, dtype=np.uint8).reshape((height, width))
+        ids = np.frombuffer(self._ids, dtype=np.int32).reshape((height, width))
+        conductors = (kinds == TILE_CONDUCTOR)
+        
+        # neighbour tiles' kinds and ids, (row offset, col offset) -> planes, TILE_EMPTY outside the field
+        def shifted(plane, dr, dc, fill):
+            result = np.empty_like(plane)
+            result.fill(fill)
+            result[max(-dr, 0) : height - max(dr, 0), max(-dc, 0) : width - max(dc, 0)] = \
+                plane[max(dr, 0) : height + min(dr, 0), max(dc, 0) : width + min(dc, 0)]
+            return result
+        
+        # direction bits in the order of the direction strings, see _get_wire_dir()
+        directions = [('N', -1, 0), ('E', 0, 1), ('S', 1, 0), ('W', 0, -1)]
+        neighbours = []
+        codes = np.zeros((height, width), dtype=np.uint8)
+        for (bit, (letter, dr, dc)) in enumerate(directions):
+            neigh_kinds = shifted(kinds, dr, dc, TILE_EMPTY)
+            neigh_ids = shifted(ids, dr, dc, -1)
+            neighbours.append((neigh_kinds, neigh_ids))
+            same_net = conductors & (neigh_kinds == TILE_CONDUCTOR) & (neigh_ids == ids)
+            codes |= same_net.astype(np.uint8) << bit
+        
+        # wire ends connect to the components of their net
+        ends = conductors & ((codes == 1) | (codes == 2) | (codes == 4) | (codes == 8))
+        if (ends.any()):
+            end_net_ids = np.unique(ids[ends])
+            terminal_count = max(len(nets_dict[self._symbols[i]]) for i in end_net_ids)
+            # net id -> ids of the instances the net connects, -1 for none
+            terminals = np.empty((len(self._symbols), terminal_count), dtype=np.int32)
+            terminals.fill(-1)
+            for net_id in end_net_ids:
+                net = nets_dict[self._symbols[net_id]]
+                terminals[net_id, : len(net)] = [self.get_symbol_id(x[0]) for x in net]
+            end_terminals = terminals[ids[ends]]
+            end_codes = codes[ends]
+            for (bit, (neigh_kinds, neigh_ids)) in enumerate(neighbours):
+                connects = ((neigh_kinds[ends] == TILE_COMPONENT) &
+                            (end_terminals == neigh_ids[ends][:, np.newaxis]).any(axis=1))
+                end_codes |= connects.astype(np.uint8) << bit
+            codes[ends] = end_codes
+        
+        # stamp table indexed by wire direction code, entry 16 is an empty tile
+        wire_stamps = np.empty((17, TILE_SIZE, TILE_SIZE), dtype=np.uint8)
+        wire_stamps.fill(ord(' '))
+        for code in np.unique(codes[conductors]):
+            dir = ''.join(letter for (bit, (letter, dr, dc)) in enumerate(directions) if (code >> bit) & 1)
+            wire_stamps[code] = np.array([np.frombuffer(line, dtype=np.uint8) for line in wires.get_wire_pattern(dir)],
+                                         dtype=np.uint8)
+        stamp_indices = np.where(conductors, codes, 16)
+        
+        # components, stamps are shared by cell types; every component is listed
+        # in the blocks it overlaps, as (cell row, cell col, stamp)
+        block_tiles = BLOCK_CHUNKS * CHUNK_SIZE // TILE_SIZE
+        block_cells = block_tiles * TILE_SIZE
+        block_components = {}
+        cell_type_stamps = {}
+        for instance_id in np.unique(ids[kinds == TILE_COMPONENT]):
+            instance = instances_dict[self._symbols[instance_id]]
+            cell_type = instance.get_cell_type()
+            if (cell_type not in cell_type_stamps):
+                cell_type_stamps[cell_type] = np.frombuffer(instance.get_packed_pattern(), dtype=np.uint8).reshape(instance.get_size_in_cells())
+            pattern = cell_type_stamps[cell_type]
+            pos_row, pos_col = instance.get_pos_in_tiles()
+            row = pos_row * TILE_SIZE
+            col = pos_col * TILE_SIZE
+            for block_row in range(row // block_cells, (row + pattern.shape[0] - 1) // block_cells + 1):
+                for block_col in range(col // block_cells, (col + pattern.shape[1] - 1) // block_cells + 1):
+                    block_components.setdefault((block_row, block_col), []).append((row, col, pattern))
+        
+        for port_id in np.unique(ids[kinds == TILE_PORT]):
+            print 'Tile to Cell conversion error: do not know what to draw for label "' + self._symbols[port_id] + '"'
+        
+        ww = WireWorldUniverse(width * TILE_SIZE, height * TILE_SIZE)
+        block = np.empty((block_cells, block_cells), dtype=np.uint8)
+        block_view = block.reshape((block_tiles, TILE_SIZE, block_tiles, TILE_SIZE)).swapaxes(1, 2)
+        chunks = block.reshape((BLOCK_CHUNKS, CHUNK_SIZE, BLOCK_CHUNKS, CHUNK_SIZE)).swapaxes(1, 2)
+        occupied_tiles = (kinds != TILE_EMPTY)
+        for block_row in range((height + block_tiles - 1) // block_tiles):
+            tile_row = block_row * block_tiles
+            tile_rows = min(block_tiles, height - tile_row)
+            for block_col in range((width + block_tiles - 1) // block_tiles):
+                tile_col = block_col * block_tiles
+                tile_cols = min(block_tiles, width - tile_col)
+                if (not occupied_tiles[tile_row : tile_row + tile_rows, tile_col : tile_col + tile_cols].any()):
+                    continue
+                block.fill(ord(' '))
+                # wire tiles, all at once
+                block_view[: tile_rows, : tile_cols] = \
+                    wire_stamps[stamp_indices[tile_row : tile_row + tile_rows, tile_col : tile_col + tile_cols]]
+                # components, clipped to the block
+                top = block_row * block_cells
+                left = block_col * block_cells
+                for (row, col, pattern) in block_components.get((block_row, block_col), []):
+                    r0 = max(row, top)
+                    r1 = min(row + pattern.shape[0], top + block_cells)
+                    c0 = max(col, left)
+                    c1 = min(col + pattern.shape[1], left + block_cells)
+                    block[r0 - top : r1 - top, c0 - left : c1 - left] = pattern[r0 - row : r1 - row, c0 - col : c1 - col]
+                # cutting into chunks, the empty ones are left out
+                occupied = (chunks != ord(' ')).any(axis=3).any(axis=2)
+                for (chunk_row, chunk_col) in zip(*np.nonzero(occupied)):
+                    ww.write_chunk(block_row * BLOCK_CHUNKS + chunk_row, block_col * BLOCK_CHUNKS + chunk_col,
+                                   chunks[chunk_row, chunk_col].tostring())
+        return ww
+    
+    def write_cell_level_universe_by_tile(self, instances_dict, nets_dict):
+        '''
+            Same as write_cell_level_universe(), tile by tile in pure Python.
         '''
-        TILE_SIZE = 6
         ww = WireWorldUniverse(self._width * TILE_SIZE, self._height * TILE_SIZE)
         
+        kinds = self._kinds
+        ids = self._ids
+        width = self._width
+        height = self._height
         written_instances = {} # which have already been written
         # The loop goes in a classic direction and should
         # meet top-left corners first. However, TODO is to
         # make top-left corner have a special label or smth like that.
-        for r in range(self._height):
-            for c in range(self._width):
-                tile = self._field[r][c]
-                if (tile == ' '):
+        for r in range(height):
+            for c in range(width):
+                idx = r * width + c
+                kind = kinds[idx]
+                if (kind == TILE_EMPTY):
                     continue
-                elif (isinstance(tile, tuple) and tile[0] == 'C'): # conductor
+                elif (kind == TILE_CONDUCTOR):
                     pos_row = r * TILE_SIZE
                     pos_col = c * TILE_SIZE
                     
-                    # determining the wire direction
-                    # finding two neighbors with identical net_name, current piece of wire should connect to them 
-                    net_name = tile[1]
-                    dir = ''
-                    if (r-1 >= 0 and isinstance(self._field[r-1][c], tuple) and self._field[r-1][c][0] == 'C' and self._field[r-1][c][1] == net_name):
-                        dir += 'N'
-                    if (c+1 < self._width and isinstance(self._field[r][c+1], tuple) and self._field[r][c+1][0] == 'C' and self._field[r][c+1][1] == net_name):
-                        dir += 'E'
-                    if (r+1 < self._height and isinstance(self._field[r+1][c], tuple) and self._field[r+1][c][0] == 'C' and self._field[r+1][c][1] == net_name):
-                        dir += 'S'
-                    if (c-1 >= 0 and isinstance(self._field[r][c-1], tuple) and self._field[r][c-1][0] == 'C' and self._field[r][c-1][1] == net_name):
-                        dir += 'W'
-                    
-                    if (len(dir) == 1):
-                        # current piece of wire connects to instance port
-                        net = nets_dict[net_name]
-                        instance_names = [x[0] for x in net]
-                        if (r-1 >= 0 and self._field[r-1][c] in instance_names):
-                            dir += 'N'
-                        if (c+1 < self._width and self._field[r][c+1] in instance_names):
-                            dir += 'E'
-                        if (r+1 < self._height and self._field[r+1][c] in instance_names):
-                            dir += 'S'
-                        if (c-1 >= 0 and self._field[r][c-1] in instance_names):
-                            dir += 'W'
-                        
+                    dir = self._get_wire_dir(r, c, nets_dict)
                     
                     # writing pattern
                     pattern = wires.get_wire_pattern(dir)
                     ww.write_pattern(pos_row, pos_col, pattern)
                     continue
-                elif (tile in instances_dict): # component instance
+                elif (kind == TILE_COMPONENT): # component instance
+                    tile = self._symbols[ids[idx]]
                     if (tile in written_instances):
                         continue
                     instance = instances_dict[tile]
@@ -193,7 +616,7 @@ class TileLevelWireWorldUniverse:
                     
                     written_instances[tile] = True # the fact of the presense is important, not the value
                 else:
-                    print 'Tile to Cell conversion error: do not know what to draw for label "' + tile + '"'
+                    print 'Tile to Cell conversion error: do not know what to draw for label "' + self._symbols[ids[idx]] + '"'
                 
         return ww
-        
\ No newline at end of file
+        
@@ -11,6 +11,8 @@
     C       conductor
 '''
 
+import cell_library as cells
+
 _EW_wire_pattern = [
     '      ',
     '      ',
@@ -97,128 +99,43 @@ def get_wire_pattern(dir):
     return pattern
     
     
-class MODULE_PORT:
-   
-    _instance_name = ''
-    _port_name = ''
-    _direction = ''
-    
-    _pattern_input = [
+# Cells are declared as cell types of cell_library; ports are given as
+# (port name, position of the port cell inside the pattern,
+# tile outside of the pattern to which router should bring a wire).
+
+# Module ports have a single port, named after the module's port by the MODULE_PORT instance.
+# For INPUT module port the port cell is the one through which its signal generator
+# emits electrons, for OUTPUT module port - the cell where the wire enters.
+# The signal generator (or the output wire end) is the port cell itself, hence no delay.
+_MODULE_INPUT = cells.register(cells.CellType('MODULE_PORT_INPUT', delay = 0,
+    inputs = [],
+    outputs = [('Port', (3, 11), (0, 2))],
+    pattern = [
         'C  C        ',
         ' C  C       ',
         '  C  C   CC ',
         '  C  C  C  H',
         ' C  C    CT ',
         'C  C        '
-    ]
-    
-    _pattern_output = [
+    ]))
+
+_MODULE_OUTPUT = cells.register(cells.CellType('MODULE_PORT_OUTPUT', delay = 0,
+    inputs = [('Port', (3, 0), (0, -1))],
+    outputs = [],
+    pattern = [
         '      C  C  ',
         '       C  C ',
         '        C  C',
         'CCCCCC  C  C',
         '       C  C ',
         '      C  C  '
-    ]
-    
-    _tile_pos_row = 0   # position of the current instance in tile-space
-    _tile_pos_col = 0
-    
-    def __init__(self, instance_name, port_name, direction):
-        self._instance_name = instance_name
-        self._port_name = port_name
-        self._direction = direction
-    
-    def set_pos_in_tiles(self, row, col):
-        ''' 
-            Set position of the instance in tile space.
-            The position may be changed any number of times,
-            in case of multiple re-placement operations, for example.
-        '''
-        self._tile_pos_row = row
-        self._tile_pos_col = col
-    
-    def get_pos_in_tiles(self):
-        ''' 
-            Return position of the instance in tile space.
-            Returns tuple (row, col)
-        '''
-        return (self._tile_pos_row, self._tile_pos_col)
-    
-    def get_pattern(self):
-        if (self._direction == 'INPUT'):
-            return self._pattern_input
-        elif (self._direction == 'OUTPUT'):
-            return self._pattern_output
-        else:
-            return self._pattern_output
-        
-    def get_size_in_tiles(self):
-        ''' Tiles of size 6. Returns tuple (height, width) '''
-        return (1, 2)
-        
-    def get_size_in_cells(self):
-        ''' Returns tuple (height, width) '''
-        return (6, 12)
-        
-    def get_port_local_pos(self, port):
-        ''' 
-            Ports' locations are given in WW cell coordinate space inside gate pattern. 
-            Returns tuple (row, col), 0-based.
-        '''
-        return (0, 0)
-            
-    def get_port_local_tile_pos(self, port):
-        ''' 
-            Ports' locations are given in 6-tiles coordinate space 
-            outside of the pattern.
-            This method returns not the position of the port inside the pattern,
-            but rather a location outside of it to which router
-            should bring a wire. This allows gates to designate
-            specific directions from which wires may connect to their ports.
-        '''
-        if (self._direction == 'INPUT'):
-            return (0, 0+2)
-        elif (self._direction == 'OUTPUT'):
-            return (0, 0-1)
-        else:
-            return (0, 0-1)
-            
-    def get_name(self):
-        return self._instance_name
-        
-    def get_fan_in_count(self):
-        return 1
-        
-    def get_input_port_names(self):
-        if (self._direction == 'OUTPUT'):
-            return [self._port_name] # if this is OUTPUT module port, then its port is INPUT relative to the instance
-        else:
-            return []
-    
-    def get_input_port_names_sorted(self):
-        '''
-            Returns port names sorted by position from top to bottom.
-        '''
-        return self.get_input_port_names()
-    
-    def get_output_port_names(self):
-        if (self._direction == 'INPUT'):
-            return [self._port_name] # if this is INPUT module port, then its port is OUTPUT relative to the instance
-        else:
-            return []
-            
-    def get_output_port_names_sorted(self):
-        '''
-            Returns port names sorted by position from top to bottom.
-        '''
-        return self.get_output_port_names()
-            
-class DIRECTED_JUNCTION:
-       
-    _instance_name = ''
-    
-    _pattern = [
+    ]))
+
+# delay is to the farther of the two outputs
+_JUNCTION = cells.register(cells.CellType('DIRECTED_JUNCTION', delay = 12,
+    inputs = [('Input', (9, 0), (1, -1))],
+    outputs = [('Output0', (2, 5), (0, 1)), ('Output1', (9, 5), (1, 1))],
+    pattern = [
         '      ',
         '      ',
         '   CCC',
@@ -231,199 +148,26 @@ class DIRECTED_JUNCTION:
         'CCC CC',
         '      ',
         '      '
-    ]
-    
-    _tile_pos_row = 0   # position of the current instance in tile-space
-    _tile_pos_col = 0
-    
-    def __init__(self, instance_name):
-        self._instance_name = instance_name
-    
-    def set_pos_in_tiles(self, row, col):
-        ''' 
-            Set position of the instance in tile space.
-            The position may be changed any number of times,
-            in case of multiple re-placement operations, for example.
-        '''
-        self._tile_pos_row = row
-        self._tile_pos_col = col
-    
-    def get_pos_in_tiles(self):
-        ''' 
-            Return position of the instance in tile space.
-            Returns tuple (row, col)
-        '''
-        return (self._tile_pos_row, self._tile_pos_col)
-    
-    def get_pattern(self):
-        return self._pattern
-        
-    def get_size_in_tiles(self):
-        ''' Tiles of size 6. Returns tuple (height, width) '''
-        return (2, 1)
-        
-    def get_size_in_cells(self):
-        ''' Returns tuple (height, width) '''
-        return (12, 6)
-        
-    def get_port_local_pos(self, port):
-        ''' 
-            Ports' locations are given in WW cell coordinate space inside gate pattern. 
-            Returns tuple (row, col), 0-based.
-        '''
-        if (port == 'Input'):
-            return (9, 0)
-        elif (port == 'Output0'):
-            return (2, 5)
-        elif (port == 'Output1'):
-            return (9, 5)
-            
-    def get_port_local_tile_pos(self, port):
-        ''' 
-            Ports' locations are given in 6-tiles coordinate space 
-            outside of the pattern.
-            This method returns not the position of the port inside the pattern,
-            but rather a location outside of it to which router
-            should bring a wire. This allows gates to designate
-            specific directions from which wires may connect to their ports.
-        '''
-        if (port == 'Input'):
-            return (1, -1)
-        elif (port == 'Output0'):
-            return (0, 1)
-        elif (port == 'Output1'):
-            return (1, 1)
-            
-    def get_name(self):
-        return self._instance_name
-        
-    def get_fan_in_count(self):
-        return 1
-        
-    def get_input_port_names(self):
-        return ['Input']
-    
-    def get_input_port_names_sorted(self):
-        '''
-            Returns port names sorted by position from top to bottom.
-        '''
-        return ['Input']
-    
-    def get_fan_out_count(self):
-        return 2
-        
-    def get_output_port_names(self):
-        return ['Output0', 'Output1']
-            
-    def get_output_port_names_sorted(self):
-        '''
-            Returns port names sorted by position from top to bottom.
-        '''
-        return ['Output0', 'Output1']
-            
-class FEEDTHROUGH:
-       
-    _instance_name = ''
-    
-    _pattern = [
+    ]))
+
+_FEEDTHROUGH = cells.register(cells.CellType('FEEDTHROUGH', delay = 6,
+    inputs = [('Input', (3, 0), (0, -1))],
+    outputs = [('Output', (3, 5), (0, 1))],
+    pattern = [
         '      ',
         '      ',
         'CCCCCC',
         'CCCCCC',
         '      ',
         '      '
-    ]
-    
-    _tile_pos_row = 0   # position of the current instance in tile-space
-    _tile_pos_col = 0
-    
-    def __init__(self, instance_name):
-        self._instance_name = instance_name
-    
-    def set_pos_in_tiles(self, row, col):
-        ''' 
-            Set position of the instance in tile space.
-            The position may be changed any number of times,
-            in case of multiple re-placement operations, for example.
-        '''
-        self._tile_pos_row = row
-        self._tile_pos_col = col
-    
-    def get_pos_in_tiles(self):
-        ''' 
-            Return position of the instance in tile space.
-            Returns tuple (row, col)
-        '''
-        return (self._tile_pos_row, self._tile_pos_col)
-    
-    def get_pattern(self):
-        return self._pattern
-        
-    def get_size_in_tiles(self):
-        ''' Tiles of size 6. Returns tuple (height, width) '''
-        return (1, 1)
-        
-    def get_size_in_cells(self):
-        ''' Returns tuple (height, width) '''
-        return (6, 6)
-        
-    def get_port_local_pos(self, port):
-        ''' 
-            Ports' locations are given in WW cell coordinate space inside gate pattern. 
-            Returns tuple (row, col), 0-based.
-        '''
-        if (port == 'Input'):
-            return (3, 0)
-        elif (port == 'Output'):
-            return (3, 5)
-            
-    def get_port_local_tile_pos(self, port):
-        ''' 
-            Ports' locations are given in 6-tiles coordinate space 
-            outside of the pattern.
-            This method returns not the position of the port inside the pattern,
-            but rather a location outside of it to which router
-            should bring a wire. This allows gates to designate
-            specific directions from which wires may connect to their ports.
-        '''
-        if (port == 'Input'):
-            return (0, -1)
-        elif (port == 'Output'):
-            return (0, 1)
-        
-            
-    def get_name(self):
-        return self._instance_name
-        
-    def get_fan_in_count(self):
-        return 1
-        
-    def get_input_port_names(self):
-        return ['Input']
-            
-    def get_input_port_names_sorted(self):
-        '''
-            Returns port names sorted by position from top to bottom.
-        '''
-        return ['Input']
-            
-    def get_fan_out_count(self):
-        return 1
-        
-    def get_output_port_names(self):
-        return ['Output']
-    
-    def get_output_port_names_sorted(self):
-        '''
-            Returns port names sorted by position from top to bottom.
-        '''
-        return ['Output']
-      
-class DIRECTED_BICHANNEL_CROSSING:
-       
-    _instance_name = ''
-    
-    _pattern = [
+    ]))
+
+# delay is the same for both channels
+_CROSSING = cells.register(cells.CellType('DIRECTED_BICHANNEL_CROSSING', delay = 18,
+    inputs = [('InputA', (3, 0), (0, -1)), ('InputB', (9, 0), (1, -1))],
+    outputs = [('OutputA', (9, 17), (1, 3)), ('OutputB', (3, 17), (0, 3))],
+    outputs_sorted = ['OutputB', 'OutputA'],
+    pattern = [
         '                  ',
         '                  ',
         '        CC        ',
@@ -442,98 +186,138 @@ class DIRECTED_BICHANNEL_CROSSING:
         '                  ',
         '                  ',
         '                  '
-    ]
-    
-    _tile_pos_row = 0   # position of the current instance in tile-space
-    _tile_pos_col = 0
-    
-    def __init__(self, instance_name):
-        self._instance_name = instance_name
-    
-    def set_pos_in_tiles(self, row, col):
-        ''' 
-            Set position of the instance in tile space.
-            The position may be changed any number of times,
-            in case of multiple re-placement operations, for example.
-        '''
-        self._tile_pos_row = row
-        self._tile_pos_col = col
+    ]))
+
+_DELAY_LINE_HORIZONTAL = [
+    '            ',
+    '  CCCCCCC   ',
+    ' C       C  ',
+    'C      CC  C',
+    '      C   C ',
+    '       CCC  '
+]
+
+_DELAY_LINE_VERTICAL = [
+    '  C   ',
+    '   C  ',
+    '    C ',
+    '    C ',
+    '    C ',
+    '    C ',
+    ' C  C ',
+    'C C C ',
+    'C C C ',
+    'C  C  ',
+    ' C    ',
+    '  C   '
+]
+
+def _register_delay_line(direction, pattern, input_pos, output_pos):
+    '''
+        direction - where the signal goes; input_pos, output_pos - tuples (cell pos, tile pos)
+    '''
+    return cells.register(cells.CellType('DELAY_LINE_' + direction, delay = 18,
+        inputs = [('Input',) + input_pos],
+        outputs = [('Output',) + output_pos],
+        pattern = pattern))
+
+# direction of the signal -> cell type
+_DELAY_LINES = {
+    'E': _register_delay_line('E', _DELAY_LINE_HORIZONTAL, ((3, 0), (0, -1)), ((3, 11), (0, 2))),
+    'W': _register_delay_line('W', _DELAY_LINE_HORIZONTAL, ((3, 11), (0, 2)), ((3, 0), (0, -1))),
+    'S': _register_delay_line('S', _DELAY_LINE_VERTICAL, ((0, 2), (-1, 0)), ((11, 2), (2, 0))),
+    'N': _register_delay_line('N', _DELAY_LINE_VERTICAL, ((11, 2), (2, 0)), ((0, 2), (-1, 0))),
+}
+
+
+class MODULE_PORT(cells.Component):
+    '''
+        Stands for a port of the module: a signal generator for INPUT ports,
+        the end of a wire for OUTPUT ones.
+    '''
+    __slots__ = ('_port_name', '_direction')
     
-    def get_pos_in_tiles(self):
-        ''' 
-            Return position of the instance in tile space.
-            Returns tuple (row, col)
-        '''
-        return (self._tile_pos_row, self._tile_pos_col)
+    def __init__(self, instance_name, port_name, direction):
+        if (direction == 'INPUT'):
+            cells.Component.__init__(self, instance_name, _MODULE_INPUT)
+        else:
+            cells.Component.__init__(self, instance_name, _MODULE_OUTPUT)
+        self._port_name = port_name
+        self._direction = direction
     
-    def get_pattern(self):
-        return self._pattern
-        
-    def get_size_in_tiles(self):
-        ''' Tiles of size 6. Returns tuple (height, width) '''
-        return (3, 3)
-        
-    def get_size_in_cells(self):
-        ''' Returns tuple (height, width) '''
-        return (18, 18)
-        
     def get_port_local_pos(self, port):
-        ''' 
-            Ports' locations are given in WW cell coordinate space inside gate pattern. 
-            Returns tuple (row, col), 0-based.
-        '''
-        if (port == 'InputA'):
-            return (3, 0)
-        elif (port == 'OutputA'):
-            return (9, 17)
-        elif (port == 'InputB'):
-            return (9, 0)
-        elif (port == 'OutputB'):
-            return (3, 17)
-            
+        return self._cell_type.port_pos['Port']
+    
     def get_port_local_tile_pos(self, port):
-        ''' 
-            Ports' locations are given in 6-tiles coordinate space 
-            outside of the pattern.
-            This method returns not the position of the port inside the pattern,
-            but rather a location outside of it to which router
-            should bring a wire. This allows gates to designate
-            specific directions from which wires may connect to their ports.
-        '''
-        if (port == 'InputA'):
-            return (0, -1)
-        elif (port == 'OutputA'):
-            return (1, 3)
-        elif (port == 'InputB'):
-            return (1, -1)
-        elif (port == 'OutputB'):
-            return (0, 3)
-        
-            
-    def get_name(self):
-        return self._instance_name
+        return self._cell_type.port_tile_pos['Port']
         
     def get_fan_in_count(self):
-        return 2
+        return 1
         
     def get_input_port_names(self):
-        return ['InputA', 'InputB']
-            
+        if (self._direction == 'OUTPUT'):
+            return (self._port_name,) # if this is OUTPUT module port, then its port is INPUT relative to the instance
+        else:
+            return ()
+    
     def get_input_port_names_sorted(self):
         '''
             Returns port names sorted by position from top to bottom.
         '''
-        return ['InputA', 'InputB']
-            
-    def get_fan_out_count(self):
-        return 2
-        
+        return self.get_input_port_names()
+    
     def get_output_port_names(self):
-        return ['OutputA', 'OutputB']
-        
+        if (self._direction == 'INPUT'):
+            return (self._port_name,) # if this is INPUT module port, then its port is OUTPUT relative to the instance
+        else:
+            return ()
+            
     def get_output_port_names_sorted(self):
         '''
             Returns port names sorted by position from top to bottom.
         '''
-        return ['OutputB', 'OutputA']
-            
\ No newline at end of file
+        return self.get_output_port_names()
+    
+    
+class DIRECTED_JUNCTION(cells.Component):
+    __slots__ = ()
+    
+    def __init__(self, instance_name):
+        cells.Component.__init__(self, instance_name, _JUNCTION)
+    
+    
+class FEEDTHROUGH(cells.Component):
+    __slots__ = ()
+    
+    def __init__(self, instance_name):
+        cells.Component.__init__(self, instance_name, _FEEDTHROUGH)
+    
+    
+class DIRECTED_BICHANNEL_CROSSING(cells.Component):
+    __slots__ = ()
+    
+    def __init__(self, instance_name):
+        cells.Component.__init__(self, instance_name, _CROSSING)
+    
+    
+class DELAY_LINE(cells.Component):
+    '''
+        Serpentine piece of wire taking the place of two straight wire tiles
+        of a routed net. The signal goes through 18 cells instead of 12,
+        so the net gets TILE_SIZE generations slower.
+        The bulge of the serpentine touches the tiles below (for horizontal lines)
+        or to the left (for vertical lines), so those have to be empty
+        or hold wires not going on into the delay line.
+    '''
+    __slots__ = ()
+    
+    def __init__(self, instance_name, direction):
+        '''
+            direction - one of 'N', 'E', 'S', 'W': where the signal goes.
+        '''
+        if (direction not in _DELAY_LINES):
+            raise RuntimeError('DELAY_LINE: unknown direction ' + str(direction))
+        cells.Component.__init__(self, instance_name, _DELAY_LINES[direction])
+    
+    def is_horizontal(self):
+        return self._cell_type.size_in_tiles[0] == 1
@@ -0,0 +1,44 @@
+'''
+    EDIF2WW project tests.
+    Helpers shared by the test modules: puts the edif2ww sources on the import path
+    and places and routes the synthetic designs of the designs module.
+'''
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'edif2ww'))
+
+import designs
+import placement
+import routing
+
+
+def place_and_route(design, router='negotiated', channel_pitch=True, seed=0, channel_jobs=0):
+    '''
+        design - tuple (instances, nets, input_names, output_names), as made by designs.make_adder_design()
+        Places and routes the design the way edif2ww.py does, with the placement seeded,
+        channel_jobs as routing.do_cascade_routing() takes it.
+        Returns tuple (tile_field, instances, nets, routes, cascades).
+    '''
+    instances, nets, input_names, output_names = design
+    random.seed(seed)
+    tile_field, cascades = placement.do_cascade_placement(instances, nets, input_names, verbose=False,
+                                                          channel_pitch=channel_pitch)
+    routes = routing.do_cascade_routing(tile_field, nets, instances, cascades, router, channel_jobs)
+    return (tile_field, instances, nets, routes, cascades)
+
+
+def route_adder(n_bits, router='negotiated', channel_pitch=True, seed=0):
+    '''
+        Places and routes an n_bits-wide ripple-carry adder, see place_and_route().
+    '''
+    return place_and_route(designs.make_adder_design(n_bits), router, channel_pitch, seed)
+
+
+def get_cells(tile_field, instances, nets):
+    '''
+        Returns the cell-level pattern of the tile field, a list of strings.
+    '''
+    return [''.join(row) for row in tile_field.write_cell_level_universe_by_tile(instances, nets).get_field()]
@@ -0,0 +1,59 @@
+'''
+    EDIF2WW project tests.
+    Delay balancing must lower the largest gate input skew of the adder layouts,
+    and must never make the skew of a gate worse. The 1-bit adder must end up
+    with no skew at all, also in narrow channels where columns have to be inserted.
+
+    Run from the repository root:
+    python -m unittest discover -s tests
+'''
+
+import unittest
+
+import helpers
+import balancing
+import sta
+
+
+def _skews(instances, nets, routes):
+    return dict((skew['instance'], skew['skew']) for skew in sta.analyze(instances, nets, routes)['skews'])
+
+
+class BalancingTest(unittest.TestCase):
+
+    def assert_skew_drops(self, n_bits, router, channel_pitch):
+        label = '%d-bit adder, %s router, channel pitch %s' % (n_bits, router, channel_pitch)
+        tile_field, instances, nets, routes = helpers.route_adder(n_bits, router, channel_pitch)[:4]
+        before = _skews(instances, nets, routes)
+        report = balancing.balance_delays(tile_field, instances, nets, routes)
+        after = _skews(instances, nets, routes)
+        self.assertEqual(report['skew_before'], max(before.values()), label)
+        self.assertEqual(report['skew_after'], max(after.values()), label)
+        self.assertTrue(report['skew_after'] < report['skew_before'],
+                        '%s: largest skew %d -> %d' % (label, report['skew_before'], report['skew_after']))
+        for (inst_name, skew) in before.items():
+            self.assertTrue(after[inst_name] <= skew,
+                            '%s: skew of %s grew %d -> %d' % (label, inst_name, skew, after[inst_name]))
+        return report
+
+    def test_one_bit_adder(self):
+        for (router, channel_pitch) in [('negotiated', True), ('tracks', True), ('negotiated', False)]:
+            report = self.assert_skew_drops(1, router, channel_pitch)
+            self.assertEqual(report['skew_after'], 0, '%s router, channel pitch %s' % (router, channel_pitch))
+            self.assertEqual(report['unbalanced'], [])
+
+    def test_negotiated(self):
+        for n_bits in (1, 2, 3):
+            self.assert_skew_drops(n_bits, 'negotiated', True)
+
+    def test_tracks(self):
+        for n_bits in (1, 2, 3):
+            self.assert_skew_drops(n_bits, 'tracks', True)
+
+    def test_fixed_pitch(self):
+        for n_bits in (1, 2, 3):
+            self.assert_skew_drops(n_bits, 'negotiated', False)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+'''
+    EDIF2WW project tests.
+    The streaming EDIF parser must build the same statements as the original
+    shlex-based one.
+
+    Run from the repository root:
+    python -m unittest discover -s tests
+'''
+
+import os
+import tempfile
+import unittest
+
+import helpers
+import designs
+import edif_parser
+
+
+class EdifParserTest(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.edf')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def assert_same_as_shlex(self, label, text):
+        f = open(self.path, 'wb')
+        f.write(text)
+        f.close()
+        expected = edif_parser.parse_edif_shlex(self.path)
+        self.assertEqual(edif_parser.parse_edif(self.path), expected, 'parse_edif() differs on ' + label)
+        self.assertEqual(edif_parser.parse_edif_buffer(text), expected, 'parse_edif_buffer() differs on ' + label)
+
+    def test_adder(self):
+        self.assert_same_as_shlex('2-bit adder', designs.make_adder_edif(2))
+        self.assert_same_as_shlex('wide 3-bit adder', designs.make_adder_edif(3, ripple=False))
+
+    def test_fanout(self):
+        self.assert_same_as_shlex('fan-out 5', designs.make_fanout_edif(5))
+
+    def test_layout(self):
+        # line breaks, indentation and spacing must not matter
+        text = designs.make_adder_edif(1)
+        self.assert_same_as_shlex('adder on one line', ' '.join(text.split()))
+        self.assert_same_as_shlex('adder with extra spacing', text.replace(' (', '\n\t  (').replace(')', ' )'))
+
+    def test_unexpected_end(self):
+        text = designs.make_adder_edif(1)
+        self.assertRaises(RuntimeError, edif_parser.parse_edif_buffer, text[: len(text) // 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+'''
+    EDIF2WW project tests.
+    The macrocell file read back must hold the same cells as the RLE path's cell-level field,
+    wherever the layout is offset within the quadtree's root.
+
+    Run from the repository root:
+    python -m unittest discover -s tests
+'''
+
+import os
+import tempfile
+import unittest
+
+import helpers
+import designs
+import mc_writer
+
+
+class MacrocellTest(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.mc')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def assert_round_trip(self, label, tile_field, instances, nets):
+        cells = helpers.get_cells(tile_field, instances, nets)
+        mc_writer.write_macrocell(self.path, tile_field, instances, nets)
+        self.assertEqual(designs.trim_pattern(mc_writer.read_macrocell(self.path)), designs.trim_pattern(cells),
+                         'macrocell read back differs on ' + label)
+
+    def test_adder(self):
+        instances, nets, tile_field = designs.make_adder_layout(2)[:3]
+        self.assert_round_trip('2-bit adder', tile_field, instances, nets)
+
+    def test_rings(self):
+        for (size, pitch) in [(2, 3), (4, 5), (30, 5), (31, 7)]:
+            tile_field, nets = designs.make_ring_field(size, pitch)
+            self.assert_round_trip('%dx%d rings' % (size, size), tile_field, {}, nets)
+
+    def test_offsets(self):
+        instances, nets, tile_field = designs.make_adder_layout(1)[:3]
+        cells = helpers.get_cells(tile_field, instances, nets)
+        tile_patterns, plane = tile_field.get_tile_patterns(instances, nets)
+        for (row_offset, col_offset) in [(0, 0), (2, 6), (12, 4), (5, 3)]:
+            f = open(self.path, 'w')
+            mc_writer._build(f, tile_patterns, plane, tile_field, row_offset, col_offset)
+            f.close()
+            self.assertEqual(designs.trim_pattern(mc_writer.read_macrocell(self.path)), designs.trim_pattern(cells),
+                             'macrocell read back differs at offset (%d, %d)' % (row_offset, col_offset))
+
+
+if __name__ == '__main__':
+    unittest.main()
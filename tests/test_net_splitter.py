@@ -0,0 +1,79 @@
+'''
+    EDIF2WW project tests.
+    A net with N sinks must become a balanced tree of N-1 junctions,
+    ceil(log2(N)) deep, reaching every sink exactly once.
+
+    Run from the repository root:
+    python -m unittest discover -s tests
+'''
+
+import math
+import unittest
+
+import helpers
+import net_splitter
+import netlist
+import wireworld_lpm_tile6 as lpm
+import wireworld_wires_library_tile6 as wires
+
+
+def _make_fanout(n_sinks):
+    '''
+        Returns tuple (instances, nets): input 'en' drives Data0x0 of n_sinks LPM_AND gates,
+        and a 2-terminal net 'q' connects the first gate to an output.
+    '''
+    instances = {
+        'in_en': wires.MODULE_PORT('in_en', 'en', 'INPUT'),
+        'out_q': wires.MODULE_PORT('out_q', 'q', 'OUTPUT'),
+    }
+    en = [('in_en', 'en')]
+    for i in range(n_sinks):
+        instances['g%d' % i] = lpm.LPM_AND('g%d' % i, 2, 1)
+        en.append(('g%d' % i, 'Data0x0'))
+    nets = netlist.Netlist(instances, {'en': en, 'q': [('g0', 'Result0'), ('out_q', 'q')]})
+    return (instances, nets)
+
+
+class NetSplitterTest(unittest.TestCase):
+
+    def assert_tree(self, n_sinks):
+        instances, nets = _make_fanout(n_sinks)
+        q = nets['q']
+        split_nets = net_splitter.split_multiterminal_nets(nets, instances)
+        self.assertTrue(split_nets['q'] is q)
+        for net_name in split_nets:
+            self.assertEqual(len(split_nets[net_name]), 2)
+        junctions = [inst_name for inst_name in instances if isinstance(instances[inst_name], wires.DIRECTED_JUNCTION)]
+        self.assertEqual(len(junctions), n_sinks - 1)
+        # walk up from every sink to the source, counting junctions
+        depths = []
+        for i in range(n_sinks):
+            sink = ('g%d' % i, 'Data0x0')
+            sink_nets = [net_name for net_name in split_nets if sink in split_nets[net_name]]
+            self.assertEqual(len(sink_nets), 1, '%d sinks: %s is in %d nets' % (n_sinks, sink[0], len(sink_nets)))
+            depth = 0
+            driver = split_nets.get_driver(sink_nets[0])
+            while (driver != ('in_en', 'en')):
+                self.assertTrue(driver[0] in junctions)
+                depth += 1
+                driver = split_nets.get_driver(split_nets.find_net((driver[0], 'Input')))
+            depths.append(depth)
+        # no junction output is left unconnected
+        for junction in junctions:
+            self.assertEqual(len(split_nets.get_outgoing_nets(junction)), 2)
+        self.assertEqual(max(depths), int(math.ceil(math.log(n_sinks, 2))), '%d sinks: depths %s' % (n_sinks, depths))
+        self.assertTrue(max(depths) - min(depths) <= 1, '%d sinks: depths %s' % (n_sinks, depths))
+
+    def test_trees(self):
+        for n_sinks in range(2, 18) + [31, 32, 33, 100]:
+            self.assert_tree(n_sinks)
+
+    def test_no_source(self):
+        instances, nets = _make_fanout(3)
+        nets['en'] = nets['en'][1:] + [('out_q', 'q')]
+        del nets['q']
+        self.assertRaises(RuntimeError, net_splitter.split_multiterminal_nets, nets, instances)
+
+
+if __name__ == '__main__':
+    unittest.main()
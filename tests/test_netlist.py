@@ -0,0 +1,93 @@
+'''
+    EDIF2WW project tests.
+    The indexes of netlist.Netlist must follow the nets as they are added,
+    replaced and removed.
+
+    Run from the repository root:
+    python -m unittest discover -s tests
+'''
+
+import unittest
+
+import helpers
+import designs
+import netlist
+import wireworld_lpm_tile6 as lpm
+import wireworld_wires_library_tile6 as wires
+
+
+def _make_half_adder():
+    '''
+        Returns tuple (instances, nets): a, b -> XOR -> s, a, b -> AND -> c.
+    '''
+    instances = {
+        'in_a': wires.MODULE_PORT('in_a', 'a', 'INPUT'),
+        'in_b': wires.MODULE_PORT('in_b', 'b', 'INPUT'),
+        'out_s': wires.MODULE_PORT('out_s', 's', 'OUTPUT'),
+        'out_c': wires.MODULE_PORT('out_c', 'c', 'OUTPUT'),
+        'x': lpm.LPM_XOR('x', 2, 1),
+        'g': lpm.LPM_AND('g', 2, 1),
+    }
+    nets = netlist.Netlist(instances, {
+        'a': [('x', 'Data0x0'), ('in_a', 'a'), ('g', 'Data0x0')],
+        'b': [('in_b', 'b'), ('x', 'Data1x0'), ('g', 'Data1x0')],
+        's': [('x', 'Result0'), ('out_s', 's')],
+        'c': [('out_c', 'c'), ('g', 'Result0')],
+    })
+    return (instances, nets)
+
+
+class NetlistTest(unittest.TestCase):
+
+    def test_drivers_and_sinks(self):
+        instances, nets = _make_half_adder()
+        self.assertEqual(nets.get_driver('a'), ('in_a', 'a'))
+        self.assertEqual(nets.get_sinks('a'), [('x', 'Data0x0'), ('g', 'Data0x0')])
+        self.assertEqual(nets.get_driver('c'), ('g', 'Result0'))
+        self.assertEqual(nets.get_sinks('c'), [('out_c', 'c')])
+        self.assertEqual(nets.find_net(('g', 'Data1x0')), 'b')
+        self.assertEqual(nets.find_other_port(('out_s', 's')), ('x', 'Result0'))
+        self.assertRaises(RuntimeError, nets.find_other_port, ('in_a', 'a'))
+        self.assertEqual(nets.get_incoming_nets('g'), ['a', 'b'])
+        self.assertEqual(nets.get_outgoing_nets('g'), ['c'])
+        self.assertEqual(nets.get_outgoing_nets('out_c'), [])
+        self.assertEqual(sorted(nets.get_adjacent('x')), ['g', 'g', 'in_a', 'in_b', 'out_s'])
+
+    def test_replace_and_remove(self):
+        instances, nets = _make_half_adder()
+        instances['inv'] = lpm.LPM_INV('inv', 1, 1)
+        nets['c'] = [('g', 'Result0'), ('inv', 'Data')]
+        nets['c_inv'] = [('inv', 'Result'), ('out_c', 'c')]
+        self.assertEqual(nets.get_sinks('c'), [('inv', 'Data')])
+        self.assertEqual(nets.find_net(('out_c', 'c')), 'c_inv')
+        self.assertEqual(nets.get_incoming_nets('out_c'), ['c_inv'])
+        del nets['s']
+        self.assertFalse('s' in nets)
+        self.assertEqual(nets.get_outgoing_nets('x'), [])
+        self.assertEqual(nets.get_incoming_nets('out_s'), [])
+        self.assertRaises(RuntimeError, nets.find_net, ('x', 'Result0'))
+        self.assertEqual(sorted(nets), ['a', 'b', 'c', 'c_inv'])
+
+    def test_topological_order(self):
+        instances, nets = _make_half_adder()
+        self.assertEqual(nets.get_topological_order(), ['in_a', 'in_b', 'x', 'g', 'out_s', 'out_c'])
+        instances, nets, input_names, output_names = designs.make_adder_design(3)
+        order = nets.get_topological_order()
+        self.assertEqual(sorted(order), sorted(instances))
+        position = dict((inst_name, i) for (i, inst_name) in enumerate(order))
+        for net_name in nets:
+            driver = nets.get_driver(net_name)
+            for (inst_name, port_name) in nets.get_sinks(net_name):
+                self.assertTrue(position[driver[0]] < position[inst_name],
+                                '%s comes before its driver %s' % (inst_name, driver[0]))
+
+    def test_loop(self):
+        instances, nets = _make_half_adder()
+        nets['s'] = [('x', 'Result0'), ('g', 'Data0x0')]
+        nets['a'] = [('g', 'Result0'), ('x', 'Data0x0')]
+        del nets['c']
+        self.assertRaises(RuntimeError, nets.get_topological_order)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+'''
+    EDIF2WW project tests.
+    Levelization must put every component in the cascade after its latest driver,
+    and ordering components within cascades must never add net crossings.
+
+    Run from the repository root:
+    python -m unittest discover -s tests
+'''
+
+import itertools
+import random
+import unittest
+
+import helpers
+import designs
+import netlist
+import placement
+import wireworld_lpm_tile6 as lpm
+import wireworld_wires_library_tile6 as wires
+
+
+def _get_cascades(design):
+    '''
+        Returns tuple (instances, nets, cascades) of the design with its feedthroughs added,
+        as do_cascade_placement() has them before the ordering.
+    '''
+    instances, nets, input_names = design[:3]
+    cascades = placement._divide_into_cascades(instances, nets, input_names)
+    placement._add_feedthroughs(instances, nets, cascades)
+    return (instances, nets, cascades)
+
+
+def _get_levels(instances, nets, input_names):
+    '''
+        Returns {inst_name: length of the longest path to it from the inputs}, by recursion.
+    '''
+    levels = dict([(inst_name, 0) for inst_name in input_names])
+    def get_level(inst_name):
+        if (inst_name not in levels):
+            drivers = [nets.get_driver(net_name)[0] for net_name in nets.get_incoming_nets(inst_name)]
+            levels[inst_name] = 1 + max([get_level(driver) for driver in drivers])
+        return levels[inst_name]
+    for inst_name in instances:
+        get_level(inst_name)
+    return levels
+
+
+class LevelizationTest(unittest.TestCase):
+
+    def assert_levels(self, label, design):
+        instances, nets, input_names = design[:3]
+        cascades = placement._divide_into_cascades(instances, nets, input_names)
+        levels = _get_levels(instances, nets, input_names)
+        self.assertEqual(sorted([inst_name for cascade in cascades for inst_name in cascade]), sorted(instances), label)
+        for (idx, cascade) in enumerate(cascades):
+            for inst_name in cascade:
+                self.assertEqual(levels[inst_name], idx, '%s: %s is in cascade %d' % (label, inst_name, idx))
+        # after the feedthroughs are added, every net connects neighboring cascades
+        placement._add_feedthroughs(instances, nets, cascades)
+        cascade_of = {}
+        for (idx, cascade) in enumerate(cascades):
+            for inst_name in cascade:
+                cascade_of[inst_name] = idx
+        for net_name in nets:
+            driver = nets.get_driver(net_name)[0]
+            for sink in nets.get_sinks(net_name):
+                self.assertEqual(cascade_of[sink[0]], cascade_of[driver] + 1, '%s: net %s' % (label, net_name))
+
+    def test_adders(self):
+        self.assert_levels('4-bit adder', designs.make_adder_design(4))
+        self.assert_levels('3-bit wide adder', designs.make_adder_design(3, ripple=False))
+
+    def test_fanout(self):
+        self.assert_levels('fanout 8', designs.make_fanout_design(8))
+
+    def test_loop(self):
+        '''
+            Components on a combinational loop are left out.
+        '''
+        instances = {
+            'in_a': wires.MODULE_PORT('in_a', 'a', 'INPUT'),
+            'in_b': wires.MODULE_PORT('in_b', 'b', 'INPUT'),
+            'x': lpm.LPM_XOR('x', 2, 1),
+            'g': lpm.LPM_AND('g', 2, 1),
+            'inv': lpm.LPM_INV('inv', 1, 1),
+        }
+        nets = netlist.Netlist(instances, {
+            'a': [('in_a', 'a'), ('x', 'Data0x0')],
+            'b': [('in_b', 'b'), ('inv', 'Data')],
+            'b_inv': [('inv', 'Result'), ('g', 'Data1x0')],
+            'x_out': [('x', 'Result0'), ('g', 'Data0x0')],
+            'g_out': [('g', 'Result0'), ('x', 'Data1x0')],
+        })
+        self.assertEqual(placement._divide_into_cascades(instances, nets, ['in_a', 'in_b']), [['in_a', 'in_b'], ['inv']])
+
+
+class OrderingTest(unittest.TestCase):
+
+    def assert_fewer_crossings(self, label, design, seed):
+        instances, nets, cascades = _get_cascades(design)
+        rng = random.Random(seed)
+        for cascade in cascades:
+            rng.shuffle(cascade)
+        links = placement._get_links(instances, nets, cascades)
+        shuffled = [sorted(cascade) for cascade in cascades]
+        before = placement._count_all_crossings(links, cascades)
+        result = placement._find_optimal_intracascade_ordering(instances, nets, cascades, verbose=False)
+        after = placement._count_all_crossings(links, cascades)
+        self.assertEqual(result, (before, after), label)
+        self.assertTrue(after <= before, '%s: %d crossings -> %d' % (label, before, after))
+        self.assertEqual([sorted(cascade) for cascade in cascades], shuffled, label + ': components left their cascades')
+
+    def test_adders(self):
+        for seed in range(4):
+            for (n_bits, ripple) in [(1, True), (3, True), (4, False)]:
+                self.assert_fewer_crossings('%d-bit adder, seed %d' % (n_bits, seed),
+                                            designs.make_adder_design(n_bits, ripple), seed)
+
+    def test_fanout(self):
+        for seed in range(4):
+            self.assert_fewer_crossings('fanout 8, seed %d' % seed, designs.make_fanout_design(8), seed)
+
+    def test_count_inversions(self):
+        rng = random.Random(0)
+        for n in range(12):
+            sequence = [rng.randint(0, 5) for i in range(n)]
+            inversions = len([(a, b) for (a, b) in itertools.combinations(sequence, 2) if (a > b)])
+            self.assertEqual(placement._count_inversions(list(sequence)), inversions, str(sequence))
+
+
+if __name__ == '__main__':
+    unittest.main()
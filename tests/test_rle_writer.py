@@ -0,0 +1,79 @@
+'''
+    EDIF2WW project tests.
+    The RLE file must hold runs and merged row ends, never split an item
+    between lines, and read back to the pattern it was written from.
+
+    Run from the repository root:
+    python -m unittest discover -s tests
+'''
+
+import os
+import tempfile
+import unittest
+
+import helpers
+import designs
+import rle_writer
+
+
+class RleTest(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.rle')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def read_lines(self):
+        f = open(self.path, 'r')
+        lines = [line.rstrip('\n') for line in f]
+        f.close()
+        return lines
+
+    def test_runs(self):
+        pattern = ['CCCC HT',
+                   '',
+                   '      ',
+                   ' C',
+                   'CCCCCCCCCCCC']
+        rle_writer.write_rle(self.path, pattern)
+        lines = self.read_lines()
+        self.assertEqual(lines[0], 'x = 12, y = 5, rule = WireWorld')
+        # blank rows and trailing spaces are merged into the row end run
+        self.assertEqual(lines[1:], ['4C.AB3$.C$12C!'])
+        self.assertEqual(rle_writer.read_rle(self.path), [row.ljust(12) for row in pattern])
+
+    def test_list_rows(self):
+        pattern = [list('C  C'), list('HHT')]
+        rle_writer.write_rle(self.path, pattern)
+        self.assertEqual(self.read_lines()[1:], ['C2.C$2AB!'])
+        self.assertEqual(rle_writer.read_rle(self.path), ['C  C', 'HHT '])
+
+    def test_line_width(self):
+        pattern = ['C H' * 20, '', 'T' * 15]
+        rle_writer.write_rle(self.path, pattern, line_width=10)
+        lines = self.read_lines()
+        for line in lines[1:]:
+            self.assertTrue(len(line) <= 10, 'line "%s" is too long' % line)
+        # no item is split between lines
+        self.assertEqual(''.join(lines[1:]), 'C.A' * 20 + '2$15B!')
+        self.assertEqual(lines[1:3], ['C.AC.AC.AC', '.AC.AC.AC.'])
+        self.assertEqual(rle_writer.read_rle(self.path), [row.ljust(60) for row in pattern])
+
+    def test_unknown_state(self):
+        self.assertRaises(RuntimeError, rle_writer.write_rle, self.path, ['CX'])
+
+    def test_adder(self):
+        instances, nets, tile_field = designs.make_adder_layout(1)[:3]
+        cells = helpers.get_cells(tile_field, instances, nets)
+        rle_writer.write_rle(self.path, cells)
+        lines = self.read_lines()
+        self.assertEqual(lines[0], 'x = %d, y = %d, rule = WireWorld' % (max([len(row) for row in cells]), len(cells)))
+        for line in lines[1:]:
+            self.assertTrue(len(line) <= rle_writer.RLE_LINE_WIDTH)
+        self.assertEqual(designs.trim_pattern(rle_writer.read_rle(self.path)), designs.trim_pattern(cells))
+
+
+if __name__ == '__main__':
+    unittest.main()
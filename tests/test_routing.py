@@ -0,0 +1,268 @@
+'''
+    EDIF2WW project tests.
+    The maze router must find shortest wires around obstacles, reusing its
+    search grids from net to net; neither the route cache nor routing the channels
+    between cascades in separate windows may change the wires, and track assignment
+    must give the channels as few tracks as their nets allow.
+
+    Run from the repository root:
+    python -m unittest discover -s tests
+'''
+
+import collections
+import unittest
+
+import helpers
+import designs
+import routing
+import wireworld as ww
+import wireworld_wires_library_tile6 as wires
+
+
+def _shortest_length(fld, start, dest):
+    '''
+        Returns the number of tiles of the shortest wire from start to dest over empty tiles, by BFS.
+    '''
+    dist = {start: 1}
+    queue = collections.deque([start])
+    while (len(queue) > 0):
+        row, col = queue.popleft()
+        if ((row, col) == dest):
+            return dist[dest]
+        for (r, c) in [(row - 1, col), (row, col + 1), (row + 1, col), (row, col - 1)]:
+            if (0 <= r < fld.get_height() and 0 <= c < fld.get_width() and (r, c) not in dist and
+                    (fld.get_kind(r, c) == ww.TILE_EMPTY or (r, c) == dest)):
+                dist[(r, c)] = dist[(row, col)] + 1
+                queue.append((r, c))
+    return None
+
+
+def _place_ports(fld, instances, k, row, in_col, out_col):
+    '''
+        Places input and output module ports of net k, returns the net.
+    '''
+    in_port = wires.MODULE_PORT('in%d' % k, 'p%d' % k, 'INPUT')
+    out_port = wires.MODULE_PORT('out%d' % k, 'p%d' % k, 'OUTPUT')
+    for (inst, col) in [(in_port, in_col), (out_port, out_col)]:
+        fld.place_component(row, col, inst)
+        inst.set_pos_in_tiles(row, col)
+        instances[inst.get_name()] = inst
+    return [('in%d' % k, 'p%d' % k), ('out%d' % k, 'p%d' % k)]
+
+
+def _get_terminal(instances, port):
+    '''
+        Returns the tile the router brings the wire of the port (inst_name, port_name) to.
+    '''
+    inst = instances[port[0]]
+    row, col = inst.get_pos_in_tiles()
+    d_row, d_col = inst.get_port_local_tile_pos(port[1])
+    return (row + d_row, col + d_col)
+
+
+class MazeRoutingTest(unittest.TestCase):
+
+    def setUp(self):
+        routing.reset_route_cache()
+
+    def assert_shortest_wire(self, fld, instances, net_name, net):
+        start, dest = [_get_terminal(instances, port) for port in net]
+        shortest = _shortest_length(fld, start, dest)
+        path = routing.wave_route_wire(fld, instances, net_name, net)
+        self.assertNotEqual(path, None, net_name + ' not routed')
+        self.assertEqual(path[0], start)
+        self.assertEqual(path[-1], dest)
+        self.assertEqual(len(path), shortest, '%s: %d tiles, the shortest wire has %d' % (net_name, len(path), shortest))
+        for (a, b) in zip(path, path[1:]):
+            self.assertEqual(abs(a[0] - b[0]) + abs(a[1] - b[1]), 1, net_name + ' is not connected')
+        for (row, col) in path:
+            self.assertEqual(fld.get(row, col), ('C', net_name))
+
+    def test_around_wall(self):
+        fld = ww.TileLevelWireWorldUniverse(width = 30, height = 16)
+        instances = {}
+        # a wall with a gap at the bottom between the ports
+        for row in range(0, 13):
+            fld.place_conductor(row, 14, 'wall')
+        net = _place_ports(fld, instances, 0, 2, 0, 26)
+        self.assert_shortest_wire(fld, instances, 'net0', net)
+
+    def test_several_nets(self):
+        '''
+            Every net sees the wires of the ones routed before it.
+        '''
+        fld = ww.TileLevelWireWorldUniverse(width = 30, height = 40)
+        instances = {}
+        for row in range(0, 17):
+            fld.place_conductor(row, 14, 'wall')
+        for k in range(4):
+            net = _place_ports(fld, instances, k, 4 * k + 2, 0, 26)
+            self.assert_shortest_wire(fld, instances, 'net%d' % k, net)
+
+    def test_blocked(self):
+        fld = ww.TileLevelWireWorldUniverse(width = 30, height = 16)
+        instances = {}
+        net = _place_ports(fld, instances, 0, 2, 0, 26)
+        # the output port's terminal is walled in, growing the field does not help
+        dest = _get_terminal(instances, net[1])
+        for (row, col) in [(dest[0] - 1, dest[1]), (dest[0] + 1, dest[1]), (dest[0], dest[1] - 1)]:
+            fld.place_conductor(row, col, 'wall')
+        self.assertEqual(routing.wave_route_wire(fld, instances, 'net0', net), None)
+
+
+
+class NegotiatedRoutingTest(unittest.TestCase):
+
+    def test_blocked(self):
+        '''
+            A net without a path is tried again by the maze router and reported, the rest are routed.
+        '''
+        fld = ww.TileLevelWireWorldUniverse(width = 30, height = 16)
+        instances = {}
+        nets = {}
+        for k in range(3):
+            nets['net%d' % k] = _place_ports(fld, instances, k, 4 * k + 2, 0, 26)
+        dest = _get_terminal(instances, nets['net1'][1])
+        for (row, col) in [(dest[0] - 1, dest[1]), (dest[0] + 1, dest[1]), (dest[0], dest[1] - 1)]:
+            fld.place_conductor(row, col, 'wall')
+        height = fld.get_height()
+        routes, report = routing.route_negotiated(fld, nets, instances, ['net0', 'net1', 'net2'])
+        self.assertEqual(sorted(routes), ['net0', 'net2'])
+        self.assertEqual(report['failed'], 1)
+        self.assertEqual(report['unrouted'], ['net1'])
+        self.assertFalse(report['converged'])
+        # the field grew for the failed search once, the maze router does not grow it again
+        self.assertEqual(fld.get_height(), height + routing.MAX_FIELD_GROWTHS * routing.FIELD_GROWTH_STEP)
+
+
+class RouteCacheTest(unittest.TestCase):
+    '''
+        Routes replayed from the route cache must be the ones the search would find.
+        Only the greedy router and the windows of channel routing search by wave_route_wire().
+    '''
+
+    def assert_same_fields(self, label, make_design, channel_pitch=True, channel_jobs=0):
+        tile_field, instances, nets, routes = helpers.place_and_route(make_design(), 'greedy', channel_pitch,
+                                                                      channel_jobs=channel_jobs)[:4]
+        self.assertTrue(routing.get_route_cache_stats()['hits'] > 0, label + ': no route cache hits')
+        size = routing._route_cache.size
+        routing._route_cache.size = 0
+        try:
+            uncached_field, instances, nets, uncached_routes = helpers.place_and_route(make_design(), 'greedy', channel_pitch,
+                                                                                       channel_jobs=channel_jobs)[:4]
+        finally:
+            routing._route_cache.size = size
+        self.assertEqual(routing.get_route_cache_stats()['hits'], 0)
+        self.assertEqual(uncached_routes, routes, label + ': routes differ')
+        self.assertEqual(helpers.get_cells(uncached_field, instances, nets), helpers.get_cells(tile_field, instances, nets),
+                         label + ': fields differ')
+
+    def test_designs(self):
+        self.assert_same_fields('4-bit adder', lambda: designs.make_adder_design(4))
+        self.assert_same_fields('3-bit wide adder', lambda: designs.make_adder_design(3, ripple=False))
+        self.assert_same_fields('fanout 8', lambda: designs.make_fanout_design(8))
+
+    def test_fixed_pitch(self):
+        self.assert_same_fields('2-bit adder', lambda: designs.make_adder_design(2), False)
+
+    def test_channels(self):
+        self.assert_same_fields('4-bit adder', lambda: designs.make_adder_design(4), channel_jobs=1)
+
+
+class ChannelRoutingTest(unittest.TestCase):
+    '''
+        Routing the channels between cascades in separate windows must give the same wires
+        as routing the whole field.
+    '''
+
+    def assert_same_routes(self, label, make_design, router, channel_pitch):
+        tile_field, instances, nets, routes = helpers.place_and_route(make_design(), router, channel_pitch)[:4]
+        for jobs in [1, 2]:
+            label_jobs = '%s, %s router, %d process(es)' % (label, router, jobs)
+            window_field, instances, nets, window_routes = helpers.place_and_route(make_design(), router, channel_pitch,
+                                                                                   channel_jobs=jobs)[:4]
+            self.assertEqual(sorted(window_routes), sorted(routes), label_jobs + ': routed nets differ')
+            for net_name in routes:
+                self.assertEqual(window_routes[net_name], routes[net_name], label_jobs + ': net ' + net_name)
+            if (len(routes) == len(nets)):
+                self.assertEqual(helpers.get_cells(window_field, instances, nets), helpers.get_cells(tile_field, instances, nets),
+                                 label_jobs + ': fields differ')
+
+    def test_greedy(self):
+        self.assert_same_routes('4-bit adder', lambda: designs.make_adder_design(4), 'greedy', True)
+        self.assert_same_routes('3-bit wide adder', lambda: designs.make_adder_design(3, ripple=False), 'greedy', True)
+        self.assert_same_routes('fanout 8', lambda: designs.make_fanout_design(8), 'greedy', True)
+
+    def test_fixed_pitch(self):
+        '''
+            With the cascades CASCADE_PITCH apart some nets are left unrouted and routing
+            the whole field grows it trying them, but the wires are the same.
+        '''
+        self.assert_same_routes('2-bit adder', lambda: designs.make_adder_design(2), 'greedy', False)
+        self.assert_same_routes('fanout 8', lambda: designs.make_fanout_design(8), 'greedy', False)
+
+    def test_negotiated(self):
+        self.assert_same_routes('4-bit adder', lambda: designs.make_adder_design(4), 'negotiated', True)
+        self.assert_same_routes('3-bit wide adder', lambda: designs.make_adder_design(3, ripple=False), 'negotiated', True)
+
+
+
+class TrackAssignmentTest(unittest.TestCase):
+
+    def assert_tracks(self, channel_nets, expected_tracks, expected_width, expected_rejected=[]):
+        tracks, width, rejected = routing.assign_tracks(channel_nets)
+        self.assertEqual(tracks, expected_tracks)
+        self.assertEqual(width, expected_width)
+        self.assertEqual(rejected, expected_rejected)
+        # wires along the tracks, from the left terminal in column 0 to the right one right of the tracks, never share a tile
+        owner = {}
+        for (net_name, left_row, right_row) in channel_nets:
+            if (net_name in rejected):
+                continue
+            track_col = 1 + (tracks[net_name] or 0)
+            step = 1 if (right_row >= left_row) else -1
+            tiles = [(left_row, col) for col in range(0, track_col)]
+            tiles += [(row, track_col) for row in range(left_row, right_row, step)]
+            tiles += [(right_row, col) for col in range(track_col, width + 2)]
+            for tile in tiles:
+                self.assertEqual(owner.get(tile, net_name), net_name, '%s and %s share %s' % (owner.get(tile), net_name, str(tile)))
+                owner[tile] = net_name
+
+    def test_apart(self):
+        self.assert_tracks([('a', 0, 2), ('b', 4, 6), ('c', 9, 7)], {'a': 0, 'b': 0, 'c': 0}, 1)
+
+    def test_chain(self):
+        '''
+            Every net going down overlaps the next one, three tracks are the least.
+        '''
+        self.assert_tracks([('a', 0, 6), ('b', 2, 8), ('c', 4, 10)], {'a': 2, 'b': 1, 'c': 0}, 3)
+
+    def test_mixed(self):
+        '''
+            Nets going down never overlap the ones going up, straight nets need no track.
+        '''
+        self.assert_tracks([('d', 12, 8), ('a', 0, 3), ('b', 5, 5), ('c', 9, 6), ('e', 1, 4)],
+                           {'a': 1, 'e': 0, 'b': None, 'c': 0, 'd': 1}, 2)
+
+    def test_out_of_order(self):
+        self.assert_tracks([('a', 0, 3), ('b', 1, 2), ('c', 4, 6)], {'a': 0, 'c': 0}, 1, ['b'])
+
+    def test_empty(self):
+        self.assert_tracks([], {}, 0)
+
+    def test_adder(self):
+        '''
+            With channel pitch, every channel of a routed adder is wide enough for its tracks.
+        '''
+        tile_field, instances, nets, routes, cascades = helpers.route_adder(3, 'tracks')
+        self.assertEqual(sorted(routes), sorted(nets))
+        for k in range(len(cascades) - 1):
+            channel_nets, first_track_col = routing.get_channel_nets(nets, instances, cascades, k)
+            tracks, width, rejected = routing.assign_tracks(channel_nets)
+            right_col = instances[cascades[k + 1][0]].get_pos_in_tiles()[1]
+            self.assertTrue(width <= right_col - 1 - first_track_col, 'channel %d is too narrow' % k)
+            self.assertEqual(rejected, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+'''
+    EDIF2WW project tests.
+    Cross-engine test of the simulators: the event-driven and the bit-sliced
+    engines must agree with the dense one bit for bit, generation by generation.
+
+    Run from the repository root:
+    python -m unittest discover -s tests
+'''
+
+import random
+import unittest
+
+import helpers
+import designs
+import simulate
+
+GENERATIONS = 120
+
+
+def _random_pattern(rng, height, width, copper_density):
+    '''
+        Returns a random soup of copper with some electrons on it.
+    '''
+    pattern = []
+    for r in range(height):
+        row = ''
+        for c in range(width):
+            if (rng.random() < copper_density):
+                row += rng.choice('HTCCCCCC')
+            else:
+                row += ' '
+        pattern.append(row)
+    return pattern
+
+
+def _reseed_electrons(rng, pattern):
+    '''
+        Returns the pattern with the same copper and electrons put anew.
+    '''
+    return [''.join([rng.choice('HTCCCCCC') if (c != ' ') else ' ' for c in row]) for row in pattern]
+
+
+class CrossEngineTest(unittest.TestCase):
+
+    def assert_engines_agree(self, label, pattern, generations=GENERATIONS):
+        dense = simulate.DenseSimulator(pattern)
+        event = simulate.EventSimulator(pattern)
+        multi = simulate.MultiVectorSimulator(pattern)
+        for g in range(generations + 1):
+            expected = dense.get_pattern()
+            self.assertEqual(event.get_pattern(), expected,
+                             'event-driven engine disagrees on %s at generation %d' % (label, g))
+            for lane in (0, simulate.LANES // 2, simulate.LANES - 1):
+                self.assertEqual(multi.get_pattern(lane), expected,
+                                 'bit-sliced engine, lane %d, disagrees on %s at generation %d' % (lane, label, g))
+            dense.step()
+            event.step()
+            multi.step()
+
+    def test_random_soups(self):
+        rng = random.Random(0)
+        for i in range(20):
+            pattern = _random_pattern(rng, rng.randint(1, 40), rng.randint(1, 40), rng.random())
+            self.assert_engines_agree('random soup %d' % i, pattern)
+
+    def test_single_row(self):
+        self.assert_engines_agree('single row', ['THCCCCCCCCC'])
+
+    def test_empty(self):
+        self.assert_engines_agree('empty', ['   ', '   '])
+
+    def test_adder_layout(self):
+        cell_field = designs.make_adder_layout(1)[3]
+        self.assert_engines_agree('1-bit adder', cell_field.get_field(), 300)
+
+    def test_independent_lanes(self):
+        '''
+            Lanes of the bit-sliced engine started from different electrons
+            must each follow a dense engine started from the same ones.
+        '''
+        rng = random.Random(1)
+        for i in range(5):
+            base = _random_pattern(rng, rng.randint(5, 30), rng.randint(5, 30), 0.3 + 0.5 * rng.random())
+            variants = {0: base, 7: _reseed_electrons(rng, base), simulate.LANES - 1: _reseed_electrons(rng, base)}
+            multi = simulate.MultiVectorSimulator(base)
+            states = {'C': simulate.CONDUCTOR, 'H': simulate.HEAD, 'T': simulate.TAIL}
+            for (lane, pattern) in variants.items():
+                for (r, row) in enumerate(pattern):
+                    for (c, char) in enumerate(row):
+                        if (char != ' '):
+                            multi.set_state(r, c, states[char], 1 << lane)
+            dense = dict((lane, simulate.DenseSimulator(pattern)) for (lane, pattern) in variants.items())
+            for g in range(GENERATIONS + 1):
+                for lane in variants:
+                    self.assertEqual(multi.get_pattern(lane), dense[lane].get_pattern(),
+                                     'lane %d of soup %d disagrees at generation %d' % (lane, i, g))
+                    dense[lane].step()
+                multi.step()
+
+
+if __name__ == '__main__':
+    unittest.main()